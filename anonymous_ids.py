@@ -0,0 +1,110 @@
+import hashlib
+from typing import List
+
+from sqlalchemy.exc import IntegrityError
+
+ADJECTIVES = (
+    'Brave', 'Calm', 'Bright', 'Gentle', 'Kind', 'Quiet', 'Happy', 'Clever',
+    'Swift', 'Bold', 'Warm', 'Wise', 'Cheerful', 'Curious', 'Steady', 'Sunny',
+    'Golden', 'Silver', 'Misty', 'Lucky', 'Noble', 'Patient', 'Peaceful', 'Proud',
+    'Radiant', 'Serene', 'Shiny', 'Smiling', 'Sparkling', 'Strong', 'Tender', 'Vivid',
+    'Amber', 'Azure', 'Breezy', 'Cosmic', 'Crimson', 'Dreamy', 'Eager', 'Fearless',
+    'Friendly', 'Glowing', 'Graceful', 'Hopeful', 'Humble', 'Jolly', 'Joyful', 'Lively',
+    'Loyal', 'Merry', 'Mighty', 'Playful', 'Polite', 'Rapid', 'Rosy', 'Royal',
+    'Sincere', 'Snowy', 'Starry', 'Sturdy', 'Thoughtful', 'Trusty', 'Velvet', 'Zesty',
+)
+
+ANIMALS = (
+    'Panda', 'Tiger', 'Eagle', 'Phoenix', 'Lion', 'Butterfly', 'Lotus', 'Swan',
+    'Peacock', 'Elephant', 'Dolphin', 'Falcon', 'Otter', 'Koala', 'Owl', 'Fox',
+    'Deer', 'Rabbit', 'Sparrow', 'Parrot', 'Heron', 'Crane', 'Leopard', 'Cheetah',
+    'Giraffe', 'Zebra', 'Camel', 'Yak', 'Bison', 'Badger', 'Beaver', 'Hedgehog',
+    'Squirrel', 'Turtle', 'Tortoise', 'Penguin', 'Seal', 'Whale', 'Orca', 'Starfish',
+    'Kingfisher', 'Hornbill', 'Myna', 'Robin', 'Finch', 'Wren', 'Lark', 'Kestrel',
+    'Hawk', 'Raven', 'Magpie', 'Pelican', 'Flamingo', 'Gazelle', 'Antelope', 'Lynx',
+    'Panther', 'Jaguar', 'Mongoose', 'Gecko', 'Salmon', 'Marlin', 'Firefly', 'Dragonfly',
+)
+
+NUMBERS = 10000
+FEISTEL_ROUNDS = 4
+
+
+class AnonymousIdAllocator:
+    """Hands out unique forum names like Anonymous_Calm_Peacock_4821.
+
+    A counter row in IdSequence is advanced atomically and each counter
+    value is mapped through a keyed Feistel permutation onto
+    adjective x animal x number (about 41M names). A permutation never maps
+    two counter values to the same name, so there is no retry loop and no
+    uniqueness lookup, while consecutive students still get unrelated
+    names. The key must never change once names have been issued.
+    """
+
+    def __init__(self, db, IdSequence, key, sequence='anonymous_id'):
+        self.db = db
+        self.IdSequence = IdSequence
+        self.sequence = sequence
+        self._key = hashlib.sha256(key.encode('utf-8')).digest()
+        self.size = len(ADJECTIVES) * len(ANIMALS) * NUMBERS
+        bits = (self.size - 1).bit_length()
+        self._half_bits = (bits + 1) // 2
+        self._half_mask = (1 << self._half_bits) - 1
+
+    def _round(self, i, value) -> int:
+        digest = hashlib.blake2b(value.to_bytes(8, 'big'), digest_size=8,
+                                 key=self._key, person=bytes([i]) * 16).digest()
+        return int.from_bytes(digest, 'big') & self._half_mask
+
+    def _feistel(self, value) -> int:
+        left, right = value >> self._half_bits, value & self._half_mask
+        for i in range(FEISTEL_ROUNDS):
+            left, right = right, left ^ self._round(i, right)
+        return (left << self._half_bits) | right
+
+    def permute(self, index) -> int:
+        """Bijection on [0, size); cycle walks out of the power-of-two padding (under 2 steps on average)"""
+        if not 0 <= index < self.size:
+            raise ValueError(f"anonymous id index {index} outside 0..{self.size - 1}")
+        value = self._feistel(index)
+        while value >= self.size:
+            value = self._feistel(value)
+        return value
+
+    def format(self, index) -> str:
+        value = self.permute(index)
+        value, number = divmod(value, NUMBERS)
+        adjective, animal = divmod(value, len(ANIMALS))
+        return f"Anonymous_{ADJECTIVES[adjective]}_{ANIMALS[animal]}_{number:04d}"
+
+    def reserve(self, count) -> int:
+        """Claim `count` consecutive counter values in their own short transaction; returns the first"""
+        table = self.IdSequence.__table__
+        for _ in range(2):
+            try:
+                with self.db.engine.begin() as conn:
+                    # The UPDATE takes the row lock, so concurrent workers get disjoint ranges
+                    updated = conn.execute(
+                        table.update().where(table.c.name == self.sequence)
+                        .values(next_value=table.c.next_value + count)
+                    ).rowcount
+                    if not updated:
+                        conn.execute(table.insert().values(name=self.sequence, next_value=count))
+                    end = conn.execute(
+                        table.select().with_only_columns(table.c.next_value).where(table.c.name == self.sequence)
+                    ).scalar_one()
+                break
+            except IntegrityError:
+                continue  # another worker created the row first
+        else:
+            raise RuntimeError(f"Could not reserve from sequence {self.sequence}")
+        if end > self.size:
+            raise RuntimeError(f"Anonymous id namespace exhausted ({self.size} names)")
+        return end - count
+
+    def allocate(self) -> str:
+        return self.format(self.reserve(1))
+
+    def allocate_many(self, count) -> List[str]:
+        """One round trip for a whole batch, e.g. when seeding"""
+        start = self.reserve(count)
+        return [self.format(index) for index in range(start, start + count)]
@@ -1,12 +1,41 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash
+from flask import Flask, Response, render_template, request, jsonify, session, redirect, url_for, flash, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import joinedload
 from datetime import datetime, timedelta
 import os
 from dotenv import load_dotenv
 import random
+import math
+import threading
 from werkzeug.security import generate_password_hash, check_password_hash
 from data_loader import ConversationDataLoader
-from flask_migrate import Migrate
+from crisis_dispatcher import CrisisDispatcher, build_sinks, enqueue_crisis_notification, enqueue_follow_ups
+from counselor_scheduler import CounselorScheduler
+from chat_archive import ChatArchive
+from compressed_text import CompressedText
+from response_templates import ResponseTemplateCache
+from anonymous_ids import AnonymousIdAllocator
+from data_export import FORMATS, DataExporter
+from cohort_analytics import DIMENSIONS, CohortCube, cohort_cells, merge_totals
+from batch_sync import BatchSync, ValidationError, game_event_row, mood_row
+from game_events import Backpressure, GameEventPipeline
+from recommendations import RESOURCE_CATEGORIES, ResourceRecommender, track_catalog
+from moderation import CrisisMatcher, ForumModerator
+from likes import LikeCounter
+from view_counts import ViewCounter
+from jobs import JobRunner, run_worker_processes, worker_command
+from storage import engine_options, init_storage
+from db_routing import (SHARD_PREFIX, SHARD_SESSION_KEY, RoutingSession, ShardLocal, college_key, current_shard,
+                        replica_binds, shard_binds, shard_keys, shard_map, sync_sqlite_replicas, tenant_key,
+                        use_primary, use_shard)
+from fanout import FanOut, merge_latest, merge_sum
+from instrumentation import Instrumentation
+from static_pages import PrerenderedPages
+from http_caching import ResponseCompressor, conditional
+from rate_limiter import FairScheduler, build_rate_limiter
+from single_flight import SingleFlight, normalize_prompt
+import metrics
+import click
 # Load environment variables
 load_dotenv()
 
@@ -14,21 +43,63 @@ app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'sih-2025-mental-health-secret-key')
 app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///mental_health.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+app.config['SQLALCHEMY_BINDS'] = {**replica_binds(), **shard_binds()}
+# Colleges with their own database, shard key -> college name
+COLLEGES = {key: name for key, (name, _) in shard_map().items()}
 
 # Initialize extensions
-db = SQLAlchemy(app)
-migrate = Migrate(app, db)
-# Configure Gemini AI with error handling
-try:
-    import google.generativeai as genai
-    genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
-    model = genai.GenerativeModel('gemini-1.5-flash')
-    GEMINI_AVAILABLE = True
-    print("✅ Gemini AI configured successfully!")
-except Exception as e:
-    print(f"⚠️ Gemini AI not available: {e}")
-    print("📝 The platform will work with fallback responses")
-    GEMINI_AVAILABLE = False
+db = SQLAlchemy(app, session_options={'class_': RoutingSession})
+init_storage(app, db)
+fan_out = FanOut(app, db, max_workers=int(os.getenv('FANOUT_WORKERS', 8)))
+
+def for_each_shard(fn):
+    """{shard: fn()} run against the main database and then each college shard in turn"""
+    results = {}
+    for shard in shard_keys(db):
+        with use_shard(db, shard):
+            results[shard] = fn()
+    return results
+instrumentation = Instrumentation(app, db)
+ResponseCompressor(app, min_size=int(os.getenv('COMPRESS_MIN_BYTES', 1024)))
+# Alembic is only needed by the `flask db` commands, keep it out of web cold starts
+if click.get_current_context(silent=True) is not None:
+    from flask_migrate import Migrate
+    migrate = Migrate(app, db)
+
+# Gemini is imported and configured on the first chat message instead of at
+# startup; GEMINI_AVAILABLE stays None until then
+model = None
+GEMINI_AVAILABLE = None
+_gemini_lock = threading.Lock()
+
+def get_model():
+    """The Gemini model, or None when it can't be configured"""
+    global model, GEMINI_AVAILABLE
+    if GEMINI_AVAILABLE is None:
+        with _gemini_lock:
+            if GEMINI_AVAILABLE is None:
+                try:
+                    import google.generativeai as genai
+                    genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
+                    model = genai.GenerativeModel('gemini-1.5-flash')
+                    GEMINI_AVAILABLE = True
+                    print("✅ Gemini AI configured successfully!")
+                except Exception as e:
+                    print(f"⚠️ Gemini AI not available: {e}")
+                    print("📝 The platform will work with fallback responses")
+                    GEMINI_AVAILABLE = False
+    return model if GEMINI_AVAILABLE else None
+
+# Last observed Gemini state in this worker: uninitialized, active,
+# degraded (last call failed) or fallback (not configured)
+gemini_status = 'uninitialized'
+
+def set_gemini_status(status):
+    global gemini_status
+    if status != gemini_status:
+        metrics.GEMINI_STATUS_TRANSITIONS.inc(from_status=gemini_status, to_status=status)
+        gemini_status = status
 
 # Crisis detection keywords
 CRISIS_KEYWORDS = [
@@ -38,51 +109,25 @@ CRISIS_KEYWORDS = [
     'death', 'die', 'harm', 'cut myself', 'overdose', 'jump', 'hanging'
 ]
 
-def detect_crisis(message):
-    message_lower = message.lower()
-    return any(keyword in message_lower for keyword in CRISIS_KEYWORDS)
+crisis_matcher = CrisisMatcher(CRISIS_KEYWORDS)
+# Forum posts are long and scanned in bulk; only count keywords that start a word there
+forum_matcher = CrisisMatcher(CRISIS_KEYWORDS, word_start=True)
 
-def get_gemini_response(user_message):
-    if not GEMINI_AVAILABLE:
-        return get_fallback_response(user_message)
-    
-    prompt = f"""
-    You are "Sahayak" (सहायक), a compassionate AI mental health counselor for Indian college students.
-    Respond with empathy and cultural sensitivity. Use both English and Hindi naturally.
-    
-    User message: {user_message}
-    
-    Guidelines:
-    - Be warm, supportive, and non-judgmental
-    - Include Hindi phrases like "आप अकेले नहीं हैं" (You are not alone)
-    - Suggest practical coping strategies for Indian students
-    - For crisis messages, provide immediate help resources
-    - Keep responses under 200 words
-    - Address common issues like exam stress, family pressure, homesickness
-    """
-    
-    try:
-        response = model.generate_content(prompt)
-        return response.text
-    except Exception as e:
-        print(f"Gemini API Error: {e}")
-        return get_fallback_response(user_message)
+def detect_crisis(message):
+    return crisis_matcher.matches(message)
 
-def get_fallback_response(user_message):
-    message_lower = user_message.lower()
-    
-    if detect_crisis(user_message):
-        return """🚨 मुझे आपकी बहुत चिंता हो रही है। आपकी जिंदगी बहुत कीमती है। 
+# Canned replies used when Gemini is unavailable, stored once in ResponseTemplate
+FALLBACK_RESPONSES = {
+    'crisis': """🚨 मुझे आपकी बहुत चिंता हो रही है। आपकी जिंदगी बहुत कीमती है। 
 
 Please reach out immediately:
 📞 Campus Counselor Dr. Priya Sharma: 9152987821
 📞 24/7 Crisis Helpline: 1800-599-0019
 📞 Emergency: 112
 
-आप अकेले नहीं हैं। Help is available."""
+आप अकेले नहीं हैं। Help is available.""",
 
-    elif any(word in message_lower for word in ['exam', 'test', 'study', 'परीक्षा', 'पढ़ाई']):
-        return """मैं समझ सकता हूँ कि परीक्षा का समय कितना तनावपूर्ण होता है। आप अकेले नहीं हैं।
+    'exam_stress': """मैं समझ सकता हूँ कि परीक्षा का समय कितना तनावपूर्ण होता है। आप अकेले नहीं हैं।
 
 Here are some helpful tips:
 • Break study into smaller chunks (छोटे भागों में बांटें)
@@ -90,10 +135,9 @@ Here are some helpful tips:
 • Take regular breaks (नियमित विश्राम करें)
 • Sleep well (अच्छी नींद लें)
 
-आप कर सकते हैं! You've got this!"""
+आप कर सकते हैं! You've got this!""",
 
-    elif any(word in message_lower for word in ['lonely', 'alone', 'friends', 'अकेला', 'दोस्त']):
-        return """कॉलेज में अकेलापन महसूस करना बहुत आम बात है। आप इसमें अकेले नहीं हैं।
+    'loneliness': """कॉलेज में अकेलापन महसूस करना बहुत आम बात है। आप इसमें अकेले नहीं हैं।
 
 Some suggestions:
 • Join campus clubs/activities (कैंपस activities में भाग लें)
@@ -101,10 +145,9 @@ Some suggestions:
 • Start small conversations (छोटी बातचीत शुरू करें)
 • Be patient with yourself (अपने साथ धैर्य रखें)
 
-Making friends takes time. यह समय भी गुजर जाएगा।"""
+Making friends takes time. यह समय भी गुजर जाएगा।""",
 
-    elif any(word in message_lower for word in ['home', 'miss', 'family', 'घर', 'याद']):
-        return """घर की याद आना बिल्कुल normal है। आप बहुत मजबूत हैं।
+    'homesickness': """घर की याद आना बिल्कुल normal है। आप बहुत मजबूत हैं।
 
 Coping strategies:
 • Video call family regularly (परिवार से video call करें)
@@ -112,10 +155,9 @@ Coping strategies:
 • Find comfort foods nearby (अपना पसंदीदा खाना ढूंढें)
 • Connect with students from your region (अपने क्षेत्र के students से मिलें)
 
-यह feeling temporary है। आप adapt कर जाएंगे।"""
+यह feeling temporary है। आप adapt कर जाएंगे।""",
 
-    else:
-        return """नमस्ते! मैं यहाँ आपकी बात सुनने के लिए हूँ। आप अकेले नहीं हैं।
+    'general': """नमस्ते! मैं यहाँ आपकी बात सुनने के लिए हूँ। आप अकेले नहीं हैं।
 
 I'm here to support you through:
 • Academic stress (शैक्षणिक तनाव)
@@ -127,7 +169,86 @@ Feel free to share what's on your mind. आप बेझिझक अपनी 
 
 Emergency contacts:
 📞 Dr. Priya Sharma: 9152987821
-📞 Crisis Helpline: 1800-599-0019"""
+📞 Crisis Helpline: 1800-599-0019""",
+}
+
+chat_rate_limiter = build_rate_limiter(os.environ)
+# Looser bucket for crisis messages after the first one opened an incident
+crisis_rate_limiter = build_rate_limiter(os.environ, prefix='CHAT_CRISIS', per_minute=20, burst=10)
+# Concurrent Gemini calls per worker, shared fairly between students
+llm_scheduler = FairScheduler(slots=int(os.getenv('GEMINI_MAX_CONCURRENCY', 4)))
+LLM_QUEUE_TIMEOUT = float(os.getenv('GEMINI_QUEUE_TIMEOUT', 10))
+# Identical messages arriving together (e.g. on exam result day) share one Gemini call
+gemini_calls = SingleFlight(timeout=float(os.getenv('GEMINI_COALESCE_WAIT', 15)))
+
+def get_gemini_response(user_message, student_id=None, priority=False):
+    """Returns (response_text, template_key); template_key is set for canned fallback replies"""
+    gemini = get_model()
+    if gemini is None:
+        metrics.GEMINI_REQUESTS.inc(outcome='unavailable')
+        set_gemini_status('fallback')
+        key = get_fallback_key(user_message)
+        return FALLBACK_RESPONSES[key], key
+    
+    prompt = f"""
+    You are "Sahayak" (सहायक), a compassionate AI mental health counselor for Indian college students.
+    Respond with empathy and cultural sensitivity. Use both English and Hindi naturally.
+    
+    User message: {user_message}
+    
+    Guidelines:
+    - Be warm, supportive, and non-judgmental
+    - Include Hindi phrases like "आप अकेले नहीं हैं" (You are not alone)
+    - Suggest practical coping strategies for Indian students
+    - For crisis messages, provide immediate help resources
+    - Keep responses under 200 words
+    - Address common issues like exam stress, family pressure, homesickness
+    """
+    
+    # Worked out here: coalesced calls may run on another student's request
+    slot_key = tenant_key(db, student_id)
+
+    def ask_gemini():
+        with llm_scheduler.slot(slot_key, priority=priority, timeout=LLM_QUEUE_TIMEOUT) as acquired:
+            if not acquired:
+                return None
+            with instrumentation.gemini_call():
+                return gemini.generate_content(prompt).text
+
+    try:
+        # Crisis messages always get their own call
+        text = ask_gemini() if priority else gemini_calls.do(normalize_prompt(user_message), ask_gemini)
+        if text is None:
+            # Too busy to answer in time, a canned reply beats a hanging request
+            metrics.GEMINI_REQUESTS.inc(outcome='queue_timeout')
+            key = get_fallback_key(user_message)
+            return FALLBACK_RESPONSES[key], key
+        metrics.GEMINI_REQUESTS.inc(outcome='ok')
+        set_gemini_status('active')
+        return text, None
+    except Exception as e:
+        print(f"Gemini API Error: {e}")
+        metrics.GEMINI_REQUESTS.inc(outcome='error')
+        set_gemini_status('degraded')
+        key = get_fallback_key(user_message)
+        return FALLBACK_RESPONSES[key], key
+
+def get_fallback_key(user_message):
+    message_lower = user_message.lower()
+    
+    if detect_crisis(user_message):
+        return 'crisis'
+    elif any(word in message_lower for word in ['exam', 'test', 'study', 'परीक्षा', 'पढ़ाई']):
+        return 'exam_stress'
+    elif any(word in message_lower for word in ['lonely', 'alone', 'friends', 'अकेला', 'दोस्त']):
+        return 'loneliness'
+    elif any(word in message_lower for word in ['home', 'miss', 'family', 'घर', 'याद']):
+        return 'homesickness'
+    else:
+        return 'general'
+
+def get_fallback_response(user_message):
+    return FALLBACK_RESPONSES[get_fallback_key(user_message)]
 
 # Enhanced Database Models
 class Student(db.Model):
@@ -181,12 +302,36 @@ class ScreeningResult(db.Model):
 class ChatConversation(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('student.id'), nullable=False)
-    user_message = db.Column(db.Text, nullable=False)
-    bot_response = db.Column(db.Text, nullable=False)
+    user_message = db.Column(CompressedText, nullable=False)
+    bot_response = db.Column(CompressedText)  # empty when the reply came from a template
+    response_template_id = db.Column(db.Integer, db.ForeignKey('response_template.id'))
     crisis_detected = db.Column(db.Boolean, default=False)
     sentiment_score = db.Column(db.Float, default=0.0)
     response_time = db.Column(db.Float, default=0.0)  # Response time in seconds
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    __table_args__ = (
+        db.Index('ix_chat_conversation_student_timestamp', 'student_id', 'timestamp'),
+    )
+
+    @property
+    def reply(self):
+        if self.response_template_id:
+            return response_templates.render(self.response_template_id)
+        return self.bot_response
+
+class ResponseTemplate(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(50), nullable=False)
+    version = db.Column(db.Integer, nullable=False, default=1)
+    language = db.Column(db.String(20), default='Hindi/English')
+    body = db.Column(db.Text, nullable=False)
+    is_active = db.Column(db.Boolean, default=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('key', 'version', name='uq_response_template_key_version'),
+    )
 
 class Resource(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -214,10 +359,15 @@ class ForumPost(db.Model):
     likes = db.Column(db.Integer, default=0)
     is_pinned = db.Column(db.Boolean, default=False)
     is_resolved = db.Column(db.Boolean, default=False)
+    needs_review = db.Column(db.Boolean, default=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     replies = db.relationship('ForumReply', backref='post', lazy=True)
 
+    __table_args__ = (
+        db.Index('ix_forum_post_likes_views', 'likes', 'views'),
+    )
+
 class ForumReply(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     post_id = db.Column(db.Integer, db.ForeignKey('forum_post.id'), nullable=False)
@@ -226,6 +376,7 @@ class ForumReply(db.Model):
     anonymous_id = db.Column(db.String(50), nullable=False)
     likes = db.Column(db.Integer, default=0)
     is_helpful = db.Column(db.Boolean, default=False)
+    needs_review = db.Column(db.Boolean, default=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     student = db.relationship('Student', backref='forum_replies')
@@ -233,10 +384,11 @@ class ForumReply(db.Model):
 class CrisisIncident(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('student.id'), nullable=False)
-    message = db.Column(db.Text, nullable=False)
+    message = db.Column(CompressedText, nullable=False)
     severity = db.Column(db.String(20), nullable=False)
     status = db.Column(db.String(20), default='open')
     counselor_assigned = db.Column(db.String(100), default='')
+    counselor_id = db.Column(db.Integer, db.ForeignKey('counselor.id'))
     counselor_notified = db.Column(db.Boolean, default=False)
     follow_up_date = db.Column(db.DateTime)
     notes = db.Column(db.Text, default='')
@@ -257,6 +409,7 @@ class Counselor(db.Model):
     max_capacity = db.Column(db.Integer, default=50)
     is_available = db.Column(db.Boolean, default=True)
     rating = db.Column(db.Float, default=5.0)
+    version = db.Column(db.Integer, default=0, nullable=False)  # bumped on every caseload change
 
 class MoodTracker(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -267,14 +420,288 @@ class MoodTracker(db.Model):
     sleep_hours = db.Column(db.Float, default=0.0)
     notes = db.Column(db.Text, default='')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    client_id = db.Column(db.String(36))  # set by offline clients so resent batches are idempotent
     
     student = db.relationship('Student', backref='mood_entries')
 
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'client_id', name='uq_mood_tracker_student_client_id'),
+    )
+
+class GameSessionAggregate(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('student.id'), nullable=False)
+    session_id = db.Column(db.String(36), nullable=False)  # one page visit of a game
+    game = db.Column(db.String(50), nullable=False)
+    started_at = db.Column(db.DateTime)
+    last_event_at = db.Column(db.DateTime)
+    duration_seconds = db.Column(db.Float, nullable=False, default=0.0)
+    events = db.Column(db.Integer, nullable=False, default=0)
+    completions = db.Column(db.Integer, nullable=False, default=0)
+    current_streak = db.Column(db.Integer, nullable=False, default=0)
+    best_streak = db.Column(db.Integer, nullable=False, default=0)
+    best_score = db.Column(db.Integer)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'session_id', name='uq_game_session_aggregate_student_session_id'),
+        db.Index('ix_game_session_aggregate_game_started_at', 'game', 'started_at'),
+    )
+
+class GameEventReceipt(db.Model):
+    # client_id of every game event folded into an aggregate, so a resent event is counted once
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('student.id'), nullable=False)
+    client_id = db.Column(db.String(36), nullable=False)
+    received_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'client_id', name='uq_game_event_receipt_student_client_id'),
+        db.Index('ix_game_event_receipt_received_at', 'received_at'),
+    )
+
+class NotificationOutbox(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    incident_id = db.Column(db.Integer, db.ForeignKey('crisis_incident.id'))
+    student_id = db.Column(db.Integer, db.ForeignKey('student.id'), nullable=False)
+    event_type = db.Column(db.String(50), nullable=False)
+    source = db.Column(db.String(20), default='chat')  # chat, screening, forum, follow_up
+    severity = db.Column(db.String(20), nullable=False)
+    priority = db.Column(db.Integer, default=1)  # lower is delivered first
+    dedup_key = db.Column(db.String(100), nullable=False, index=True)
+    duplicate_count = db.Column(db.Integer, default=0)
+    status = db.Column(db.String(20), default='pending')  # pending, sending, sent, failed
+    attempts = db.Column(db.Integer, default=0)
+    last_error = db.Column(db.Text, default='')
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow)
+    locked_until = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+    delivered_sinks = db.Column(db.String(200), default='')  # comma separated, for retries
+    folded_incident_ids = db.Column(db.Text, default='')  # comma separated repeat alerts folded into this one
+
+    incident = db.relationship('CrisisIncident', backref='notifications')
+
+    __table_args__ = (
+        db.Index('ix_notification_outbox_due', 'status', 'priority', 'created_at'),
+    )
+
+class ChatArchiveSegment(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.String(7), nullable=False, index=True)  # YYYY-MM
+    path = db.Column(db.String(500), nullable=False)  # relative to CHAT_ARCHIVE_DIR
+    codec = db.Column(db.String(10), nullable=False)  # zstd, gzip
+    row_count = db.Column(db.Integer, nullable=False)
+    min_id = db.Column(db.Integer, nullable=False)
+    max_id = db.Column(db.Integer, nullable=False)
+    min_timestamp = db.Column(db.DateTime, nullable=False)
+    max_timestamp = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    entries = db.relationship('ChatArchiveEntry', backref='segment', lazy=True)
+
+class ChatArchiveEntry(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    segment_id = db.Column(db.Integer, db.ForeignKey('chat_archive_segment.id'), nullable=False)
+    student_id = db.Column(db.Integer, db.ForeignKey('student.id'), nullable=False)
+    row_count = db.Column(db.Integer, nullable=False)
+    min_timestamp = db.Column(db.DateTime, nullable=False)
+    max_timestamp = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_chat_archive_entry_student_max_timestamp', 'student_id', 'max_timestamp'),
+    )
+
+class ResourceRecommendation(db.Model):
+    student_id = db.Column(db.Integer, db.ForeignKey('student.id'), primary_key=True)
+    resource_ids = db.Column(db.LargeBinary, nullable=False)  # ranked ids, packed little-endian uint32
+    catalog_version = db.Column(db.String(40), nullable=False)
+    screening_id = db.Column(db.Integer)  # latest screening the list was computed from
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class ContentLike(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('student.id'), nullable=False)
+    target_type = db.Column(db.String(20), nullable=False)  # forum_post, forum_reply, resource
+    target_id = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'target_type', 'target_id', name='uq_content_like_student_target'),
+    )
+
+class IdSequence(db.Model):
+    name = db.Column(db.String(50), primary_key=True)
+    next_value = db.Column(db.BigInteger, nullable=False, default=0)
+
+class ProcessingWatermark(db.Model):
+    name = db.Column(db.String(50), primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class ProcessedRow(db.Model):
+    # Rows handed out just below a ProcessingWatermark, so late commits can be picked up once
+    name = db.Column(db.String(50), primary_key=True)
+    row_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+
+class CohortRollup(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.String(7), nullable=False)  # YYYY-MM
+    branch = db.Column(db.String(50), nullable=False)
+    year = db.Column(db.String(20), nullable=False)
+    hostel_resident = db.Column(db.Boolean, nullable=False)
+    gender = db.Column(db.String(20), nullable=False)
+    location = db.Column(db.String(100), nullable=False)
+    screenings = db.Column(db.Integer, nullable=False, default=0)
+    risk_low = db.Column(db.Integer, nullable=False, default=0)
+    risk_moderate = db.Column(db.Integer, nullable=False, default=0)
+    risk_high = db.Column(db.Integer, nullable=False, default=0)
+    phq9_sum = db.Column(db.Integer, nullable=False, default=0)
+    gad7_sum = db.Column(db.Integer, nullable=False, default=0)
+    mood_entries = db.Column(db.Integer, nullable=False, default=0)
+    mood_sum = db.Column(db.Integer, nullable=False, default=0)
+    energy_sum = db.Column(db.Integer, nullable=False, default=0)
+    stress_sum = db.Column(db.Integer, nullable=False, default=0)
+    sleep_sum = db.Column(db.Float, nullable=False, default=0.0)
+    crises = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('month', 'branch', 'year', 'hostel_resident', 'gender', 'location',
+                            name='uq_cohort_rollup_cell'),
+    )
+
+class Job(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    job_type = db.Column(db.String(50), nullable=False)
+    shard = db.Column(db.String(50))  # college shard the job runs against, NULL for the main database
+    payload = db.Column(db.Text, default='{}')  # JSON keyword arguments for the handler
+    dedup_key = db.Column(db.String(100), unique=True)  # set while a periodic run is pending
+    status = db.Column(db.String(20), default='pending')  # pending, running, done, failed
+    attempts = db.Column(db.Integer, default=0)
+    last_error = db.Column(db.Text, default='')
+    run_at = db.Column(db.DateTime, default=datetime.utcnow)
+    locked_by = db.Column(db.String(100))
+    locked_until = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)
+    slot = db.Column(db.Integer)  # concurrency slot of its type held while running
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_job_status_run_at', 'status', 'run_at'),
+        db.Index('ix_job_type_status', 'job_type', 'status'),
+        db.UniqueConstraint('job_type', 'slot', name='uq_job_type_slot'),
+    )
+
+crisis_dispatcher = CrisisDispatcher(app, db, NotificationOutbox, build_sinks(os.environ))
+# Helpers that keep rows in memory get one instance per college shard
+counselor_scheduler = ShardLocal(db, lambda: CounselorScheduler(db, Counselor))
+response_templates = ShardLocal(db, lambda: ResponseTemplateCache(db, ResponseTemplate, FALLBACK_RESPONSES))
+data_exporter = DataExporter(db, Student, {
+    'screenings': ScreeningResult,
+    'moods': MoodTracker,
+    'crises': CrisisIncident,
+}, batch_size=int(os.getenv('EXPORT_BATCH_SIZE', 1000)))
+cohort_cube = ShardLocal(db, lambda: CohortCube(db, Student, CohortRollup, ProcessingWatermark, ProcessedRow, {
+    'screening': ScreeningResult,
+    'mood': MoodTracker,
+    'crisis': CrisisIncident,
+}))
+COHORT_REFRESH_SECONDS = float(os.getenv('COHORT_REFRESH_SECONDS', 60))
+track_catalog(Resource, ProcessingWatermark)
+resource_recommender = ShardLocal(db, lambda: ResourceRecommender(
+    db, Student, Resource, ScreeningResult, MoodTracker, ResourceRecommendation, ProcessingWatermark,
+    on_stale=lambda student_id: queue_recommendation(student_id),
+    cache_seconds=float(os.getenv('RECOMMENDATION_CACHE_SECONDS', 300))))
+anonymous_ids = AnonymousIdAllocator(db, IdSequence, os.getenv('ANONYMOUS_ID_KEY', app.config['SECRET_KEY']))
+CHAT_ARCHIVE_DIR = os.getenv('CHAT_ARCHIVE_DIR', os.path.join(app.instance_path, 'chat_archive'))
+# Archive files are named by student id, so each shard gets its own directory
+chat_archive = ShardLocal(db, lambda: ChatArchive(
+    db, ChatConversation, ChatArchiveSegment, ChatArchiveEntry,
+    archive_dir=os.path.join(CHAT_ARCHIVE_DIR, shard) if (shard := current_shard(db)) else CHAT_ARCHIVE_DIR))
+
+# Open incidents are brought back to the crisis team this long after they were raised, and again after each reminder
+CRISIS_FOLLOW_UP_INTERVAL = timedelta(hours=float(os.getenv('CRISIS_FOLLOW_UP_HOURS', 24)))
+CRISIS_FOLLOW_UP_LIMIT = int(os.getenv('CRISIS_FOLLOW_UP_LIMIT', 3))
+
+def open_crisis_incident(student_id, message, source, specialization=None):
+    """Add a high severity CrisisIncident and its outbox row; the caller commits"""
+    # A student holds one caseload slot however many incidents are open, so
+    # repeat alerts stay with the counselor already on the case
+    counselor = db.session.query(CrisisIncident.counselor_id.label('id'),
+                                 CrisisIncident.counselor_assigned.label('name')).filter(
+        CrisisIncident.student_id == student_id,
+        CrisisIncident.status == 'open',
+        CrisisIncident.counselor_id.isnot(None)
+    ).order_by(CrisisIncident.id.desc()).first()
+    if counselor is None:
+        student = db.session.get(Student, student_id)
+        counselor = counselor_scheduler.assign(
+            language=student.language if student else None,
+            specialization=specialization
+        )
+    crisis = CrisisIncident(
+        student_id=student_id,
+        message=message,
+        severity='high',
+        counselor_id=counselor.id if counselor else None,
+        counselor_assigned=counselor.name if counselor else '',
+        follow_up_date=datetime.utcnow() + CRISIS_FOLLOW_UP_INTERVAL
+    )
+    db.session.add(crisis)
+    # Written in the same commit; crisis_dispatcher delivers it off the request path
+    enqueue_crisis_notification(db, NotificationOutbox, crisis, source=source)
+    metrics.CRISIS_DETECTED.inc(source=source)
+    return crisis
+
+like_counter = LikeCounter(db, ContentLike, {
+    'forum_post': ForumPost,
+    'forum_reply': ForumReply,
+    'resource': Resource,
+})
+forum_moderator = ForumModerator(
+    app, db, forum_matcher, ForumPost, ForumReply, ProcessingWatermark, ProcessedRow, open_crisis_incident,
+    poll_interval=float(os.getenv('MODERATION_POLL_SECONDS', 30)),
+    incident_max_age=timedelta(days=int(os.getenv('MODERATION_INCIDENT_MAX_AGE_DAYS', 7))),
+)
+
+instrumentation.observers.append(metrics.observe_request)
+metrics.registry.add_collector(metrics.pool_collector(app, db))
+metrics.registry.add_collector(metrics.cache_collector({
+    'response_templates': response_templates, 'chat_archive_segments': chat_archive,
+    'resource_recommendations': resource_recommender}))
+metrics.registry.add_collector(metrics.gemini_status_collector(lambda: gemini_status))
+metrics.registry.add_collector(metrics.value_collector(
+    'zenithra_llm_queued', 'Chat messages waiting for a Gemini slot', llm_scheduler.queued))
+metrics.registry.add_collector(metrics.value_collector(
+    'zenithra_gemini_coalesced_total', 'Gemini calls saved by sharing an identical in-flight prompt',
+    lambda: gemini_calls.saved, kind='counter'))
+metrics.registry.add_collector(metrics.value_collector(
+    'zenithra_forum_moderation_scanned_total', 'Forum posts and replies scanned for crisis language',
+    lambda: forum_moderator.scanned, kind='counter'))
+metrics.registry.add_collector(metrics.value_collector(
+    'zenithra_forum_moderation_flagged_total', 'Forum posts and replies flagged for review',
+    lambda: forum_moderator.flagged, kind='counter'))
+app.before_request(metrics.registry.ensure_flusher)
+
+def load_chat_history(student_id, before=None, limit=50):
+    """Newest-first chat history, falling back to the archive once hot rows run out"""
+    query = ChatConversation.query.filter_by(student_id=student_id)
+    if before is not None:
+        query = query.filter(ChatConversation.timestamp < before)
+    conversations = query.order_by(ChatConversation.timestamp.desc()).limit(limit).all()
+
+    if len(conversations) < limit:
+        oldest = conversations[-1].timestamp if conversations else before
+        conversations += chat_archive.history(student_id, before=oldest, limit=limit - len(conversations))
+    return conversations
+
 # Routes
 @app.route('/')
 def home():
     total_students = Student.query.filter_by(is_admin=False).count()
-    total_sessions = ChatConversation.query.count()
+    total_sessions = ChatConversation.query.count() + chat_archive.count()
     active_crises = CrisisIncident.query.filter_by(status='open').count()
     
     return render_template('home.html', 
@@ -282,10 +709,82 @@ def home():
                          total_sessions=total_sessions,
                          active_crises=active_crises)
 
+GAMES = (
+    'breathing_buddy', 'meditation_garden', 'chakra_balance', 'stress_ball_squeeze', 'exam_anxiety_fighter',
+    'mood_weather', 'gratitude_tree', 'kindness_ripple', 'habit_builder', 'memory_palace', 'emotion_detective', 'campus_compass'
+)
+
+game_events = GameEventPipeline(
+    app, db, GameSessionAggregate, GameEventReceipt, ProcessingWatermark,
+    log_dir=os.getenv('GAME_EVENT_LOG_DIR', os.path.join(app.instance_path, 'game_events')),
+    capacity=int(os.getenv('GAME_EVENT_BUFFER', 10000)),
+    flush_interval=float(os.getenv('GAME_EVENT_FLUSH_SECONDS', 1)),
+    fsync=os.getenv('GAME_EVENT_FSYNC', 'false').lower() == 'true',
+    receipt_days=int(os.getenv('GAME_EVENT_RECEIPT_DAYS', 30)),
+)
+batch_sync = BatchSync(db, {
+    'moods': (MoodTracker, mood_row),
+    'game_events': (GameSessionAggregate, lambda item, now: game_event_row(item, now, GAMES)),
+}, sinks={'game_events': game_events.ingest}, max_items=int(os.getenv('SYNC_MAX_ITEMS', 500)))
+metrics.registry.add_collector(metrics.value_collector(
+    'zenithra_game_event_buffer_depth', 'Game events buffered in memory waiting for the flusher', game_events.depth))
+metrics.registry.add_collector(metrics.value_collector(
+    'zenithra_game_event_buffer_capacity', 'Game events the buffer holds before rejecting', lambda: game_events.capacity))
+metrics.registry.add_collector(metrics.value_collector(
+    'zenithra_game_event_flush_lag_seconds', 'Age of the oldest buffered game event', game_events.lag_seconds))
+metrics.registry.add_collector(metrics.value_collector(
+    'zenithra_game_events_flushed_total', 'Game events folded into session aggregates',
+    lambda: game_events.flushed + game_events.replayed, kind='counter'))
+metrics.registry.add_collector(metrics.value_collector(
+    'zenithra_game_events_rejected_total', 'Game events refused because the buffer was full',
+    lambda: game_events.rejected, kind='counter'))
+
+# Page views are counted in memory and written every few seconds instead of once per request
+view_counter = ViewCounter(app, db, {'forum_post': ForumPost, 'resource': Resource},
+                           flush_seconds=float(os.getenv('VIEW_FLUSH_SECONDS', 5)),
+                           max_pending=int(os.getenv('VIEW_FLUSH_MAX_PENDING', 500)))
+# Without it views would wait for a thread that a frozen serverless process never runs
+app.teardown_request(view_counter.flush_if_due)
+
+# Periodic and heavy work runs in `flask run-jobs` worker processes, never in request handlers
+job_runner = JobRunner(app, db, Job, lease_seconds=int(os.getenv('JOB_LEASE_SECONDS', 60)))
+job_runner.register('refresh_rollups', lambda: cohort_cube.refresh(), interval=COHORT_REFRESH_SECONDS)
+job_runner.register('sync_response_templates', lambda: response_templates.sync(), interval=3600)
+job_runner.register('archive_chats', lambda older_than_days=int(os.getenv('CHAT_ARCHIVE_AFTER_DAYS', 180)):
+                    chat_archive.archive_older_than(days=older_than_days), interval=24 * 3600)
+job_runner.register('recommend_resources', lambda chunk_size=500: resource_recommender.refresh_all(chunk_size),
+                    interval=float(os.getenv('RECOMMENDATION_REFRESH_SECONDS', 3600)))
+job_runner.register('recommend_student', lambda student_id: resource_recommender.refresh_student(student_id),
+                    concurrency=4)
+job_runner.register('crisis_follow_ups', lambda: enqueue_follow_ups(
+    db, CrisisIncident, NotificationOutbox, CRISIS_FOLLOW_UP_INTERVAL, CRISIS_FOLLOW_UP_LIMIT), interval=900)
+# Delivers the outbox where no process keeps crisis_dispatcher's thread running (serverless)
+job_runner.register('dispatch_crises', lambda: crisis_dispatcher.dispatch_pending(),
+                    interval=float(os.getenv('CRISIS_DISPATCH_SECONDS', 10)))
+# These two go through every shard themselves
+job_runner.register('moderate_forum', lambda: forum_moderator.scan(),
+                    interval=float(os.getenv('MODERATION_POLL_SECONDS', 30)), per_shard=False)
+job_runner.register('replay_game_events', lambda: game_events.recover(), interval=600, per_shard=False)
+
+def queue_recommendation(student_id):
+    """Recompute a student's recommendations on a job worker, once however often it's asked for"""
+    shard = current_shard(db)
+    job_runner.enqueue_now('recommend_student', {'student_id': student_id}, shard=shard,
+                           dedup_key=f"recommend_student:{shard or ''}:{student_id}")
+
+metrics.registry.add_collector(metrics.value_collector(
+    'zenithra_view_counts_flushed_total', 'Page views written to the database by the view counter',
+    lambda: view_counter.flushed, kind='counter'))
+
+# Game pages are static apart from the navigation bar, serve them pre-rendered
+prerendered_pages = PrerenderedPages(
+    app, {'game_zone': 'game_zone.html', **{game: f'games/{game}.html' for game in GAMES}},
+    artifact_dir=os.getenv('PRERENDER_DIR', os.path.join(app.instance_path, 'prerendered')))
+
 @app.route('/game_zone')
 def game_zone():
     # Main landing page for games
-    return render_template('game_zone.html')
+    return prerendered_pages.serve('game_zone') or render_template('game_zone.html')
 
 # Add these imports at the top if not already present
 
@@ -319,7 +818,7 @@ def profile():
             return redirect(url_for('profile'))
 
     # Calculate user statistics
-    chat_sessions = ChatConversation.query.filter_by(student_id=user.id).count()
+    chat_sessions = ChatConversation.query.filter_by(student_id=user.id).count() + chat_archive.count(user.id)
     assessments_taken = ScreeningResult.query.filter_by(student_id=user.id).count()
     days_active = (datetime.utcnow() - user.created_at).days + 1
 
@@ -370,13 +869,9 @@ def settings():
 # Individual game routes -- add these
 @app.route('/games/<game_name>')
 def game_page(game_name):
-    valid_games = [
-        'breathing_buddy', 'meditation_garden', 'chakra_balance', 'stress_ball_squeeze', 'exam_anxiety_fighter',
-        'mood_weather', 'gratitude_tree', 'kindness_ripple', 'habit_builder', 'memory_palace', 'emotion_detective', 'campus_compass'
-    ]
-    if game_name not in valid_games:
+    if game_name not in GAMES:
         return render_template('404.html'), 404
-    return render_template(f'games/{game_name}.html')
+    return prerendered_pages.serve(game_name) or render_template(f'games/{game_name}.html')
 
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -384,16 +879,20 @@ def login():
         email = request.form['email']
         password = request.form['password']
         
-        student = Student.query.filter_by(email=email).first()
+        # Students live in their college's shard, so look in every database
+        session.pop(SHARD_SESSION_KEY, None)
+        shard, student = fan_out.find(lambda: Student.query.filter_by(email=email).first())
         
         if student and check_password_hash(student.password_hash, password):
             session['student_id'] = student.id
             session['student_name'] = student.name
             session['is_admin'] = student.is_admin
             session['dark_mode'] = student.dark_mode  # Add this line
+            if shard:
+                session[SHARD_SESSION_KEY] = shard  # routes the rest of the visit to that shard
             
             # Update last active
-            student.last_active = datetime.utcnow()
+            Student.query.filter_by(id=student.id).update({'last_active': datetime.utcnow()})
             db.session.commit()
             
             flash(f'Welcome back, {student.name}!', 'success')
@@ -440,12 +939,15 @@ def register():
         hostel_resident = 'hostel_resident' in request.form
         phone = request.form.get('phone', '')
         emergency_contact = request.form.get('emergency_contact', '')
+        shard = college_key(request.form.get('college'))
+        shard = shard if shard in COLLEGES else None
         
-        if Student.query.filter_by(email=email).first():
+        if any(fan_out.map(lambda: Student.query.filter_by(email=email).first() is not None).values()):
             flash('Email already exists', 'error')
-            return render_template('register.html')
+            return render_template('register.html', colleges=COLLEGES)
         
-        anonymous_id = f"Anonymous_{random.choice(['Panda', 'Tiger', 'Eagle', 'Phoenix', 'Lion', 'Butterfly', 'Lotus', 'Swan', 'Peacock', 'Elephant'])}_{random.randint(10, 99)}"
+        # Allocated from the main database, so anonymous ids stay unique across shards
+        anonymous_id = anonymous_ids.allocate()
         
         student = Student(
             name=name,
@@ -459,16 +961,18 @@ def register():
             hostel_resident=hostel_resident,
             phone=phone,
             emergency_contact=emergency_contact,
-            anonymous_id=anonymous_id
+            anonymous_id=anonymous_id,
+            college=COLLEGES[shard] if shard else ''
         )
         
-        db.session.add(student)
-        db.session.commit()
+        with use_shard(db, shard):
+            db.session.add(student)
+            db.session.commit()
         
         flash('Registration successful! Please login.', 'success')
         return redirect(url_for('login'))
     
-    return render_template('register.html')
+    return render_template('register.html', colleges=COLLEGES)
 
 @app.route('/logout')
 def logout():
@@ -483,12 +987,33 @@ def chat():
         flash('Please login to access chat', 'error')
         return redirect(url_for('login'))
     
-    conversations = ChatConversation.query.filter_by(
-        student_id=session['student_id']
-    ).order_by(ChatConversation.timestamp.desc()).limit(50).all()
+    conversations = load_chat_history(session['student_id'], limit=50)
     
     return render_template('chat.html', conversations=conversations[::-1])
 
+@app.route('/chat/history')
+def chat_history():
+    if 'student_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    before = request.args.get('before')
+    try:
+        before = datetime.fromisoformat(before) if before else None
+    except ValueError:
+        return jsonify({'error': 'Invalid before timestamp'}), 400
+    limit = min(request.args.get('limit', 50, type=int), 200)
+
+    conversations = load_chat_history(session['student_id'], before=before, limit=limit)
+    return jsonify({
+        'conversations': [{
+            'user_message': str(c.user_message),
+            'bot_response': str(c.reply),
+            'crisis_detected': c.crisis_detected,
+            'timestamp': c.timestamp.isoformat()
+        } for c in conversations[::-1]],
+        'next_before': conversations[-1].timestamp.isoformat() if conversations else None
+    })
+
 @app.route('/send_message', methods=['POST'])
 def send_message():
     if 'student_id' not in session:
@@ -501,28 +1026,39 @@ def send_message():
     start_time = datetime.utcnow()
     
     crisis_detected = detect_crisis(user_message)
-    ai_response = get_gemini_response(user_message)
+    student_key = tenant_key(db, session['student_id'])
+    if not crisis_detected:
+        retry_after = chat_rate_limiter.check(student_key)
+    elif CrisisIncident.query.filter_by(student_id=session['student_id'], status='open').first() is None:
+        retry_after = 0  # a student reaching out for the first time is never throttled
+    else:
+        # Repeats still get priority Gemini calls and incidents, so cap them too
+        retry_after = crisis_rate_limiter.check(student_key)
+    if retry_after:
+        metrics.CHAT_RATE_LIMITED.inc()
+        response = jsonify({'error': 'Too many messages', 'retry_after': math.ceil(retry_after)})
+        response.headers['Retry-After'] = str(math.ceil(retry_after))
+        return response, 429
+    
+    ai_response, template_key = get_gemini_response(user_message, session['student_id'], priority=crisis_detected)
+    template_id = response_templates.active_id(template_key) if template_key else None
     
     response_time = (datetime.utcnow() - start_time).total_seconds()
+    metrics.CHAT_RESPONSE.observe(response_time, source='fallback' if template_key else 'gemini')
+    metrics.CHAT_MESSAGES.inc(crisis=str(crisis_detected).lower())
     
     conversation = ChatConversation(
         student_id=session['student_id'],
         user_message=user_message,
-        bot_response=ai_response,
+        bot_response=None if template_id else ai_response,
+        response_template_id=template_id,
         crisis_detected=crisis_detected,
         response_time=response_time
     )
     db.session.add(conversation)
     
     if crisis_detected:
-        crisis = CrisisIncident(
-            student_id=session['student_id'],
-            message=user_message,
-            severity='high',
-            counselor_notified=True,
-            counselor_assigned='Dr. Priya Sharma'
-        )
-        db.session.add(crisis)
+        open_crisis_incident(session['student_id'], user_message, source='chat')
         print(f"🚨 CRISIS DETECTED for student {session['student_id']}")
     
     db.session.commit()
@@ -531,7 +1067,7 @@ def send_message():
         'response': ai_response,
         'crisis_detected': crisis_detected,
         'timestamp': conversation.timestamp.strftime('%H:%M'),
-        'gemini_status': 'active' if GEMINI_AVAILABLE else 'fallback'
+        'gemini_status': gemini_status
     })
 
 @app.route('/screening')
@@ -628,21 +1164,40 @@ def submit_screening():
     
     # Create crisis incident for high risk
     if risk_level == 'high':
-        crisis = CrisisIncident(
-            student_id=session['student_id'],
-            message=f"High risk screening result - PHQ-9: {phq9_score}, GAD-7: {gad7_score}",
-            severity='high',
-            counselor_notified=True
+        # Route to whichever scale is proportionally worse (PHQ-9 max 27, GAD-7 max 21)
+        specialization = 'Depression' if phq9_score / 27 >= gad7_score / 21 else 'Anxiety'
+        open_crisis_incident(
+            session['student_id'],
+            f"High risk screening result - PHQ-9: {phq9_score}, GAD-7: {gad7_score}",
+            source='screening',
+            specialization=specialization
         )
-        db.session.add(crisis)
     
     db.session.commit()
     
+    # The new scores change the student's recommendations; recomputed by a job worker
+    queue_recommendation(session['student_id'])
+    
     return render_template('screening_result.html',
                          screening=screening,
                          recommendations=recommendations)
 
+def _flag_count(column):
+    return db.func.sum(db.case((column, 1), else_=0))
+
+def resources_stamp():
+    """Version of everything the resources listing shows, from one aggregate query"""
+    stamp = db.session.query(
+        db.func.count(Resource.id), db.func.max(Resource.created_at), db.func.sum(Resource.views),
+        db.func.sum(Resource.likes), _flag_count(Resource.is_featured)
+    ).one()
+    student_id = session.get('student_id')
+    recommended = resource_recommender.stamp(student_id) if student_id else None
+    liked = like_counter.stamp(student_id, 'resource') if student_id else None
+    return tuple(stamp) + (recommended, liked), stamp[1]
+
 @app.route('/resources')
+@conditional(resources_stamp)
 def resources():
     category = request.args.get('category', '')
     search = request.args.get('search', '')
@@ -657,15 +1212,21 @@ def resources():
     
     resources_list = query.order_by(Resource.is_featured.desc(), Resource.views.desc()).all()
     
-    categories = [
-        'Academic Stress', 'Anxiety', 'Depression', 'Social Anxiety', 
-        'Sleep Issues', 'Family Issues', 'Career Guidance', 'Relationships',
-        'Self-Care', 'Mindfulness', 'Crisis Support'
-    ]
+    recommended = []
+    if session.get('student_id') and not session.get('is_admin') and not category and not search:
+        by_id = {resource.id: resource for resource in resources_list}
+        recommended = [by_id[rid] for rid in resource_recommender.for_student(session['student_id'])
+                       if rid in by_id][:6]
+    
+    liked = set()
+    if session.get('student_id'):
+        liked = like_counter.liked(session['student_id'], 'resource', [resource.id for resource in resources_list])
     
     return render_template('resources.html', 
                          resources=resources_list, 
-                         categories=categories, 
+                         recommended=recommended,
+                         liked=liked,
+                         categories=RESOURCE_CATEGORIES, 
                          selected_category=category,
                          search_query=search)
 
@@ -673,13 +1234,22 @@ def resources():
 def view_resource(resource_id):
     resource = Resource.query.get_or_404(resource_id)
     
-    # Increment views
-    resource.views += 1
-    db.session.commit()
+    view_counter.add('resource', resource_id)
     
     return render_template('resource_detail.html', resource=resource)
 
+def forum_stamp():
+    """Version of the forum listing: posts, their counters and flags, and replies"""
+    posts = db.session.query(
+        db.func.count(ForumPost.id), db.func.max(ForumPost.created_at), db.func.sum(ForumPost.views),
+        db.func.sum(ForumPost.likes), _flag_count(ForumPost.is_pinned), _flag_count(ForumPost.is_resolved)
+    ).one()
+    replies = db.session.query(db.func.count(ForumReply.id), db.func.max(ForumReply.created_at)).one()
+    last_modified = max((t for t in (posts[1], replies[1]) if t is not None), default=None)
+    return tuple(posts) + tuple(replies), last_modified
+
 @app.route('/forum')
+@conditional(forum_stamp)
 def forum():
     category = request.args.get('category', '')
     sort_by = request.args.get('sort', 'recent')
@@ -707,13 +1277,17 @@ def forum():
 def forum_post_detail(post_id):
     post = ForumPost.query.get_or_404(post_id)
     
-    # Increment views
-    post.views += 1
-    db.session.commit()
+    view_counter.add('forum_post', post_id)
     
     replies = ForumReply.query.filter_by(post_id=post_id).order_by(ForumReply.created_at.asc()).all()
     
-    return render_template('forum_post_detail.html', post=post, replies=replies)
+    liked_post, liked_replies = False, set()
+    if 'student_id' in session:
+        liked_post = bool(like_counter.liked(session['student_id'], 'forum_post', [post.id]))
+        liked_replies = like_counter.liked(session['student_id'], 'forum_reply', [reply.id for reply in replies])
+    
+    return render_template('forum_post_detail.html', post=post, replies=replies,
+                           liked_post=liked_post, liked_replies=liked_replies)
 
 @app.route('/create_post', methods=['GET', 'POST'])
 def create_post():
@@ -737,6 +1311,7 @@ def create_post():
         )
         db.session.add(post)
         db.session.commit()
+        forum_moderator.notify()
         
         flash('Post created successfully!', 'success')
         return redirect(url_for('forum_post_detail', post_id=post.id))
@@ -787,33 +1362,87 @@ def submit_mood():
     flash('Mood entry saved successfully!', 'success')
     return redirect(url_for('mood_tracker'))
 
+@app.route('/api/sync', methods=['POST'])
+def api_sync():
+    if 'student_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    try:
+        # Duplicate detection must see rows a previous attempt just wrote
+        with use_primary(db):
+            result = batch_sync.ingest(session['student_id'], request.get_json(silent=True))
+    except ValidationError as e:
+        return jsonify({'error': str(e)}), 400
+    except Backpressure as e:
+        # Mood entries already stored come back as duplicates when the client retries
+        response = jsonify({'error': str(e), 'retry_after': e.retry_after})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+
+    for kind, count in result['accepted'].items():
+        metrics.SYNC_ITEMS.inc(count, kind=kind, outcome='accepted')
+    metrics.SYNC_ITEMS.inc(len(result['duplicates']), kind='any', outcome='duplicate')
+    metrics.SYNC_ITEMS.inc(len(result['rejected']), kind='any', outcome='rejected')
+    return jsonify(result)
+
+@app.route('/api/likes/<target_type>/<int:target_id>', methods=['POST', 'DELETE'])
+def api_like(target_type, target_id):
+    if 'student_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    liked = request.method == 'POST'
+    try:
+        if liked:
+            likes = like_counter.like(session['student_id'], target_type, target_id)
+        else:
+            likes = like_counter.unlike(session['student_id'], target_type, target_id)
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    return jsonify({'liked': liked, 'likes': likes})
+
+@app.route('/api/forum/replies/<int:reply_id>/helpful', methods=['POST', 'DELETE'])
+def api_reply_helpful(reply_id):
+    if 'student_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    with use_primary(db):
+        reply = db.session.get(ForumReply, reply_id)
+        if reply is None:
+            return jsonify({'error': 'Reply not found'}), 404
+        # Only the author of the post decides which replies helped
+        if reply.post.student_id != session['student_id']:
+            return jsonify({'error': 'Only the post author can mark replies helpful'}), 403
+        helpful = request.method == 'POST'
+        ForumReply.query.filter_by(id=reply_id).update({'is_helpful': helpful})
+        db.session.commit()
+    return jsonify({'helpful': helpful})
+
 @app.route('/counselors')
 def counselors():
     counselors_list = Counselor.query.filter_by(is_available=True).order_by(Counselor.rating.desc()).all()
     return render_template('counselors.html', counselors=counselors_list)
 
-@app.route('/admin')
-def admin_dashboard():
-    if not session.get('is_admin'):
-        flash('Access denied. Admin login required.', 'error')
-        return redirect(url_for('login'))
-    
-    # Statistics
-    total_students = Student.query.filter_by(is_admin=False).count()
-    total_screenings = ScreeningResult.query.count()
-    high_risk_students = ScreeningResult.query.filter_by(risk_level='high').count()
-    crisis_incidents = CrisisIncident.query.filter_by(status='open').count()
-    total_chats = ChatConversation.query.count()
-    total_forum_posts = ForumPost.query.count()
-    
-    # Recent activities
-    recent_crises = CrisisIncident.query.filter_by(status='open').order_by(CrisisIncident.created_at.desc()).limit(10).all()
-    recent_screenings = ScreeningResult.query.order_by(ScreeningResult.created_at.desc()).limit(10).all()
-    
-    # Monthly trends (last 6 months)
-    monthly_data = []
-    for i in range(6):
-        month_start = datetime.utcnow().replace(day=1) - timedelta(days=30*i)
+def dashboard_stats(months):
+    """Admin dashboard numbers for the shard the session routes to"""
+    totals = {
+        'total_students': Student.query.filter_by(is_admin=False).count(),
+        'total_screenings': ScreeningResult.query.count(),
+        'high_risk_students': ScreeningResult.query.filter_by(risk_level='high').count(),
+        'crisis_incidents': CrisisIncident.query.filter_by(status='open').count(),
+        'total_chats': ChatConversation.query.count() + chat_archive.count(),
+        'total_forum_posts': ForumPost.query.count(),
+    }
+    
+    # Recent activities; rows leave the shard's session, so students are loaded with them
+    recent_crises = CrisisIncident.query.options(joinedload(CrisisIncident.student)).filter_by(
+        status='open').order_by(CrisisIncident.created_at.desc()).limit(10).all()
+    flagged_posts = ForumPost.query.filter_by(needs_review=True).order_by(ForumPost.created_at.desc()).limit(10).all()
+    recent_screenings = ScreeningResult.query.options(joinedload(ScreeningResult.student)).order_by(
+        ScreeningResult.created_at.desc()).limit(10).all()
+    
+    trends = []
+    for month_start in months:
         month_end = month_start + timedelta(days=30)
         
         screenings = ScreeningResult.query.filter(
@@ -832,24 +1461,132 @@ def admin_dashboard():
             CrisisIncident.created_at < month_end
         ).count()
         
-        monthly_data.append({
-            "month": month_start.strftime('%B %Y'),
-            "screenings": screenings,
-            "high_risk": high_risk,
-            "crisis_incidents": crisis_count
-        })
+        trends.append([screenings, high_risk, crisis_count])
+    
+    return {'totals': totals, 'trends': trends, 'recent_crises': recent_crises,
+            'flagged_posts': flagged_posts, 'recent_screenings': recent_screenings}
+
+@app.route('/admin')
+def admin_dashboard():
+    if not session.get('is_admin'):
+        flash('Access denied. Admin login required.', 'error')
+        return redirect(url_for('login'))
+    
+    # Every college shard is queried in parallel and the results are merged
+    now = datetime.utcnow()
+    months = [now.replace(day=1) - timedelta(days=30*i) for i in range(6)]
+    per_shard = fan_out.map(lambda: dashboard_stats(months))
+    for shard, stats in per_shard.items():
+        for crisis in stats['recent_crises']:
+            crisis.shard = shard  # the resolve form posts it back
+    totals = merge_sum({shard: stats['totals'] for shard, stats in per_shard.items()})
+    trends = merge_sum({shard: stats['trends'] for shard, stats in per_shard.items()})
+    newest = lambda row: row.created_at
+    recent_crises = merge_latest([stats['recent_crises'] for stats in per_shard.values()], newest, 10)
+    flagged_posts = merge_latest([stats['flagged_posts'] for stats in per_shard.values()], newest, 10)
+    recent_screenings = merge_latest([stats['recent_screenings'] for stats in per_shard.values()], newest, 10)
+    
+    # Monthly trends (last 6 months)
+    monthly_data = [{
+        "month": month_start.strftime('%B %Y'),
+        "screenings": screenings,
+        "high_risk": high_risk,
+        "crisis_incidents": crisis_count
+    } for month_start, (screenings, high_risk, crisis_count) in zip(months, trends)]
     
     return render_template('admin/dashboard.html',
-                         total_students=total_students,
-                         total_screenings=total_screenings,
-                         high_risk_students=high_risk_students,
-                         crisis_incidents=crisis_incidents,
-                         total_chats=total_chats,
-                         total_forum_posts=total_forum_posts,
+                         **totals,
                          recent_crises=recent_crises,
                          recent_screenings=recent_screenings,
+                         flagged_posts=flagged_posts,
                          monthly_trends=monthly_data[::-1])
 
+@app.route('/admin/crises/<int:incident_id>/resolve', methods=['POST'])
+def resolve_crisis(incident_id):
+    if not session.get('is_admin'):
+        flash('Access denied. Admin login required.', 'error')
+        return redirect(url_for('login'))
+    
+    shard = request.form.get('shard') or None
+    if shard is not None and shard not in COLLEGES:
+        flash('Unknown college', 'error')
+        return redirect(url_for('admin_dashboard'))
+    
+    with use_shard(db, shard), use_primary(db):
+        # Conditional, so a double submit frees the counselor's slot only once
+        resolved = CrisisIncident.query.filter_by(id=incident_id, status='open').update(
+            {'status': 'resolved', 'resolved_at': datetime.utcnow(), 'follow_up_date': None},
+            synchronize_session=False)
+        if resolved:
+            incident = db.session.query(CrisisIncident.student_id, CrisisIncident.counselor_id).filter_by(
+                id=incident_id).one()
+            # The slot is shared by the student's open incidents with this counselor
+            still_open = CrisisIncident.query.filter_by(
+                student_id=incident.student_id, counselor_id=incident.counselor_id, status='open').count()
+            if incident.counselor_id and not still_open:
+                counselor_scheduler.release(incident.counselor_id)
+        db.session.commit()
+    
+    flash('Crisis incident resolved' if resolved else 'Incident was already resolved', 'success' if resolved else 'info')
+    return redirect(url_for('admin_dashboard'))
+
+@app.route('/metrics')
+def metrics_endpoint():
+    token = os.getenv('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f"Bearer {token}":
+        return Response('Unauthorized', status=401)
+    return Response(metrics.registry.render(), mimetype=metrics.CONTENT_TYPE)
+
+@app.route('/admin/api/cohorts')
+def admin_cohorts_api():
+    if not session.get('is_admin'):
+        return jsonify({'error': 'Admin login required'}), 403
+
+    group_by = [d for d in request.args.get('group_by', '').split(',') if d]
+    unknown = [d for d in group_by if d not in DIMENSIONS]
+    if unknown:
+        return jsonify({'error': f"Unknown dimension {unknown[0]}", 'dimensions': DIMENSIONS}), 400
+    filters = {d: request.args[d] for d in DIMENSIONS if d in request.args and d != 'month'}
+    if 'hostel_resident' in filters:
+        filters['hostel_resident'] = filters['hostel_resident'].lower() in ('1', 'true', 'yes')
+
+    month_from = request.args.get('from') or request.args.get('month')
+    month_to = request.args.get('to') or request.args.get('month')
+
+    # Kept fresh by the refresh_rollups job
+    def shard_totals():
+        return cohort_cube.slice_totals(group_by, filters, month_from=month_from, month_to=month_to)
+
+    # Sums and counts add up across shards; means are derived after merging
+    cells = cohort_cells(group_by, merge_totals(fan_out.map(shard_totals).values()))
+    return jsonify({'group_by': group_by, 'filters': filters, 'cells': cells})
+
+@app.route('/admin/export/<dataset>')
+def admin_export(dataset):
+    if not session.get('is_admin'):
+        flash('Access denied. Admin login required.', 'error')
+        return redirect(url_for('login'))
+
+    fmt = request.args.get('format', 'csv')
+    anonymize = request.args.get('anonymize', '1') != '0'
+    college = request.args.get('college')
+    if college is not None and college not in COLLEGES:
+        return jsonify({'error': f"Unknown college {college}"}), 404
+    # One college's rows, or every database in one file when colleges are sharded
+    shards = [college] if college else (shard_keys(db) if COLLEGES else None)
+    try:
+        chunks = data_exporter.stream(dataset, fmt, anonymize, shards)
+    except KeyError:
+        return jsonify({'error': f"Unknown dataset {dataset}"}), 404
+    except (ValueError, RuntimeError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    mimetype, extension = FORMATS[fmt]
+    return Response(stream_with_context(chunks), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename="{dataset}.{extension}"',
+        'Cache-Control': 'no-store',
+    })
+
 import os
 import json
 import random
@@ -952,7 +1689,7 @@ def populate_sample_data():
     ]
     
     students = []
-    for data in students_data:
+    for data, anonymous_id in zip(students_data, anonymous_ids.allocate_many(len(students_data))):
         student = Student(
             name=data["name"],
             email=data["email"],
@@ -965,7 +1702,7 @@ def populate_sample_data():
             hostel_resident=random.choice([True, False]),
             phone=f"9{random.randint(100000000, 999999999)}",
             emergency_contact=f"9{random.randint(100000000, 999999999)}",
-            anonymous_id=f"Anonymous_{random.choice(['Panda', 'Tiger', 'Eagle', 'Phoenix', 'Lion', 'Butterfly', 'Lotus', 'Swan'])}_{random.randint(10, 99)}"
+            anonymous_id=anonymous_id
         )
         students.append(student)
         db.session.add(student)
@@ -1141,16 +1878,171 @@ def populate_sample_data():
     print(f"✅ Created {len(counselors_data)} counselors")
     print(f"✅ Created screening results, chat conversations, and mood data")
 
+@app.cli.command('archive-chats')
+@click.option('--older-than-days', type=int, default=lambda: int(os.getenv('CHAT_ARCHIVE_AFTER_DAYS', 180)),
+              help='Archive conversations older than this many days.')
+@click.option('--batch-size', type=int, default=1000, help='Rows moved per transaction.')
+def archive_chats_command(older_than_days, batch_size):
+    """Move old chat conversations into compressed archive segments"""
+    moved = sum(for_each_shard(
+        lambda: chat_archive.archive_older_than(days=older_than_days, batch_size=batch_size)).values())
+    print(f"✅ Archived {moved} conversations older than {older_than_days} days")
+
+@app.cli.command('replica-sync')
+def replica_sync_command():
+    """Copy the primary SQLite database into the SQLite replicas (local testing)"""
+    for path in sync_sqlite_replicas(db):
+        print(f"✅ Synced replica {path}")
+
+@app.cli.command('dispatch-crises')
+@click.option('--once', is_flag=True, help='Deliver one batch and exit.')
+def dispatch_crises_command(once):
+    """Deliver pending crisis notifications from the outbox"""
+    if once:
+        delivered = crisis_dispatcher.dispatch_all()
+        print(f"✅ Delivered {delivered} crisis notifications")
+        return
+    print("🚨 Crisis dispatcher running (Ctrl+C to stop)...")
+    try:
+        crisis_dispatcher.run_forever()
+    except KeyboardInterrupt:
+        crisis_dispatcher.stop()
+
+@app.cli.command('prerender-pages')
+def prerender_pages_command():
+    """Render the static game pages and their gzip/brotli variants into PRERENDER_DIR"""
+    sizes = prerendered_pages.build()
+    for key, size in sizes.items():
+        print(f"📄 {key}: {size} bytes")
+    print(f"✅ Pre-rendered {len(sizes)} pages into {prerendered_pages.artifact_dir}")
+
+@app.cli.command('refresh-rollups')
+def refresh_rollups_command():
+    """Fold new screenings, mood entries and crises into the cohort rollup"""
+    for shard, folded in for_each_shard(cohort_cube.refresh).items():
+        for source, count in folded.items():
+            print(f"📊 {COLLEGES.get(shard, 'main')} {source}: {count} new rows")
+    print("✅ Cohort rollup is up to date")
+
+@app.cli.command('replay-game-events')
+def replay_game_events_command():
+    """Fold game events left in the logs of stopped workers into session aggregates"""
+    replayed = game_events.recover()
+    print(f"✅ Replayed {replayed} game events")
+
+@app.cli.command('recommend-resources')
+@click.option('--chunk-size', type=int, default=500, help='Students scored per matrix product.')
+def recommend_resources_command(chunk_size):
+    """Recompute every student's ranked resource recommendations"""
+    refreshed = sum(for_each_shard(lambda: resource_recommender.refresh_all(chunk_size=chunk_size)).values())
+    print(f"✅ Refreshed recommendations for {refreshed} students")
+
+@app.cli.command('moderate-forum')
+def moderate_forum_command():
+    """Scan new forum posts and replies for crisis language"""
+    scanned = forum_moderator.scan()
+    for source, count in scanned.items():
+        print(f"🛡️ {source}: {count} scanned")
+    print(f"✅ {forum_moderator.flagged} flagged for review")
+
+@app.cli.command('run-jobs')
+@click.option('--processes', type=int, default=lambda: int(os.getenv('JOB_WORKERS', 1)),
+              help='Worker processes to keep running.')
+@click.option('--once', is_flag=True, help='Schedule periodic jobs, run everything due and exit.')
+def run_jobs_command(processes, once):
+    """Run queued and periodic background jobs"""
+    if once:
+        job_runner.schedule()
+        ran = job_runner.run_pending()
+        print(f"✅ Ran {ran} jobs ({job_runner.failed} failed)")
+        return
+    if processes > 1:
+        print(f"👷 Starting {processes} job worker processes (Ctrl+C to stop)...")
+        run_worker_processes(processes, worker_command('--processes', '1'))
+        return
+    print(f"👷 Job worker {job_runner.worker_id} running (Ctrl+C to stop)...")
+    try:
+        job_runner.run_forever()
+    except KeyboardInterrupt:
+        job_runner.stop()
+
+@app.cli.command('enqueue-job')
+@click.argument('job_type', type=click.Choice(sorted(job_runner.types)))
+@click.option('--college', type=click.Choice(sorted(COLLEGES)), default=None,
+              help='College shard to run against (default: the main database).')
+@click.option('--payload', default='{}', help='JSON keyword arguments for the job.')
+def enqueue_job_command(job_type, college, payload):
+    """Queue one job to run as soon as a worker is free"""
+    job_id = job_runner.enqueue_now(job_type, json.loads(payload), shard=college)
+    print(f"✅ Queued job #{job_id} {job_type}")
+
+@app.cli.command('job-status')
+def job_status_command():
+    """Count jobs by type, shard and status"""
+    for job_type, shard, status, count in job_runner.status():
+        print(f"{job_type:<22} {COLLEGES.get(shard, 'main'):<20} {status:<8} {count}")
+
+@app.cli.command('init-shards')
+def init_shards_command():
+    """Create the tables in every college shard and copy resources and counselors into empty ones"""
+    with use_primary(db):
+        resources = [{c.name: getattr(r, c.name) for c in Resource.__table__.columns} for r in Resource.query]
+        counselors = [{c.name: getattr(r, c.name) for c in Counselor.__table__.columns} for r in Counselor.query]
+    for shard in shard_keys(db)[1:]:
+        db.metadatas[None].create_all(db.engines[SHARD_PREFIX + shard])
+        with use_shard(db, shard):
+            if Resource.query.first() is None:
+                db.session.add_all([Resource(**row) for row in resources])
+            if Counselor.query.first() is None:
+                db.session.add_all([Counselor(**row) for row in counselors])
+            db.session.commit()
+        print(f"🏫 {COLLEGES[shard]}: ready")
+    print(f"✅ Initialized {len(COLLEGES)} college shards")
+
+@app.cli.command('export-data')
+@click.argument('dataset', type=click.Choice(sorted(data_exporter.datasets)))
+@click.option('--format', 'fmt', type=click.Choice(sorted(FORMATS)), default='csv')
+@click.option('--output', type=click.File('wb'), default='-', help='File to write (default: stdout).')
+@click.option('--anonymize/--no-anonymize', default=True, help='Replace student_id with anonymous_id.')
+@click.option('--college', type=click.Choice(sorted(COLLEGES)), default=None,
+              help='College shard to export (default: the main database).')
+def export_data_command(dataset, fmt, output, anonymize, college):
+    """Stream a whole table out as CSV, Parquet or Arrow"""
+    with use_shard(db, college):
+        for chunk in data_exporter.stream(dataset, fmt, anonymize):
+            output.write(chunk)
+
+@app.cli.command('check-exports')
+def check_exports_command():
+    """Export every dataset in every format from every database and read it back"""
+    # Each database on its own, as `export-data --college` reads it, then all of them as the admin route does
+    targets = [(COLLEGES.get(shard, 'main'), shard, None) for shard in shard_keys(db)]
+    targets.append(('all colleges', None, shard_keys(db)))
+    failed = 0
+    for label, shard, shards in targets:
+        for dataset in sorted(data_exporter.datasets):
+            for fmt in sorted(FORMATS):
+                try:
+                    with use_shard(db, shard):
+                        rows = data_exporter.check(dataset, fmt, anonymize=True, shards=shards)
+                    print(f"✅ {label} {dataset}.{fmt}: {rows} rows")
+                except Exception as e:
+                    failed += 1
+                    print(f"❌ {label} {dataset}.{fmt}: {e}")
+    if failed:
+        raise SystemExit(1)
+
 if __name__ == '__main__':
-    with app.app_context():
+    with app.app_context(), use_primary(db):
         db.create_all()
         populate_sample_data()
+        for_each_shard(response_templates.sync)
         
         print("\n🚀 Enhanced Mental Health Platform Starting...")
         print("📊 Admin Login: admin@college.edu / admin123")
         print("👤 Student Login: arjun@student.edu / password123")
         print("🔗 Platform URL: http://localhost:5000")
-        if GEMINI_AVAILABLE:
+        if get_model() is not None:
             print("✅ Gemini AI: Active")
         else:
             print("⚠️ Gemini AI: Using fallback responses")
@@ -1163,5 +2055,8 @@ if __name__ == '__main__':
         print("   • Professional Counselor Directory")
         print("   • Comprehensive Admin Dashboard")
         print("   • Mobile-Responsive Design")
-        
+
+    crisis_dispatcher.start()
+    forum_moderator.ensure_worker()
+    job_runner.start()
     app.run()
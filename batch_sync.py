@@ -0,0 +1,169 @@
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+GAME_EVENTS = ('start', 'end', 'score', 'complete', 'miss')
+MAX_CLIENT_ID = 36
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+MAX_OFFLINE_AGE = timedelta(days=30)
+
+
+class ValidationError(ValueError):
+    pass
+
+
+def _int(item, field, low, high, required=True):
+    value = item.get(field)
+    if value is None and not required:
+        return None
+    # json.loads accepts NaN and Infinity, which int() can't convert
+    if (isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value)
+            or int(value) != value):
+        raise ValidationError(f"{field} must be an integer")
+    if not low <= value <= high:
+        raise ValidationError(f"{field} must be between {low} and {high}")
+    return int(value)
+
+
+def _float(item, field, low, high):
+    value = item.get(field)
+    if value is None:
+        return None
+    if (isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value)
+            or not low <= value <= high):
+        raise ValidationError(f"{field} must be a number between {low} and {high}")
+    return float(value)
+
+
+def _timestamp(item, field, now):
+    value = item.get(field)
+    if value is None:
+        return now
+    try:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        raise ValidationError(f"{field} must be an ISO 8601 timestamp")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)  # stored naive UTC like everything else
+    if not now - MAX_OFFLINE_AGE <= parsed <= now + MAX_CLOCK_SKEW:
+        raise ValidationError(f"{field} is too far from the server time")
+    return min(parsed, now)
+
+
+def _client_id(item, field='client_id'):
+    value = item.get(field)
+    if not isinstance(value, str) or not 0 < len(value) <= MAX_CLIENT_ID:
+        raise ValidationError(f"{field} must be a string of up to {MAX_CLIENT_ID} characters")
+    return value
+
+
+def mood_row(item, now):
+    notes = item.get('notes') or ''
+    if not isinstance(notes, str) or len(notes) > 1000:
+        raise ValidationError("notes must be text of up to 1000 characters")
+    return {
+        'client_id': _client_id(item),
+        'mood_score': _int(item, 'mood_score', 1, 10),
+        'energy_level': _int(item, 'energy_level', 1, 10),
+        'stress_level': _int(item, 'stress_level', 1, 10),
+        'sleep_hours': _float(item, 'sleep_hours', 0, 24) or 0.0,
+        'notes': notes,
+        'created_at': _timestamp(item, 'recorded_at', now),
+    }
+
+
+def game_event_row(item, now, games):
+    if item.get('game') not in games:
+        raise ValidationError("unknown game")
+    if item.get('event') not in GAME_EVENTS:
+        raise ValidationError(f"event must be one of {', '.join(GAME_EVENTS)}")
+    return {
+        'client_id': _client_id(item),
+        'session_id': _client_id(item, 'session_id'),
+        'game': item['game'],
+        'event': item['event'],
+        'duration_seconds': _float(item, 'duration_seconds', 0, 86400),
+        'score': _int(item, 'score', -10**9, 10**9, required=False),
+        'occurred_at': _timestamp(item, 'occurred_at', now),
+    }
+
+
+class BatchSync:
+    """Ingests batches of mood entries and game events queued by offline clients.
+
+    Every item carries a client-generated client_id, unique per student, so
+    a client can resend a batch after a dropped connection: items already
+    stored are reported as duplicates instead of being inserted twice.
+    Invalid items are rejected individually and the rest of each kind goes
+    in with a single executemany INSERT, or to the kind's sink when it has
+    one (game events are buffered by GameEventPipeline).
+    """
+
+    def __init__(self, db, kinds: Dict[str, Tuple[object, object]], sinks=None, max_items=500):
+        self.db = db
+        # kind -> (model, row builder(item, now))
+        self.kinds = kinds
+        # kind -> sink(student_id, rows) returning (inserted, duplicate) client ids
+        self.sinks = sinks or {}
+        self.max_items = max_items
+
+    def _existing(self, Model, student_id, client_ids) -> set:
+        found = set()
+        client_ids = list(client_ids)
+        for i in range(0, len(client_ids), 500):
+            found.update(cid for (cid,) in self.db.session.query(Model.client_id).filter(
+                Model.student_id == student_id, Model.client_id.in_(client_ids[i:i + 500])))
+        return found
+
+    def _insert(self, Model, student_id, rows) -> Tuple[List[str], List[str]]:
+        """Insert rows not stored yet; returns (inserted, duplicate) client ids"""
+        for attempt in range(2):
+            existing = self._existing(Model, student_id, {row['client_id'] for row in rows})
+            fresh, seen = [], set(existing)
+            for row in rows:
+                if row['client_id'] not in seen:
+                    seen.add(row['client_id'])
+                    fresh.append(dict(row, student_id=student_id))
+            try:
+                if fresh:
+                    self.db.session.execute(insert(Model), fresh)
+                self.db.session.commit()
+            except IntegrityError:
+                # A concurrent retry of the same batch won the race; what it stored is now a duplicate
+                self.db.session.rollback()
+                if attempt:
+                    raise
+                continue
+            inserted = [row['client_id'] for row in fresh]
+            return inserted, sorted({row['client_id'] for row in rows} - set(inserted))
+
+    def ingest(self, student_id, payload) -> dict:
+        if not isinstance(payload, dict):
+            raise ValidationError("Expected a JSON object")
+        batches = {kind: payload.get(kind) or [] for kind in self.kinds}
+        if any(not isinstance(items, list) for items in batches.values()):
+            raise ValidationError(f"{', '.join(self.kinds)} must be arrays")
+        if sum(len(items) for items in batches.values()) > self.max_items:
+            raise ValidationError(f"At most {self.max_items} items per sync")
+
+        now = datetime.utcnow()
+        result = {'accepted': {}, 'duplicates': [], 'rejected': []}
+        for kind, items in batches.items():
+            Model, build = self.kinds[kind]
+            rows = []
+            for index, item in enumerate(items):
+                try:
+                    if not isinstance(item, dict):
+                        raise ValidationError("Expected an object")
+                    rows.append(build(item, now))
+                except ValidationError as e:
+                    client_id = item.get('client_id') if isinstance(item, dict) else None
+                    result['rejected'].append({'kind': kind, 'index': index, 'client_id': client_id, 'error': str(e)})
+            sink = self.sinks.get(kind) or (lambda student_id, rows: self._insert(Model, student_id, rows))
+            inserted, duplicates = sink(student_id, rows) if rows else ([], [])
+            result['accepted'][kind] = len(inserted)
+            result['duplicates'].extend(duplicates)
+        return result
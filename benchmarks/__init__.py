@@ -0,0 +1 @@
+"""Performance benchmarks for the platform (run with python -m benchmarks.<name>)"""
@@ -0,0 +1,127 @@
+"""Benchmark suite for the hot routes.
+
+    python -m benchmarks run --scale small --requests 200
+    python -m benchmarks run --mode server --workers 4 --concurrency 16
+    python -m benchmarks compare benchmarks/results/abc123.json benchmarks/results/def456.json
+
+Results are written as JSON (default benchmarks/results/<git sha>.json) so
+runs from different commits can be diffed.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run(args):
+    from benchmarks.harness import SCENARIOS
+
+    scenarios = args.scenarios.split(',') if args.scenarios else list(SCENARIOS)
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        sys.exit(f"Unknown scenarios: {', '.join(unknown)}")
+
+    # The app reads DATABASE_URL at import time
+    workdir = tempfile.mkdtemp(prefix='zenithra-bench-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    # One benchmark account sends every chat message
+    os.environ.setdefault('CHAT_RATE_PER_MINUTE', '0')
+    import app as app_module
+    from benchmarks.dataset import seed
+    from benchmarks.harness import install_fake_model, run_client, run_server
+
+    with app_module.app.app_context():
+        app_module.db.create_all()
+        counts = seed(app_module, args.scale)
+    install_fake_model(app_module, args.model_latency_ms / 1000)
+    print(f"Seeded {counts} into {workdir}")
+
+    if args.mode == 'client':
+        results = run_client(app_module, scenarios, args.requests)
+    else:
+        results = run_server(app_module, scenarios, args.requests, args.workers, args.concurrency)
+
+    report = {
+        'revision': _git_revision(),
+        'created_at': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'mode': args.mode,
+        'scale': args.scale,
+        'dataset': counts,
+        'settings': {k: v for k, v in vars(args).items() if k not in ('func', 'output')},
+        'results': results,
+    }
+
+    output = args.output or os.path.join(ROOT, 'benchmarks', 'results', f"{report['revision']}-{args.mode}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n{'scenario':<18}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}{'errors':>8}")
+    for name, r in results.items():
+        queries = f"{r['queries_per_request']:.1f}" if 'queries_per_request' in r else '-'
+        print(f"{name:<18}{r['throughput_rps']:>9.1f}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}"
+              f"{r['p99_ms']:>9.1f}{queries:>9}{r['errors']:>8}")
+    print(f"\n📊 Results saved to {output}")
+
+
+def compare(args):
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding='utf-8') as f:
+        candidate = json.load(f)
+
+    print(f"{baseline['revision']} -> {candidate['revision']}")
+    print(f"{'scenario':<18}{'metric':<22}{'before':>10}{'after':>10}{'change':>9}")
+    for name, after in candidate['results'].items():
+        before = baseline['results'].get(name)
+        if not before:
+            continue
+        for metric in ('throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms', 'queries_per_request'):
+            if metric not in before or metric not in after:
+                continue
+            change = (after[metric] - before[metric]) / before[metric] * 100 if before[metric] else 0.0
+            print(f"{name:<18}{metric:<22}{before[metric]:>10.1f}{after[metric]:>10.1f}{change:>8.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Seed a dataset and benchmark the hot routes')
+    run_parser.add_argument('--mode', choices=['client', 'server'], default='client')
+    run_parser.add_argument('--scale', choices=['small', 'medium', 'large'], default='small')
+    run_parser.add_argument('--requests', type=int, default=200, help='Requests per scenario')
+    run_parser.add_argument('--scenarios', default='', help='Comma separated subset of scenarios')
+    run_parser.add_argument('--workers', type=int, default=4, help='Server processes (server mode)')
+    run_parser.add_argument('--concurrency', type=int, default=16, help='Concurrent clients (server mode)')
+    run_parser.add_argument('--model-latency-ms', type=float, default=50, help='Fake Gemini latency')
+    run_parser.add_argument('--output', help='Where to write the JSON report')
+    run_parser.set_defaults(func=run)
+
+    compare_parser = commands.add_parser('compare', help='Diff two JSON reports')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('candidate')
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
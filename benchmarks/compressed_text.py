@@ -0,0 +1,98 @@
+"""Compare storage size and read/write latency of plain Text vs CompressedText.
+
+Usage: python -m benchmarks.compressed_text --rows 20000
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+import sqlalchemy as sa
+
+from compressed_text import ZSTD_AVAILABLE, CompressedText
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def build_corpus(rows, rng):
+    """Chat-like rows: recombined lines from the bundled sample conversations"""
+    with open(os.path.join(ROOT, 'data', 'conversations.json'), encoding='utf-8') as f:
+        conversations = json.load(f)
+    lines = [line for c in conversations for line in c['bot_response'].split('\n') if line.strip()]
+    questions = [c['user_message'] for c in conversations]
+
+    corpus = []
+    for i in range(rows):
+        # Gemini-style replies reuse the same phrases in a different order
+        reply = '\n'.join(rng.sample(lines, rng.randint(4, 9)))
+        question = f"{rng.choice(questions)} ({rng.randint(1, 1000)})"
+        corpus.append((question, reply))
+    return corpus
+
+
+def run(label, column_type, corpus, workdir):
+    path = os.path.join(workdir, f"{label}.db")
+    engine = sa.create_engine(f"sqlite:///{path}")
+    metadata = sa.MetaData()
+    table = sa.Table('chat_conversation', metadata,
+                     sa.Column('id', sa.Integer, primary_key=True),
+                     sa.Column('user_message', column_type, nullable=False),
+                     sa.Column('bot_response', column_type, nullable=False),
+                     sa.Column('crisis_detected', sa.Boolean, default=False))
+    metadata.create_all(engine)
+
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        conn.execute(table.insert(), [{'user_message': q, 'bot_response': r} for q, r in corpus])
+    write_seconds = time.perf_counter() - started
+
+    with engine.connect() as conn:
+        conn.exec_driver_sql('VACUUM')
+
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        rows = conn.execute(sa.select(table)).fetchall()
+        flagged = sum(1 for row in rows if row.crisis_detected)  # text never touched
+    scan_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        total_chars = sum(len(str(row.bot_response)) + len(str(row.user_message))
+                          for row in conn.execute(sa.select(table)))
+    read_seconds = time.perf_counter() - started
+    engine.dispose()
+
+    return {
+        'label': label,
+        'db_bytes': os.path.getsize(path),
+        'write_ms': write_seconds * 1000,
+        'scan_ms': scan_seconds * 1000,
+        'read_ms': read_seconds * 1000,
+        'chars': total_chars + flagged,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.rows, random.Random(args.seed))
+    workdir = tempfile.mkdtemp(prefix='zenithra-bench-')
+    variants = [('text', sa.Text()), ('zlib', CompressedText('zlib'))]
+    if ZSTD_AVAILABLE:
+        variants.append(('zstd', CompressedText('zstd')))
+
+    results = [run(label, column_type, corpus, workdir) for label, column_type in variants]
+    baseline = results[0]['db_bytes']
+    print(f"{'column':<8}{'db size':>12}{'ratio':>8}{'write':>12}{'scan':>12}{'read':>12}")
+    for r in results:
+        print(f"{r['label']:<8}{r['db_bytes'] / 1024:>10.0f}KB{r['db_bytes'] / baseline:>8.2f}"
+              f"{r['write_ms']:>10.0f}ms{r['scan_ms']:>10.0f}ms{r['read_ms']:>10.0f}ms")
+
+
+if __name__ == '__main__':
+    main()
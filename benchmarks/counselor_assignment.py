@@ -0,0 +1,92 @@
+"""Simulate peak crisis load against CounselorScheduler.
+
+Usage: python -m benchmarks.counselor_assignment --counselors 300 --incidents 5000 --threads 4
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+LANGUAGES = ['Hindi', 'English', 'Punjabi', 'Bengali', 'Tamil', 'Telugu', 'Marathi']
+SPECIALIZATIONS = ['Depression', 'Anxiety', 'Academic Stress', 'Relationships', 'Trauma', 'Crisis Intervention']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--counselors', type=int, default=300)
+    parser.add_argument('--incidents', type=int, default=5000)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    workdir = tempfile.mkdtemp(prefix='zenithra-bench-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    from app import app, db, Counselor
+    from counselor_scheduler import CounselorScheduler
+
+    with app.app_context():
+        db.create_all()
+        for i in range(args.counselors):
+            db.session.add(Counselor(
+                name=f"Counselor {i}",
+                designation='Counselor',
+                specialization=', '.join(rng.sample(SPECIALIZATIONS, rng.randint(1, 3))),
+                languages=', '.join(['English'] + rng.sample(LANGUAGES[2:], rng.randint(0, 2)) +
+                                    (['Hindi'] if rng.random() < 0.7 else [])),
+                phone='0000000000',
+                email=f"c{i}@college.edu",
+                office_location='Campus',
+                availability='24/7',
+                current_caseload=rng.randint(0, 10),
+                max_capacity=rng.randint(30, 80)
+            ))
+        db.session.commit()
+
+    scheduler = CounselorScheduler(db, Counselor)
+    per_thread = args.incidents // args.threads
+    latencies, unassigned = [], []
+    lock = threading.Lock()
+
+    def worker(seed):
+        local_rng = random.Random(seed)
+        local_latencies, misses = [], 0
+        with app.app_context():
+            for _ in range(per_thread):
+                language = local_rng.choice(['hi', 'en', 'Tamil', 'Bengali'])
+                specialization = local_rng.choice(SPECIALIZATIONS + [None])
+                started = time.perf_counter()
+                if scheduler.assign(language=language, specialization=specialization) is None:
+                    misses += 1
+                db.session.commit()
+                local_latencies.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(local_latencies)
+            unassigned.append(misses)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(args.seed + i,)) for i in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        ratios = [c.current_caseload / c.max_capacity for c in Counselor.query.all()]
+
+    latencies.sort()
+    print(f"Counselors: {args.counselors}, incidents: {len(latencies)}, threads: {args.threads}")
+    print(f"Throughput: {len(latencies) / elapsed:.0f} assignments/s")
+    print(f"Latency p50: {latencies[len(latencies) // 2] * 1000:.2f} ms, "
+          f"p99: {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms")
+    print(f"Unassigned: {sum(unassigned)}")
+    print(f"Load ratio min/mean/max: {min(ratios):.3f} / {statistics.mean(ratios):.3f} / {max(ratios):.3f}, "
+          f"stdev {statistics.pstdev(ratios):.4f}")
+
+
+if __name__ == '__main__':
+    main()
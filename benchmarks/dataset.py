@@ -0,0 +1,100 @@
+"""Seed a synthetic dataset of configurable size for the benchmark suite"""
+import random
+from datetime import datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+SCALES = {
+    # students, conversations per student, forum posts, resources
+    'small': (200, 20, 500, 100),
+    'medium': (2000, 50, 5000, 500),
+    'large': (20000, 100, 50000, 2000),
+}
+
+BENCH_PASSWORD = 'bench123'
+STUDENT_EMAIL = 'student0@bench.edu'
+ADMIN_EMAIL = 'admin@bench.edu'
+
+BRANCHES = ['Computer Science', 'Mechanical Engineering', 'Electronics', 'Civil Engineering', 'Biotechnology']
+YEARS = ['First Year', 'Second Year', 'Third Year', 'Final Year']
+RESOURCE_CATEGORIES = ['Academic Stress', 'Anxiety', 'Depression', 'Social Anxiety', 'Sleep Issues', 'Self-Care']
+FORUM_CATEGORIES = ['General', 'Academic', 'Social', 'Mental Health', 'Career']
+
+
+def _bulk(db, model, rows, chunk=5000):
+    for start in range(0, len(rows), chunk):
+        db.session.execute(db.insert(model), rows[start:start + chunk])
+    db.session.commit()
+
+
+def seed(app_module, scale='small', seed=42):
+    """Populate an empty database through bulk inserts, returns row counts"""
+    db = app_module.db
+    rng = random.Random(seed)
+    students, conversations_each, posts, resources = SCALES[scale]
+    now = datetime.utcnow()
+    # Hashing is deliberately slow, every benchmark account shares one hash
+    password_hash = generate_password_hash(BENCH_PASSWORD)
+
+    student_rows = [{
+        'name': 'Bench Admin', 'email': ADMIN_EMAIL, 'password_hash': password_hash, 'year': 'Staff',
+        'branch': 'Administration', 'age': 30, 'anonymous_id': 'Bench_Admin', 'is_admin': True,
+    }]
+    for i in range(students):
+        student_rows.append({
+            'name': f"Student {i}", 'email': f"student{i}@bench.edu", 'password_hash': password_hash,
+            'year': rng.choice(YEARS), 'branch': rng.choice(BRANCHES), 'age': rng.randint(17, 24),
+            'hostel_resident': rng.random() < 0.5, 'anonymous_id': f"Bench_{i}",
+            'created_at': now - timedelta(days=rng.randint(0, 365)),
+        })
+    _bulk(db, app_module.Student, student_rows)
+    student_ids = [row.id for row in app_module.Student.query.filter_by(is_admin=False).with_entities(
+        app_module.Student.id)]
+
+    responses = list(app_module.FALLBACK_RESPONSES.values())
+    conversation_rows = [{
+        'student_id': student_id, 'user_message': f"exam stress message {n}",
+        'bot_response': rng.choice(responses), 'response_time': rng.random(),
+        'timestamp': now - timedelta(minutes=rng.randint(0, 60 * 24 * 60)),
+    } for student_id in student_ids for n in range(conversations_each)]
+    _bulk(db, app_module.ChatConversation, conversation_rows)
+
+    _bulk(db, app_module.ForumPost, [{
+        'student_id': rng.choice(student_ids), 'title': f"Forum post {i} about exam stress",
+        'content': 'परीक्षा का तनाव और नींद नहीं आती। ' * 5, 'category': rng.choice(FORUM_CATEGORIES),
+        'anonymous_id': f"Bench_{i % students}", 'views': rng.randint(0, 500), 'likes': rng.randint(0, 50),
+        'created_at': now - timedelta(days=rng.randint(0, 365)),
+    } for i in range(posts)])
+
+    _bulk(db, app_module.Resource, [{
+        'title': f"{rng.choice(['Stress', 'Sleep', 'Mindfulness', 'Study'])} guide {i}",
+        'description': 'Practical tips for students (छात्रों के लिए सुझाव)', 'category': rng.choice(RESOURCE_CATEGORIES),
+        'resource_type': rng.choice(['video', 'article', 'audio']), 'url': f"https://example.com/r/{i}",
+        'views': rng.randint(0, 5000), 'likes': rng.randint(0, 500), 'is_featured': rng.random() < 0.05,
+    } for i in range(resources)])
+
+    _bulk(db, app_module.ScreeningResult, [{
+        'student_id': student_id, 'phq9_score': rng.randint(0, 27), 'gad7_score': rng.randint(0, 21),
+        'phq9_responses': '[]', 'gad7_responses': '[]', 'phq9_category': 'Mild Depression',
+        'gad7_category': 'Mild Anxiety', 'risk_level': rng.choice(['low', 'moderate', 'high']),
+        'recommendations': '', 'created_at': now - timedelta(days=rng.randint(0, 180)),
+    } for student_id in student_ids])
+
+    _bulk(db, app_module.MoodTracker, [{
+        'student_id': student_id, 'mood_score': rng.randint(1, 10), 'energy_level': rng.randint(1, 10),
+        'stress_level': rng.randint(1, 10), 'sleep_hours': rng.uniform(4, 9),
+        'created_at': now - timedelta(days=rng.randint(0, 90)),
+    } for student_id in student_ids for _ in range(5)])
+
+    _bulk(db, app_module.Counselor, [{
+        'name': f"Counselor {i}", 'designation': 'Counselor', 'specialization': 'Depression, Anxiety',
+        'languages': 'Hindi, English', 'phone': '0000000000', 'email': f"c{i}@bench.edu",
+        'office_location': 'Campus', 'availability': '24/7', 'max_capacity': 100000,
+    } for i in range(20)])
+
+    return {
+        'students': students,
+        'conversations': len(conversation_rows),
+        'forum_posts': posts,
+        'resources': resources,
+    }
@@ -0,0 +1,95 @@
+"""Latency of normal students while one student floods the chat.
+
+Compares a plain FIFO semaphore around the Gemini call with FairScheduler.
+The abuser keeps --abuser-threads requests in flight; normal students send
+one message at a time. Gemini is simulated with a fixed --latency-ms.
+
+Usage: python -m benchmarks.fair_scheduling --slots 4 --abuser-threads 32 --normal-students 8
+"""
+import argparse
+import statistics
+import threading
+import time
+
+from rate_limiter import FairScheduler
+
+
+class FifoSlots:
+    """What a bounded worker pool does without fairness"""
+
+    def __init__(self, slots):
+        self._semaphore = threading.BoundedSemaphore(slots)
+
+    def acquire(self, student_id, priority=False, timeout=10.0):
+        return self._semaphore.acquire(timeout=timeout)
+
+    def release(self):
+        self._semaphore.release()
+
+
+def run(label, scheduler, args):
+    stop = threading.Event()
+    latencies, timeouts = [], [0]
+    lock = threading.Lock()
+
+    def call(student_id):
+        started = time.perf_counter()
+        if not scheduler.acquire(student_id, timeout=args.timeout):
+            return None
+        try:
+            time.sleep(args.latency_ms / 1000)
+        finally:
+            scheduler.release()
+        return time.perf_counter() - started
+
+    def abuser():
+        while not stop.is_set():
+            if call('abuser') is None:
+                time.sleep(0.01)  # rejected, retry like a script would
+
+    def normal(student_id):
+        for _ in range(args.messages):
+            duration = call(student_id)
+            with lock:
+                if duration is None:
+                    timeouts[0] += 1
+                else:
+                    latencies.append(duration)
+
+    abusers = [threading.Thread(target=abuser, daemon=True) for _ in range(args.abuser_threads)]
+    for thread in abusers:
+        thread.start()
+    time.sleep(0.2)  # let the abuser fill the queue first
+
+    normals = [threading.Thread(target=normal, args=(f"student{i}",)) for i in range(args.normal_students)]
+    for thread in normals:
+        thread.start()
+    for thread in normals:
+        thread.join()
+    stop.set()
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000 if latencies else float('nan')
+    median = statistics.median(latencies) * 1000 if latencies else float('nan')
+    print(f"{label:<16} normal students: p50 {median:7.0f}ms  p99 {p99:7.0f}ms  timeouts {timeouts[0]}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--slots', type=int, default=4)
+    parser.add_argument('--abuser-threads', type=int, default=32)
+    parser.add_argument('--normal-students', type=int, default=8)
+    parser.add_argument('--messages', type=int, default=5, help='Messages per normal student')
+    parser.add_argument('--latency-ms', type=float, default=100)
+    parser.add_argument('--timeout', type=float, default=5)
+    args = parser.parse_args()
+
+    print(f"Gemini slots: {args.slots}, abuser threads: {args.abuser_threads}, "
+          f"normal students: {args.normal_students}, latency: {args.latency_ms:.0f}ms\n", flush=True)
+    run('FIFO', FifoSlots(args.slots), args)
+    # The abuser's extra requests are rejected instead of queued, like the rate limited app
+    run('FairScheduler', FairScheduler(args.slots), args)
+
+
+if __name__ == '__main__':
+    main()
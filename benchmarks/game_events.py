@@ -0,0 +1,95 @@
+"""Game event ingestion: one committed write per event vs. the buffered pipeline.
+
+Threads play as different students and each reports --events-per-thread
+'complete' events. The direct mode commits one row per event, as naive
+per-interaction writes would; the pipeline mode goes through
+GameEventPipeline.ingest() and waits for the flusher to drain the buffer.
+
+Usage: python -m benchmarks.game_events --threads 8 --events-per-thread 500
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+
+def event(i, session_id):
+    return {'client_id': f"{session_id}-{i}", 'session_id': session_id, 'game': 'stress_ball_squeeze',
+            'event': 'complete', 'duration_seconds': None, 'score': None, 'occurred_at': datetime.utcnow()}
+
+
+def run_threads(args, work):
+    threads = [threading.Thread(target=work, args=(t,)) for t in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--events-per-thread', type=int, default=500)
+    parser.add_argument('--batch', type=int, default=20, help='Events per ingest() call, like one /api/sync')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='zenithra-bench-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ['GAME_EVENT_LOG_DIR'] = os.path.join(workdir, 'game_events')
+    import app as app_module
+    app, db = app_module.app, app_module.db
+    with app.app_context():
+        db.create_all()
+        students = []
+        for t in range(args.threads):
+            student = app_module.Student(name=f"Bench {t}", email=f"bench{t}@bench.edu", password_hash='x',
+                                         year='First Year', branch='Bench', age=19)
+            db.session.add(student)
+            students.append(student)
+        db.session.commit()
+        student_ids = [s.id for s in students]
+    total = args.threads * args.events_per_thread
+
+    def direct(t):
+        # What per-interaction writes cost: one UPDATE and commit per event
+        with app.app_context():
+            Aggregate = app_module.GameSessionAggregate
+            row = Aggregate(student_id=student_ids[t], session_id=f"direct-{t}", game='stress_ball_squeeze',
+                            events=0, completions=0, current_streak=0, best_streak=0, duration_seconds=0.0)
+            db.session.add(row)
+            db.session.commit()
+            for _ in range(args.events_per_thread):
+                row.events += 1
+                row.completions += 1
+                db.session.commit()
+            db.session.remove()
+
+    elapsed = run_threads(args, direct)
+    print(f"direct    {total} events in {elapsed:6.2f}s  {total / elapsed:9.0f} events/s", flush=True)
+
+    pipeline = app_module.game_events
+
+    def buffered(t):
+        session_id = f"pipeline-{t}"
+        for start in range(0, args.events_per_thread, args.batch):
+            rows = [event(i, session_id) for i in range(start, min(start + args.batch, args.events_per_thread))]
+            pipeline.ingest(student_ids[t], rows)
+
+    started = time.perf_counter()
+    ingest = run_threads(args, buffered)
+    while pipeline.depth():
+        time.sleep(0.01)
+    drained = time.perf_counter() - started
+    with app.app_context():
+        Aggregate = app_module.GameSessionAggregate
+        stored = sum(a.events for a in Aggregate.query.filter(Aggregate.session_id.like('pipeline-%')))
+    print(f"pipeline  {total} events in {ingest:6.2f}s  {total / ingest:9.0f} events/s accepted, "
+          f"all {stored} folded into {args.threads} session rows after {drained:.2f}s", flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+"""Drive the hot routes through the Flask test client or a real multi-worker server"""
+import http.cookiejar
+import json
+import multiprocessing
+import random
+import socket
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import event
+
+from benchmarks.dataset import ADMIN_EMAIL, BENCH_PASSWORD, STUDENT_EMAIL
+
+MESSAGES = [
+    'I am stressed about my exams', 'I feel lonely in the hostel', 'I miss my family and home',
+    'How do I manage my time better?', 'परीक्षा की वजह से नींद नहीं आती',
+]
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """Stands in for the Gemini model with a fixed upstream latency"""
+
+    def __init__(self, latency=0.05):
+        self.latency = latency
+
+    def generate_content(self, prompt):
+        time.sleep(self.latency)
+        return FakeResponse('आप अकेले नहीं हैं। Take a short break and breathe deeply.')
+
+
+def install_fake_model(app_module, latency):
+    app_module.model = FakeModel(latency)
+    app_module.GEMINI_AVAILABLE = True
+
+
+def _screening_form(rng):
+    form = {f"phq9_{i}": str(rng.randint(0, 2)) for i in range(1, 10)}
+    form.update({f"gad7_{i}": str(rng.randint(0, 2)) for i in range(1, 8)})
+    return form
+
+
+# name -> (role, method, path, body builder); body is ('json', dict) or ('form', dict)
+SCENARIOS = {
+    'send_message': ('student', 'POST', '/send_message', lambda rng: ('json', {'message': rng.choice(MESSAGES)})),
+    'chat': ('student', 'GET', '/chat', None),
+    'forum': ('anonymous', 'GET', '/forum', None),
+    'resources_search': ('anonymous', 'GET', '/resources?search=Stress', None),
+    'admin': ('admin', 'GET', '/admin', None),
+    'submit_screening': ('student', 'POST', '/submit_screening', lambda rng: ('form', _screening_form(rng))),
+    'submit_mood': ('student', 'POST', '/submit_mood', lambda rng: ('form', {
+        'mood_score': str(rng.randint(1, 10)), 'energy_level': str(rng.randint(1, 10)),
+        'stress_level': str(rng.randint(1, 10)), 'sleep_hours': '7', 'notes': 'bench'})),
+}
+
+CREDENTIALS = {'student': STUDENT_EMAIL, 'admin': ADMIN_EMAIL}
+
+
+def summarize(latencies, errors, elapsed, queries=None):
+    latencies = sorted(latencies)
+
+    def pct(p):
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    result = {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': pct(0.50),
+        'p95_ms': pct(0.95),
+        'p99_ms': pct(0.99),
+    }
+    if queries is not None:
+        result['queries_per_request'] = sum(queries) / len(queries) if queries else 0.0
+    return result
+
+
+class QueryCounter:
+    """Counts SQL statements executed by the app's engines"""
+
+    def __init__(self, engines):
+        self.count = 0
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', self._increment)
+
+    def _increment(self, *args):
+        self.count += 1
+
+
+def run_client(app_module, scenarios, requests, warmup=5, seed=42):
+    """Sequential requests through the Flask test client, with query counts"""
+    app = app_module.app
+    rng = random.Random(seed)
+    with app.app_context():
+        counter = QueryCounter(app_module.db.engines.values())
+
+    clients = {'anonymous': app.test_client()}
+    for role, email in CREDENTIALS.items():
+        clients[role] = app.test_client()
+        clients[role].post('/login', data={'email': email, 'password': BENCH_PASSWORD})
+
+    results = {}
+    for name in scenarios:
+        role, method, path, body = SCENARIOS[name]
+        client = clients[role]
+        latencies, queries, errors = [], [], 0
+        for i in range(warmup + requests):
+            kwargs = {}
+            if body:
+                kind, payload = body(rng)
+                kwargs = {'json': payload} if kind == 'json' else {'data': payload}
+            before = counter.count
+            started = time.perf_counter()
+            response = client.open(path, method=method, **kwargs)
+            duration = time.perf_counter() - started
+            if i < warmup:
+                continue
+            if response.status_code >= 400:
+                errors += 1
+            latencies.append(duration)
+            queries.append(counter.count - before)
+        results[name] = summarize(latencies, errors, sum(latencies), queries)
+    return results
+
+
+def _serve(app, sock):
+    from werkzeug.serving import make_server
+    server = make_server('127.0.0.1', 0, app, threaded=True, fd=sock.fileno())
+    server.serve_forever()
+
+
+def start_server(app_module, workers):
+    """Pre-fork `workers` processes that accept on one shared listening socket"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(('127.0.0.1', 0))
+    sock.listen(512)
+    sock.set_inheritable(True)
+
+    # Connections opened while seeding must not be shared with the children
+    with app_module.app.app_context():
+        for engine in app_module.db.engines.values():
+            engine.dispose()
+
+    context = multiprocessing.get_context('fork')
+    processes = [context.Process(target=_serve, args=(app_module.app, sock), daemon=True) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    return sock.getsockname()[1], processes
+
+
+class _HttpClient:
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def open(self, path, method='GET', form=None, json_body=None):
+        data, headers = None, {}
+        if json_body is not None:
+            data = json.dumps(json_body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        elif form is not None:
+            data = urllib.parse.urlencode(form).encode('utf-8')
+        request = urllib.request.Request(self.base_url + path, data=data, method=method, headers=headers)
+        try:
+            with self.opener.open(request, timeout=30) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+
+def run_server(app_module, scenarios, requests, workers=4, concurrency=16, seed=42):
+    """Concurrent HTTP load against a pre-forked server"""
+    port, processes = start_server(app_module, workers)
+    base_url = f"http://127.0.0.1:{port}"
+    time.sleep(0.5)
+
+    local = threading.local()
+
+    def client_for(role):
+        if not hasattr(local, 'clients'):
+            local.clients = {}
+        if role not in local.clients:
+            client = _HttpClient(base_url)
+            if role in CREDENTIALS:
+                client.open('/login', 'POST', form={'email': CREDENTIALS[role], 'password': BENCH_PASSWORD})
+            local.clients[role] = client
+        return local.clients[role]
+
+    results = {}
+    try:
+        for name in scenarios:
+            role, method, path, body = SCENARIOS[name]
+
+            def one(i, role=role, method=method, path=path, body=body):
+                rng = random.Random(seed + i)
+                client = client_for(role)
+                kwargs = {}
+                if body:
+                    kind, payload = body(rng)
+                    kwargs = {'json_body': payload} if kind == 'json' else {'form': payload}
+                started = time.perf_counter()
+                status = client.open(path, method, **kwargs)
+                return time.perf_counter() - started, status
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                outcomes = list(pool.map(one, range(requests)))
+            elapsed = time.perf_counter() - started
+            results[name] = summarize([o[0] for o in outcomes], sum(1 for o in outcomes if o[1] >= 400), elapsed)
+    finally:
+        for process in processes:
+            process.terminate()
+    return results
@@ -0,0 +1,97 @@
+"""Forum moderation throughput over a backlog of posts.
+
+Inserts --posts synthetic forum posts, --crisis-rate of them containing a
+crisis phrase, then measures the keyword matcher alone (the old per-message
+substring check vs. CrisisMatcher) and the full ForumModerator scan, which
+reads posts in id order, flags matches and opens crisis incidents.
+
+Usage: python -m benchmarks.moderation --posts 1000000 --batch-size 1000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+
+WORDS = ('exam stress hostel roommate sleep assignment semester professor friends family home placement '
+         'anxious tired lonely studied audience ladies schedule canteen library deadline '
+         'परीक्षा दोस्त घर पढ़ाई').split()
+CRISIS_PHRASES = ('I want to die', 'thinking about suicide', 'मर जाना चाहता हूँ', 'I might hurt myself')
+
+
+def synthetic_posts(count, crisis_rate, seed=7):
+    rng = random.Random(seed)
+    for i in range(count):
+        words = rng.choices(WORDS, k=rng.randint(20, 80))
+        if rng.random() < crisis_rate:
+            words.insert(rng.randrange(len(words)), rng.choice(CRISIS_PHRASES))
+        yield f"Post {i}", ' '.join(words)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--posts', type=int, default=1000000)
+    parser.add_argument('--crisis-rate', type=float, default=0.001)
+    parser.add_argument('--batch-size', type=int, default=1000, help='Posts scanned per transaction')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='zenithra-bench-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ['CRISIS_NOTIFY_LOG'] = os.path.join(workdir, 'crisis_notifications.log')
+    import app as app_module
+    app, db = app_module.app, app_module.db
+    ForumPost = app_module.ForumPost
+
+    with app.app_context():
+        db.create_all()
+        student = app_module.Student(name='Bench', email='bench@bench.edu', password_hash='x',
+                                     year='First Year', branch='Bench', age=19)
+        db.session.add(student)
+        db.session.commit()
+        student_id, anonymous_id = student.id, 'Anonymous_Bench'
+
+        started = time.perf_counter()
+        now = datetime.utcnow()
+        chunk = []
+        for title, content in synthetic_posts(args.posts, args.crisis_rate):
+            chunk.append({'student_id': student_id, 'title': title, 'content': content, 'category': 'General',
+                          'anonymous_id': anonymous_id, 'views': 0, 'likes': 0, 'is_pinned': False,
+                          'is_resolved': False, 'needs_review': False, 'created_at': now})
+            if len(chunk) == 10000:
+                db.session.execute(ForumPost.__table__.insert(), chunk)
+                chunk = []
+        if chunk:
+            db.session.execute(ForumPost.__table__.insert(), chunk)
+        db.session.commit()
+        print(f"seeded    {args.posts} posts in {time.perf_counter() - started:6.2f}s", flush=True)
+
+    texts = [f"{title}\n{content}" for title, content in synthetic_posts(args.posts, args.crisis_rate)]
+    keywords = app_module.CRISIS_KEYWORDS
+
+    started = time.perf_counter()
+    naive = sum(1 for text in texts if any(keyword in text.lower() for keyword in keywords))
+    elapsed = time.perf_counter() - started
+    print(f"substring {len(texts)} texts in {elapsed:6.2f}s  {len(texts) / elapsed:9.0f} texts/s  {naive} matched",
+          flush=True)
+    matcher = app_module.forum_matcher
+    started = time.perf_counter()
+    compiled = sum(1 for text in texts if matcher.search(text))
+    elapsed = time.perf_counter() - started
+    print(f"matcher   {len(texts)} texts in {elapsed:6.2f}s  {len(texts) / elapsed:9.0f} texts/s  {compiled} matched",
+          flush=True)
+    del texts
+
+    moderator = app_module.forum_moderator
+    moderator.batch_size = args.batch_size
+    with app.app_context():
+        started = time.perf_counter()
+        scanned = moderator.scan()['forum_post']
+        elapsed = time.perf_counter() - started
+        incidents = app_module.CrisisIncident.query.count()
+        print(f"pipeline  {scanned} posts in {elapsed:6.2f}s  {scanned / elapsed:9.0f} posts/s  "
+              f"{moderator.flagged} flagged, {incidents} incidents", flush=True)
+
+
+if __name__ == '__main__':
+    main()
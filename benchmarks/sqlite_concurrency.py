@@ -0,0 +1,98 @@
+"""Concurrent write throughput on SQLite with default vs tuned storage settings.
+
+Writers mimic send_message/submit_mood (insert + commit) and the view-count
+commits (UPDATE of a hot row) while a reader keeps running dashboard counts.
+
+Usage: python -m benchmarks.sqlite_concurrency --writers 8 --transactions 300
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+import sqlalchemy as sa
+from sqlalchemy.exc import OperationalError
+
+from storage import engine_options, install_sqlite_pragmas
+
+metadata = sa.MetaData()
+chat = sa.Table('chat_conversation', metadata,
+                sa.Column('id', sa.Integer, primary_key=True),
+                sa.Column('student_id', sa.Integer, nullable=False, index=True),
+                sa.Column('user_message', sa.Text, nullable=False),
+                sa.Column('bot_response', sa.Text, nullable=False),
+                sa.Column('timestamp', sa.Float, nullable=False))
+post = sa.Table('forum_post', metadata,
+                sa.Column('id', sa.Integer, primary_key=True),
+                sa.Column('views', sa.Integer, nullable=False))
+
+
+def run(label, tuned, args):
+    path = os.path.join(tempfile.mkdtemp(prefix='zenithra-bench-'), 'bench.db')
+    url = f"sqlite:///{path}"
+    if tuned:
+        engine = sa.create_engine(url, **engine_options(url))
+        install_sqlite_pragmas(engine)
+    else:
+        # What the app used before: SQLAlchemy defaults, rollback journal
+        engine = sa.create_engine(url, connect_args={'check_same_thread': False})
+    metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(post.insert(), [{'id': i, 'views': 0} for i in range(1, 11)])
+
+    committed, errors = [0], [0]
+    stop_reader = threading.Event()
+    lock = threading.Lock()
+    body = 'मैं समझ सकता हूँ कि परीक्षा का समय कितना तनावपूर्ण होता है। ' * 8
+
+    def writer(n):
+        ok = failed = 0
+        for i in range(args.transactions):
+            try:
+                with engine.begin() as conn:
+                    if i % 3 == 2:
+                        conn.execute(post.update().where(post.c.id == (i % 10) + 1).values(views=post.c.views + 1))
+                    else:
+                        conn.execute(chat.insert().values(student_id=n, user_message='exam stress',
+                                                          bot_response=body, timestamp=time.time()))
+                ok += 1
+            except OperationalError:
+                failed += 1  # "database is locked"
+        with lock:
+            committed[0] += ok
+            errors[0] += failed
+
+    def reader():
+        while not stop_reader.is_set():
+            with engine.connect() as conn:
+                conn.execute(sa.select(sa.func.count()).select_from(chat)).scalar()
+
+    reader_thread = threading.Thread(target=reader)
+    reader_thread.start()
+    started = time.perf_counter()
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(args.writers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    stop_reader.set()
+    reader_thread.join()
+    engine.dispose()
+
+    print(f"{label:<10}{committed[0] / elapsed:>10.0f} commits/s{errors[0]:>8} locked errors{elapsed:>8.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--transactions', type=int, default=300)
+    args = parser.parse_args()
+    print(f"{args.writers} writers x {args.transactions} transactions, 1 reader")
+    run('default', False, args)
+    run('tuned', True, args)
+
+
+if __name__ == '__main__':
+    main()
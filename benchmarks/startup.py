@@ -0,0 +1,95 @@
+"""Cold start cost of importing app.py, as on a fresh serverless instance.
+
+Each run imports the app in a new interpreter with `-X importtime` and times
+the first request to a page that never touches the LLM. Exits non-zero when
+the median import exceeds --budget-ms or a module that must stay lazy
+(Gemini, Alembic) was imported, so it can gate CI.
+
+Usage: python -m benchmarks.startup --runs 5 --budget-ms 1500
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAZY_MODULES = ('google.generativeai', 'flask_migrate', 'alembic')
+
+PROBE = """
+import sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.app.test_client().get('/games/breathing_buddy')
+served = time.perf_counter()
+print('RESULT', (imported - started) * 1000, (served - imported) * 1000,
+      ','.join(m for m in {lazy!r} if m in sys.modules))
+"""
+
+
+def measure(env):
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', PROBE.format(lazy=LAZY_MODULES)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+
+    modules = []
+    for line in completed.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules.append((int(cumulative), name.rstrip()))
+
+    result = next(line for line in completed.stdout.splitlines() if line.startswith('RESULT'))
+    _, import_ms, first_request_ms, *loaded = result.split(' ')
+    return float(import_ms), float(first_request_ms), [m for m in ''.join(loaded).split(',') if m], modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=None, help='Fail when the median import is slower')
+    parser.add_argument('--top', type=int, default=15, help='Slowest imports to show')
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='zenithra-bench-'), 'startup.db')}"
+
+    import_times, request_times, loaded, modules = [], [], set(), []
+    for _ in range(args.runs):
+        import_ms, first_request_ms, lazy_loaded, modules = measure(env)
+        import_times.append(import_ms)
+        request_times.append(first_request_ms)
+        loaded.update(lazy_loaded)
+
+    # importtime lists children (indented two more spaces) before their parent
+    direct, children = [], []
+    for us, name in modules:
+        if not name.startswith('   '):
+            if name.strip() == 'app':
+                direct = sorted(children, reverse=True)
+            children = []
+        elif not name.startswith('     '):
+            children.append((us, name.strip()))
+    print(f"{'imported by app':<32}{'cumulative ms':>14}")
+    for us, name in direct[:args.top]:
+        print(f"{name:<32}{us / 1000:>14.1f}")
+
+    median_import = statistics.median(import_times)
+    print(f"\nimport app: median {median_import:.0f}ms, min {min(import_times):.0f}ms over {args.runs} runs")
+    print(f"first /games request: median {statistics.median(request_times):.0f}ms")
+
+    failed = False
+    if loaded:
+        print(f"❌ Imported at startup but should be lazy: {', '.join(sorted(loaded))}")
+        failed = True
+    if args.budget_ms is not None and median_import > args.budget_ms:
+        print(f"❌ Import budget exceeded: {median_import:.0f}ms > {args.budget_ms:.0f}ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
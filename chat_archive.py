@@ -0,0 +1,202 @@
+import gzip
+import json
+import os
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+class ArchivedConversation(namedtuple('ArchivedConversation', [
+    'id', 'student_id', 'user_message', 'bot_response', 'crisis_detected',
+    'sentiment_score', 'response_time', 'timestamp'
+])):
+    __slots__ = ()
+
+    @property
+    def reply(self):
+        return self.bot_response
+
+CODEC_EXTENSIONS = {'zstd': '.jsonl.zst', 'gzip': '.jsonl.gz'}
+
+
+def _open_segment(path, codec, mode):
+    if codec == 'zstd':
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError(f"zstandard is required to read {path}")
+        raw = open(path, mode + 'b')
+        if mode == 'w':
+            stream = zstandard.ZstdCompressor(level=10).stream_writer(raw, closefd=True)
+        else:
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        return stream
+    return gzip.open(path, mode + 'b', compresslevel=6)
+
+
+class ChatArchive:
+    """Move old chat rows into compressed monthly JSONL segments.
+
+    The hot ChatConversation table only keeps recent rows. Each archived batch
+    becomes one segment file per month, indexed by ChatArchiveSegment, and
+    ChatArchiveEntry records which students appear in which segment so a
+    student's old history only opens the segments that contain it. Runs
+    may overlap; each batch belongs to the run that deletes its rows.
+    """
+
+    def __init__(self, db, ChatConversation, ChatArchiveSegment, ChatArchiveEntry,
+                 archive_dir='instance/chat_archive', codec=None, cache_segments=8):
+        self.db = db
+        self.ChatConversation = ChatConversation
+        self.ChatArchiveSegment = ChatArchiveSegment
+        self.ChatArchiveEntry = ChatArchiveEntry
+        self.archive_dir = archive_dir
+        self.codec = codec or ('zstd' if ZSTD_AVAILABLE else 'gzip')
+        self.cache_segments = cache_segments
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _serialize(self, row):
+        return {
+            'id': row.id,
+            'student_id': row.student_id,
+            'user_message': str(row.user_message),
+            'bot_response': str(row.reply),  # templated replies are stored rendered
+            'crisis_detected': bool(row.crisis_detected),
+            'sentiment_score': row.sentiment_score,
+            'response_time': row.response_time,
+            'timestamp': row.timestamp.isoformat()
+        }
+
+    def _write_segment(self, month, rows):
+        directory = os.path.join(self.archive_dir, month)
+        os.makedirs(directory, exist_ok=True)
+        name = f"{rows[0].id:010d}-{rows[-1].id:010d}{CODEC_EXTENSIONS[self.codec]}"
+        path = os.path.join(directory, name)
+
+        # Write to a temp name and rename, so a crash never leaves half a segment behind
+        tmp_path = path + '.tmp'
+        with _open_segment(tmp_path, self.codec, 'w') as f:
+            for row in rows:
+                f.write((json.dumps(self._serialize(row), ensure_ascii=False) + '\n').encode('utf-8'))
+        os.replace(tmp_path, path)
+        # Stored relative to archive_dir so the archive can be moved as a whole
+        return os.path.join(month, name)
+
+    def _add_segment(self, month, path, rows):
+        segment = self.ChatArchiveSegment(
+            month=month,
+            path=path,
+            codec=self.codec,
+            row_count=len(rows),
+            min_id=rows[0].id,
+            max_id=rows[-1].id,
+            min_timestamp=min(r.timestamp for r in rows),
+            max_timestamp=max(r.timestamp for r in rows)
+        )
+        self.db.session.add(segment)
+
+        per_student = {}
+        for row in rows:
+            per_student.setdefault(row.student_id, []).append(row.timestamp)
+        for student_id, timestamps in per_student.items():
+            self.db.session.add(self.ChatArchiveEntry(
+                segment=segment,
+                student_id=student_id,
+                row_count=len(timestamps),
+                min_timestamp=min(timestamps),
+                max_timestamp=max(timestamps)
+            ))
+
+    def archive_older_than(self, days=180, batch_size=1000) -> int:
+        """Archive conversations older than `days` in batches, returns rows moved"""
+        Chat = self.ChatConversation
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        moved = 0
+
+        while True:
+            rows = Chat.query.filter(Chat.timestamp < cutoff).order_by(Chat.id.asc()).limit(batch_size).all()
+            if not rows:
+                break
+
+            by_month = {}
+            for row in rows:
+                by_month.setdefault(row.timestamp.strftime('%Y-%m'), []).append(row)
+
+            try:
+                # Deleting the batch first claims it: a run started next to this one
+                # (the CLI and the job) waits on these rows, then finds them gone and
+                # moves on, so no rows end up in two segments
+                claimed = Chat.query.filter(Chat.id.in_([r.id for r in rows])).delete(synchronize_session=False)
+                if claimed != len(rows):
+                    self.db.session.rollback()
+                    continue
+                for month, month_rows in by_month.items():
+                    path = self._write_segment(month, month_rows)
+                    self._add_segment(month, path, month_rows)
+                self.db.session.commit()
+            except Exception:
+                self.db.session.rollback()
+                raise
+
+            moved += len(rows)
+            print(f"📦 Archived {moved} conversations so far...")
+
+        return moved
+
+    def _read_segment(self, segment):
+        if segment.path in self._cache:
+            self.hits += 1
+            self._cache.move_to_end(segment.path)
+            return self._cache[segment.path]
+        self.misses += 1
+
+        rows = []
+        with _open_segment(os.path.join(self.archive_dir, segment.path), segment.codec, 'r') as f:
+            data = f.read().decode('utf-8')
+        for line in data.splitlines():
+            if not line:
+                continue
+            item = json.loads(line)
+            item['timestamp'] = datetime.fromisoformat(item['timestamp'])
+            rows.append(ArchivedConversation(**item))
+
+        self._cache[segment.path] = rows
+        if len(self._cache) > self.cache_segments:
+            self._cache.popitem(last=False)
+        return rows
+
+    def history(self, student_id, before: Optional[datetime] = None, limit=50) -> List[ArchivedConversation]:
+        """Newest-first archived conversations of one student"""
+        Entry = self.ChatArchiveEntry
+        query = Entry.query.filter_by(student_id=student_id)
+        if before is not None:
+            query = query.filter(Entry.min_timestamp < before)
+
+        found = []
+        for entry in query.order_by(Entry.max_timestamp.desc()):
+            # Segments are visited newest first, so once we have enough rows
+            # older than this segment's newest row we can stop
+            if len(found) >= limit and found[limit - 1].timestamp > entry.max_timestamp:
+                break
+            found.extend(
+                row for row in self._read_segment(entry.segment)
+                if row.student_id == student_id and (before is None or row.timestamp < before)
+            )
+            found.sort(key=lambda r: r.timestamp, reverse=True)
+
+        return found[:limit]
+
+    def count(self, student_id=None) -> int:
+        """Number of archived conversations, overall or for one student"""
+        if student_id is None:
+            total = self.db.session.query(self.db.func.sum(self.ChatArchiveSegment.row_count)).scalar()
+        else:
+            total = self.db.session.query(self.db.func.sum(self.ChatArchiveEntry.row_count)).filter(
+                self.ChatArchiveEntry.student_id == student_id
+            ).scalar()
+        return total or 0
@@ -0,0 +1,169 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+
+from db_routing import use_primary
+from watermarks import RowScanner
+
+DIMENSIONS = ('month', 'branch', 'year', 'hostel_resident', 'gender', 'location')
+MEASURES = (
+    'screenings', 'risk_low', 'risk_moderate', 'risk_high', 'phq9_sum', 'gad7_sum',
+    'mood_entries', 'mood_sum', 'energy_sum', 'stress_sum', 'sleep_sum', 'crises',
+)
+RISK_LEVELS = ('low', 'moderate', 'high')
+
+
+def _screening_measures(row):
+    measures = {'screenings': 1, 'phq9_sum': row.phq9_score, 'gad7_sum': row.gad7_score}
+    if row.risk_level in RISK_LEVELS:
+        measures[f"risk_{row.risk_level}"] = 1
+    return measures
+
+
+def _mood_measures(row):
+    return {'mood_entries': 1, 'mood_sum': row.mood_score, 'energy_sum': row.energy_level,
+            'stress_sum': row.stress_level, 'sleep_sum': row.sleep_hours or 0.0}
+
+
+def _crisis_measures(row):
+    return {'crises': 1}
+
+
+class CohortCube:
+    """Screening, mood and crisis aggregates per cohort and month.
+
+    CohortRollup holds one row per (month, branch, year, hostel, gender,
+    location) with additive sums, so any slice is a small GROUP BY over the
+    rollup and means are derived from sums and counts. refresh() only reads
+    source rows it hasn't folded yet (see RowScanner) and adds them with
+    atomic increments, so concurrent refreshers can't lose each other's
+    updates; a student's cohort is taken as it was when the row was folded in.
+    """
+
+    def __init__(self, db, Student, CohortRollup, ProcessingWatermark, ProcessedRow, sources, batch_size=5000):
+        self.db = db
+        self.Student = Student
+        self.CohortRollup = CohortRollup
+        self.scanner = RowScanner(db, ProcessingWatermark, ProcessedRow)
+        # name -> (model, columns the measures need, measures(row))
+        self.sources = {
+            'screening': (sources['screening'], ('risk_level', 'phq9_score', 'gad7_score'), _screening_measures),
+            'mood': (sources['mood'], ('mood_score', 'energy_level', 'stress_level', 'sleep_hours'), _mood_measures),
+            'crisis': (sources['crisis'], (), _crisis_measures),
+        }
+        self.batch_size = batch_size
+
+    def _watermark_name(self, source):
+        return f"cohort_rollup.{source}"
+
+    def _fold_batch(self, source) -> int:
+        """Fold the next batch of one source into the rollup; returns the rows folded"""
+        Model, columns, measures = self.sources[source]
+        Student = self.Student
+        session = self.db.session
+        stmt = (select(Model.id, Model.created_at, Student.branch, Student.year, Student.hostel_resident,
+                       Student.gender, Student.location, *[getattr(Model, c) for c in columns])
+                .join(Student, Student.id == Model.student_id))
+
+        for attempt in range(2):
+            try:
+                rows = self.scanner.claim(self._watermark_name(source), Model, stmt, self.batch_size)
+                deltas = defaultdict(lambda: defaultdict(int))
+                for row in rows:
+                    created = row.created_at or datetime.utcnow()
+                    cell = (created.strftime('%Y-%m'), row.branch or '', row.year or '', bool(row.hostel_resident),
+                            row.gender or '', row.location or '')
+                    for measure, value in measures(row).items():
+                        deltas[cell][measure] += value
+                self._apply(deltas)
+                session.commit()
+                return len(rows)
+            except IntegrityError:
+                # A concurrent refresher claimed the same rows or created the same cell first
+                session.rollback()
+                if attempt:
+                    raise
+
+    def _apply(self, deltas):
+        """Add each cell's deltas with `UPDATE ... SET m = m + delta`, inserting cells not seen before"""
+        Rollup = self.CohortRollup
+        session = self.db.session
+        now = datetime.utcnow()
+        for cell, values in deltas.items():
+            key = dict(zip(DIMENSIONS, cell))
+            updated = session.query(Rollup).filter_by(**key).update(
+                {**{m: getattr(Rollup, m) + value for m, value in values.items()}, 'updated_at': now},
+                synchronize_session=False)
+            if not updated:
+                session.add(Rollup(**key, **{m: values.get(m, 0) for m in MEASURES}, updated_at=now))
+        session.flush()
+
+    def refresh(self) -> Dict[str, int]:
+        """Fold every new screening, mood entry and crisis into the rollup"""
+        folded = {}
+        with use_primary(self.db):
+            for source in self.sources:
+                total = 0
+                while True:
+                    count = self._fold_batch(source)
+                    total += count
+                    if count < self.batch_size:
+                        break
+                folded[source] = total
+        return folded
+
+    def slice_totals(self, group_by=(), filters=None, month_from=None, month_to=None) -> Dict[tuple, Dict[str, float]]:
+        """Summed MEASURES per group_by key, restricted by equality filters"""
+        Rollup = self.CohortRollup
+        keys = [getattr(Rollup, d) for d in group_by]
+        query = self.db.session.query(*keys, *[func.sum(getattr(Rollup, m)) for m in MEASURES])
+        for dimension, value in (filters or {}).items():
+            query = query.filter(getattr(Rollup, dimension) == value)
+        if month_from:
+            query = query.filter(Rollup.month >= month_from)
+        if month_to:
+            query = query.filter(Rollup.month <= month_to)
+        if keys:
+            query = query.group_by(*keys).order_by(*keys)
+        return {tuple(row[:len(keys)]): dict(zip(MEASURES, (value or 0 for value in row[len(keys):])))
+                for row in query.all()}
+
+    def slice(self, group_by=(), filters=None, month_from=None, month_to=None) -> List[dict]:
+        """Aggregates grouped by any subset of DIMENSIONS, restricted by equality filters"""
+        return cohort_cells(group_by, self.slice_totals(group_by, filters, month_from, month_to))
+
+
+def merge_totals(parts) -> Dict[tuple, Dict[str, float]]:
+    """Add up slice_totals() from several shards cell by cell"""
+    merged = defaultdict(lambda: dict.fromkeys(MEASURES, 0))
+    for part in parts:
+        for key, totals in part.items():
+            for measure, value in totals.items():
+                merged[key][measure] += value
+    return dict(merged)
+
+
+def cohort_cells(group_by, totals) -> List[dict]:
+    """Format slice totals as API cells, with means derived from sums and counts"""
+    cells = []
+    for key in sorted(totals):
+        cell = dict(zip(group_by, key))
+        values = totals[key]
+        screenings, moods = values['screenings'], values['mood_entries']
+        cell.update({
+            'screenings': int(screenings),
+            'risk': {level: int(values[f"risk_{level}"]) for level in RISK_LEVELS},
+            'mean_phq9': round(values['phq9_sum'] / screenings, 2) if screenings else None,
+            'mean_gad7': round(values['gad7_sum'] / screenings, 2) if screenings else None,
+            'mood_entries': int(moods),
+            'mean_mood': round(values['mood_sum'] / moods, 2) if moods else None,
+            'mean_energy': round(values['energy_sum'] / moods, 2) if moods else None,
+            'mean_stress': round(values['stress_sum'] / moods, 2) if moods else None,
+            'mean_sleep_hours': round(values['sleep_sum'] / moods, 2) if moods else None,
+            'crises': int(values['crises']),
+        })
+        cells.append(cell)
+    return cells
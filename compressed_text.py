@@ -0,0 +1,162 @@
+import os
+import threading
+import zlib
+
+from markupsafe import escape
+from sqlalchemy.types import LargeBinary, TypeDecorator
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# First byte of every stored value. Legacy rows written as plain text never
+# start with these control bytes, so they are still read back correctly.
+RAW = b'\x00'
+ZLIB_V1 = b'\x01'
+ZSTD_V1 = b'\x02'
+
+# Texts shorter than this are stored raw, compression would only add overhead
+MIN_COMPRESS_BYTES = 64
+
+DICTIONARY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'text_dictionary_v1.txt')
+
+
+def _load_dictionary():
+    """Shared dictionary of common chat phrases. Never edit a published version,
+    add text_dictionary_v2 and a new header byte instead."""
+    with open(DICTIONARY_PATH, 'rb') as f:
+        return f.read()
+
+
+_DICTIONARY = _load_dictionary()
+# zstd (de)compressors are not thread safe but are expensive to build, keep one per thread
+_zstd_local = threading.local()
+
+
+def _zstd(kind):
+    codec = getattr(_zstd_local, kind, None)
+    if codec is None:
+        dictionary = zstandard.ZstdCompressionDict(_DICTIONARY, dict_type=zstandard.DICT_TYPE_RAWCONTENT)
+        if kind == 'compressor':
+            codec = zstandard.ZstdCompressor(level=6, dict_data=dictionary, write_content_size=True)
+        else:
+            codec = zstandard.ZstdDecompressor(dict_data=dictionary)
+        setattr(_zstd_local, kind, codec)
+    return codec
+
+
+def compress_text(text, codec='zlib'):
+    """Encode text as header byte + payload"""
+    data = text.encode('utf-8')
+    if codec == 'none' or len(data) < MIN_COMPRESS_BYTES:
+        return RAW + data
+    if codec == 'zstd' and ZSTD_AVAILABLE:
+        payload = ZSTD_V1 + _zstd('compressor').compress(data)
+    else:
+        compressor = zlib.compressobj(level=6, wbits=-15, zdict=_DICTIONARY)
+        payload = ZLIB_V1 + compressor.compress(data) + compressor.flush()
+    # Keep whichever is smaller, e.g. for short unique messages
+    return payload if len(payload) < len(data) + 1 else RAW + data
+
+
+def decompress_text(value):
+    """Decode a stored value written by compress_text (or a legacy plain text row)"""
+    if isinstance(value, str):
+        return value
+    value = bytes(value)
+    header, payload = value[:1], value[1:]
+    if header == RAW:
+        return payload.decode('utf-8')
+    if header == ZLIB_V1:
+        decompressor = zlib.decompressobj(wbits=-15, zdict=_DICTIONARY)
+        return (decompressor.decompress(payload) + decompressor.flush()).decode('utf-8')
+    if header == ZSTD_V1:
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError('zstandard is required to read zstd compressed text')
+        return _zstd('decompressor').decompress(payload).decode('utf-8')
+    return value.decode('utf-8')  # legacy text column converted to binary
+
+
+class LazyText:
+    """String proxy that only decompresses when the text is actually used"""
+    __slots__ = ('raw', '_text')
+
+    def __init__(self, raw):
+        self.raw = raw
+        self._text = None
+
+    @property
+    def text(self):
+        if self._text is None:
+            self._text = decompress_text(self.raw)
+        return self._text
+
+    def __str__(self):
+        return self.text
+
+    def __html__(self):
+        return str(escape(self.text))
+
+    def __repr__(self):
+        return f"LazyText({self.text!r})"
+
+    def __len__(self):
+        return len(self.text)
+
+    def __bool__(self):
+        return bool(self.text)
+
+    def __getitem__(self, key):
+        return self.text[key]
+
+    def __iter__(self):
+        return iter(self.text)
+
+    def __contains__(self, item):
+        return item in self.text
+
+    def __eq__(self, other):
+        return self.text == (other.text if isinstance(other, LazyText) else other)
+
+    def __hash__(self):
+        return hash(self.text)
+
+    def __add__(self, other):
+        return self.text + str(other)
+
+    def __radd__(self, other):
+        return str(other) + self.text
+
+    def __getattr__(self, name):
+        # lower(), split(), strip() etc. behave like on the plain string
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.text, name)
+
+
+class CompressedText(TypeDecorator):
+    """Text column stored compressed with a shared dictionary.
+
+    Values come back as LazyText, so rows loaded for counts or listings that
+    never touch the text skip decompression entirely.
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    def __init__(self, codec=None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.codec = codec or os.getenv('CHAT_TEXT_COMPRESSION', 'zlib')
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, LazyText):
+            return bytes(value.raw) if not isinstance(value.raw, str) else compress_text(value.raw, self.codec)
+        return compress_text(str(value), self.codec)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return LazyText(value)
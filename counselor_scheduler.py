@@ -0,0 +1,187 @@
+import heapq
+import threading
+import time
+from collections import namedtuple
+from typing import Dict, Optional
+
+# Student.language stores short codes, Counselor.languages stores names
+LANGUAGE_NAMES = {
+    'en': 'english', 'hi': 'hindi', 'bn': 'bengali', 'ta': 'tamil',
+    'te': 'telugu', 'mr': 'marathi', 'pa': 'punjabi', 'gu': 'gujarati'
+}
+
+Assignment = namedtuple('Assignment', ['id', 'name'])
+
+_CounselorState = namedtuple('_CounselorState', [
+    'id', 'name', 'version', 'caseload', 'capacity', 'languages', 'specializations'
+])
+
+
+def _tags(text):
+    return {part.strip().lower() for part in (text or '').split(',') if part.strip()}
+
+
+def _load_ratio(state):
+    return state.caseload / state.capacity if state.capacity else float('inf')
+
+
+class CounselorScheduler:
+    """Assign crisis incidents to the least loaded matching counselor.
+
+    Keeps one min-heap per language and per specialization, keyed by load ratio.
+    Entries are invalidated lazily by version, so an assignment costs O(log n)
+    heap work plus one conditional UPDATE that acts as the optimistic lock.
+    """
+
+    def __init__(self, db, Counselor, max_retries=5, refresh_interval=300):
+        self.db = db
+        self.Counselor = Counselor
+        self.max_retries = max_retries
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._states: Dict[int, _CounselorState] = {}
+        self._heaps: Dict[tuple, list] = {}
+        self._loaded_at = None
+
+    def _heap_keys(self, state):
+        yield ('any',)
+        for language in state.languages:
+            yield ('language', language)
+        for specialization in state.specializations:
+            yield ('specialization', specialization)
+
+    def _index(self, state):
+        self._states[state.id] = state
+        entry = (_load_ratio(state), state.id, state.version)
+        for key in self._heap_keys(state):
+            heapq.heappush(self._heaps.setdefault(key, []), entry)
+
+    def _state_from_row(self, row):
+        return _CounselorState(
+            id=row.id,
+            name=row.name,
+            version=row.version or 0,
+            caseload=row.current_caseload or 0,
+            capacity=row.max_capacity or 0,
+            languages=_tags(row.languages),
+            specializations=_tags(row.specialization)
+        )
+
+    def reload(self):
+        """Rebuild the heaps from the counselor table"""
+        Counselor = self.Counselor
+        rows = Counselor.query.filter_by(is_available=True).all()
+        with self._lock:
+            self._states = {}
+            self._heaps = {}
+            for row in rows:
+                self._index(self._state_from_row(row))
+            self._loaded_at = time.monotonic()
+
+    def _refresh_one(self, counselor_id):
+        row = self.db.session.get(self.Counselor, counselor_id, populate_existing=True)
+        with self._lock:
+            if row is None or not row.is_available:
+                self._states.pop(counselor_id, None)
+            else:
+                self._index(self._state_from_row(row))
+
+    def _is_current(self, entry):
+        state = self._states.get(entry[1])
+        return state is not None and state.version == entry[2]
+
+    def _pick(self, key, predicate) -> Optional[_CounselorState]:
+        """Return the least loaded counselor in a heap that satisfies predicate"""
+        heap = self._heaps.get(key)
+        if not heap:
+            return None
+
+        skipped = []
+        chosen = None
+        while heap:
+            entry = heap[0]
+            if not self._is_current(entry):
+                heapq.heappop(heap)
+                continue
+            if entry[0] >= 1.0:
+                break  # the least loaded match is already at capacity
+            state = self._states[entry[1]]
+            if predicate(state):
+                chosen = state
+                break
+            skipped.append(heapq.heappop(heap))
+        for entry in skipped:
+            heapq.heappush(heap, entry)
+        return chosen
+
+    def _candidate(self, language, specialization):
+        """Least loaded counselor, relaxing specialization and then language"""
+        attempts = []
+        if language and specialization:
+            attempts.append((('specialization', specialization), lambda s: language in s.languages))
+        if specialization:
+            attempts.append((('specialization', specialization), lambda s: True))
+        if language:
+            attempts.append((('language', language), lambda s: True))
+        attempts.append((('any',), lambda s: True))
+
+        for key, predicate in attempts:
+            state = self._pick(key, predicate)
+            if state:
+                return state
+        return None
+
+    def _reserve(self, state) -> bool:
+        """Increment caseload only if nobody changed the counselor since we read it"""
+        Counselor = self.Counselor
+        updated = Counselor.query.filter(
+            Counselor.id == state.id,
+            Counselor.version == state.version,
+            Counselor.is_available == True,  # noqa: E712
+            Counselor.current_caseload < Counselor.max_capacity
+        ).update({
+            'current_caseload': Counselor.current_caseload + 1,
+            'version': Counselor.version + 1
+        }, synchronize_session=False)
+        return updated == 1
+
+    def assign(self, language=None, specialization=None) -> Optional[Assignment]:
+        """Reserve a slot with the best counselor inside the caller's transaction"""
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.refresh_interval:
+            self.reload()
+
+        language = LANGUAGE_NAMES.get(language, language)
+        language = language.lower() if language else None
+        specialization = specialization.lower() if specialization else None
+
+        for _ in range(self.max_retries):
+            with self._lock:
+                state = self._candidate(language, specialization)
+            if state is None:
+                return None
+
+            if self._reserve(state):
+                with self._lock:
+                    self._index(state._replace(version=state.version + 1, caseload=state.caseload + 1))
+                return Assignment(state.id, state.name)
+
+            # Lost the race (or our view is stale): re-read this counselor and try again
+            self._refresh_one(state.id)
+
+        print(f"⚠️ Counselor assignment gave up after {self.max_retries} conflicts")
+        return None
+
+    def release(self, counselor_id):
+        """Free one caseload slot when an incident is resolved; part of the caller's transaction"""
+        Counselor = self.Counselor
+        Counselor.query.filter(
+            Counselor.id == counselor_id,
+            Counselor.current_caseload > 0
+        ).update({
+            'current_caseload': Counselor.current_caseload - 1,
+            'version': Counselor.version + 1
+        }, synchronize_session=False)
+        with self._lock:
+            state = self._states.get(counselor_id)
+            if state:
+                self._index(state._replace(version=state.version + 1, caseload=max(state.caseload - 1, 0)))
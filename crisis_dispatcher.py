@@ -0,0 +1,348 @@
+import json
+import os
+import smtplib
+import threading
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from typing import Dict, List, Optional
+
+from sqlalchemy import case, func
+
+from db_routing import current_shard, shard_keys, use_shard
+
+# Lower number = delivered first
+SEVERITY_PRIORITY = {'critical': 0, 'high': 1, 'medium': 2, 'low': 3}
+
+
+class NotificationSink:
+    """Base class for a crisis notification channel"""
+    name = 'base'
+
+    def send(self, notification: Dict) -> None:
+        raise NotImplementedError
+
+
+class LogFileSink(NotificationSink):
+    """Append notifications as JSON lines to a local file.
+
+    The student's message is left out: the log is a plain file on disk, so
+    it only records that an alert went out, not what the student wrote.
+    """
+    name = 'log'
+
+    def __init__(self, path='instance/crisis_notifications.log'):
+        self.path = path
+
+    def send(self, notification: Dict) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        record = {key: value for key, value in notification.items() if key != 'message'}
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def build_email(notification: Dict, sender: str, recipients: List[str]) -> EmailMessage:
+    """Render a notification as an email for the crisis response team"""
+    message = EmailMessage()
+    kind = 'follow-up due' if notification.get('event_type') == 'crisis_follow_up' else 'crisis alert'
+    message['Subject'] = (f"[Zenithra] {notification['severity'].upper()} {kind} "
+                          f"- {notification['anonymous_id']}")
+    message['From'] = sender
+    message['To'] = ', '.join(recipients)
+    lines = [
+        f"Incident #{notification['incident_id']} ({notification['source']})",
+        f"Student: {notification['anonymous_id']} (id {notification['student_id']})",
+        f"Severity: {notification['severity']}",
+        f"Assigned counselor: {notification.get('counselor_assigned') or 'Unassigned'}",
+        f"Detected at: {notification['created_at']}",
+    ]
+    if notification.get('shard'):
+        lines.insert(1, f"College shard: {notification['shard']}")
+    if notification.get('duplicates'):
+        lines.append(f"Repeated alerts suppressed: {notification['duplicates']}")
+    lines += ['', notification['message']]
+    message.set_content('\n'.join(lines))
+    return message
+
+
+class SMTPSink(NotificationSink):
+    """Email notifications through an SMTP relay"""
+    name = 'smtp'
+
+    def __init__(self, host, port=25, sender='alerts@zenithra.local', recipients=None,
+                 username=None, password=None, use_tls=False, timeout=10):
+        self.host = host
+        self.port = int(port)
+        self.sender = sender
+        self.recipients = recipients or []
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+
+    def send(self, notification: Dict) -> None:
+        message = build_email(notification, self.sender, self.recipients)
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.use_tls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            smtp.send_message(message)
+
+
+class StubSMTPSink(NotificationSink):
+    """Build emails like SMTPSink but keep them in memory (for local testing)"""
+    name = 'smtp_stub'
+
+    def __init__(self, sender='alerts@zenithra.local', recipients=None):
+        self.sender = sender
+        self.recipients = recipients or ['crisis-team@zenithra.local']
+        self.outbox = []
+
+    def send(self, notification: Dict) -> None:
+        self.outbox.append(build_email(notification, self.sender, self.recipients))
+
+
+def build_sinks(config) -> List[NotificationSink]:
+    """Create the sinks named in CRISIS_NOTIFY_SINKS (comma separated)"""
+    names = [n.strip() for n in config.get('CRISIS_NOTIFY_SINKS', 'log').split(',') if n.strip()]
+    recipients = [r.strip() for r in config.get('CRISIS_NOTIFY_EMAILS', '').split(',') if r.strip()]
+    sender = config.get('CRISIS_NOTIFY_SENDER', 'alerts@zenithra.local')
+
+    sinks = []
+    for name in names:
+        if name == 'log':
+            sinks.append(LogFileSink(config.get('CRISIS_NOTIFY_LOG', 'instance/crisis_notifications.log')))
+        elif name == 'smtp':
+            sinks.append(SMTPSink(
+                host=config.get('SMTP_HOST', 'localhost'),
+                port=config.get('SMTP_PORT', 25),
+                sender=sender,
+                recipients=recipients,
+                username=config.get('SMTP_USERNAME'),
+                password=config.get('SMTP_PASSWORD'),
+                use_tls=str(config.get('SMTP_USE_TLS', '')).lower() in ('1', 'true', 'yes')
+            ))
+        elif name == 'smtp_stub':
+            sinks.append(StubSMTPSink(sender, recipients or None))
+        else:
+            print(f"⚠️ Unknown crisis notification sink '{name}' ignored")
+    return sinks
+
+
+def enqueue_crisis_notification(db, NotificationOutbox, incident, source='chat', dedup_window_minutes=30):
+    """Stage an outbox row for a crisis incident inside the caller's transaction.
+
+    Repeated alerts for the same student within the window are folded into a
+    row that hasn't been claimed for delivery yet instead of paging the
+    counselor twice, and the row records the folded incident so it is marked
+    notified with it; once an alert is going out, a new crisis gets a
+    notification of its own.
+    """
+    Outbox = NotificationOutbox
+    dedup_key = f"crisis:{incident.student_id}"
+    priority = SEVERITY_PRIORITY.get(incident.severity, len(SEVERITY_PRIORITY))
+    since = datetime.utcnow() - timedelta(minutes=dedup_window_minutes)
+
+    existing_id = db.session.query(Outbox.id).filter(
+        Outbox.dedup_key == dedup_key,
+        Outbox.status == 'pending',
+        Outbox.created_at >= since
+    ).order_by(Outbox.created_at.desc()).limit(1).scalar()
+
+    if existing_id is not None:
+        db.session.flush()  # the incident needs its id
+        # Conditional on the row still being pending: a dispatcher may claim it in between
+        folded = Outbox.query.filter(Outbox.id == existing_id, Outbox.status == 'pending').update({
+            'duplicate_count': func.coalesce(Outbox.duplicate_count, 0) + 1,
+            'priority': case((Outbox.priority > priority, priority), else_=Outbox.priority),
+            'folded_incident_ids': func.coalesce(Outbox.folded_incident_ids, '') + f"{incident.id},",
+        }, synchronize_session=False)
+        if folded:
+            incident.notes = f"Alert folded into outbox #{existing_id}"
+            return None
+
+    entry = NotificationOutbox(
+        incident=incident,
+        student_id=incident.student_id,
+        event_type='crisis_incident',
+        source=source,
+        severity=incident.severity,
+        priority=priority,
+        dedup_key=dedup_key
+    )
+    db.session.add(entry)
+    return entry
+
+
+def enqueue_follow_ups(db, CrisisIncident, NotificationOutbox, interval: timedelta, limit=3, batch_size=500) -> int:
+    """Remind the crisis team about open incidents whose follow_up_date has passed.
+
+    Each reminder is an outbox row delivered like the original alert; the
+    incident's follow_up_date then moves one interval on, so an incident
+    comes back until it is resolved or has had `limit` reminders, after
+    which it stays on the dashboard without paging anyone again.
+    """
+    now = datetime.utcnow()
+    due = CrisisIncident.query.filter(
+        CrisisIncident.status == 'open',
+        CrisisIncident.follow_up_date <= now
+    ).order_by(CrisisIncident.follow_up_date).limit(batch_size).all()
+    sent = dict(db.session.query(NotificationOutbox.incident_id, func.count(NotificationOutbox.id)).filter(
+        NotificationOutbox.incident_id.in_([incident.id for incident in due]),
+        NotificationOutbox.event_type == 'crisis_follow_up'
+    ).group_by(NotificationOutbox.incident_id).all()) if due else {}
+    reminded = 0
+    for incident in due:
+        count = sent.get(incident.id, 0)
+        if count < limit:
+            db.session.add(NotificationOutbox(
+                incident=incident,
+                student_id=incident.student_id,
+                event_type='crisis_follow_up',
+                source='follow_up',
+                severity=incident.severity,
+                priority=SEVERITY_PRIORITY.get(incident.severity, len(SEVERITY_PRIORITY)),
+                dedup_key=f"follow_up:{incident.id}"
+            ))
+            count += 1
+            reminded += 1
+        incident.follow_up_date = now + interval if count < limit else None
+    db.session.commit()
+    return reminded
+
+
+class CrisisDispatcher:
+    """Deliver outbox notifications in the background with retries"""
+
+    def __init__(self, app, db, NotificationOutbox, sinks: Optional[List[NotificationSink]] = None,
+                 batch_size=20, poll_interval=2.0, max_attempts=5, base_backoff=5, lease_seconds=60):
+        self.app = app
+        self.db = db
+        self.NotificationOutbox = NotificationOutbox
+        self.sinks = sinks if sinks is not None else []
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.lease_seconds = lease_seconds
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _due_filter(self, now):
+        Outbox = self.NotificationOutbox
+        pending = (Outbox.status == 'pending') & (Outbox.next_attempt_at <= now)
+        # Rows left in 'sending' by a crashed worker become due again once the lease expires
+        stale = (Outbox.status == 'sending') & (Outbox.locked_until < now)
+        return pending | stale
+
+    def _claim(self, entry_id, now) -> bool:
+        Outbox = self.NotificationOutbox
+        claimed = Outbox.query.filter(Outbox.id == entry_id, self._due_filter(now)).update(
+            {'status': 'sending', 'locked_until': now + timedelta(seconds=self.lease_seconds)},
+            synchronize_session=False
+        )
+        self.db.session.commit()
+        return claimed == 1
+
+    def _build_notification(self, entry) -> Dict:
+        incident = entry.incident
+        return {
+            'outbox_id': entry.id,
+            'event_type': entry.event_type,
+            'shard': current_shard(self.db),
+            'incident_id': entry.incident_id,
+            'student_id': entry.student_id,
+            'anonymous_id': incident.student.anonymous_id if incident and incident.student else '',
+            'severity': entry.severity,
+            'source': entry.source,
+            'message': str(incident.message) if incident else '',
+            'counselor_assigned': incident.counselor_assigned if incident else '',
+            'duplicates': entry.duplicate_count or 0,
+            'created_at': entry.created_at.isoformat()
+        }
+
+    def dispatch_pending(self) -> int:
+        """Deliver one batch of due notifications, most severe first"""
+        Outbox = self.NotificationOutbox
+        now = datetime.utcnow()
+        due_ids = [row.id for row in Outbox.query.with_entities(Outbox.id).filter(
+            self._due_filter(now)
+        ).order_by(Outbox.priority.asc(), Outbox.created_at.asc()).limit(self.batch_size)]
+
+        delivered = 0
+        for entry_id in due_ids:
+            if not self._claim(entry_id, now):
+                continue  # another worker got it first
+
+            entry = self.db.session.get(Outbox, entry_id)
+            entry.attempts = (entry.attempts or 0) + 1
+            # Sinks that took the notification on an earlier attempt aren't sent it again
+            delivered_to = set(filter(None, (entry.delivered_sinks or '').split(',')))
+            try:
+                notification = self._build_notification(entry)
+                for sink in self.sinks:
+                    if sink.name in delivered_to:
+                        continue
+                    sink.send(notification)
+                    delivered_to.add(sink.name)
+                    entry.delivered_sinks = ','.join(sorted(delivered_to))
+            except Exception as e:
+                entry.last_error = str(e)[:500]
+                if entry.attempts >= self.max_attempts:
+                    entry.status = 'failed'
+                    print(f"🚨 Crisis notification #{entry.id} failed permanently: {e}")
+                else:
+                    entry.status = 'pending'
+                    entry.next_attempt_at = datetime.utcnow() + timedelta(
+                        seconds=self.base_backoff * 2 ** (entry.attempts - 1))
+            else:
+                entry.status = 'sent'
+                entry.sent_at = datetime.utcnow()
+                entry.last_error = ''
+                if entry.incident:
+                    entry.incident.counselor_notified = True
+                folded_ids = [int(i) for i in (entry.folded_incident_ids or '').split(',') if i]
+                if folded_ids:
+                    Incident = Outbox.incident.property.mapper.class_
+                    Incident.query.filter(Incident.id.in_(folded_ids)).update(
+                        {'counselor_notified': True}, synchronize_session=False)
+                delivered += 1
+            self.db.session.commit()
+
+        return delivered
+
+    def dispatch_all(self) -> int:
+        """dispatch_pending() on every college shard"""
+        delivered = 0
+        for shard in shard_keys(self.db):
+            with use_shard(self.db, shard):
+                delivered += self.dispatch_pending()
+        return delivered
+
+    def run_forever(self):
+        with self.app.app_context():
+            while not self._stop.is_set():
+                try:
+                    delivered = self.dispatch_all()
+                except Exception as e:
+                    self.db.session.rollback()
+                    print(f"⚠️ Crisis dispatcher error: {e}")
+                    delivered = 0
+                finally:
+                    self.db.session.remove()
+                if not delivered:
+                    self._stop.wait(self.poll_interval)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name='crisis-dispatcher', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
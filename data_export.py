@@ -0,0 +1,186 @@
+import csv
+import io
+from typing import Dict, Iterator, Optional, Sequence
+
+from sqlalchemy import Boolean, DateTime, Float, Integer, func, select
+from sqlalchemy.types import TypeDecorator
+
+from db_routing import use_shard
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+}
+
+
+class _Chunks:
+    """File-like sink that hands back whatever was written since the last drain"""
+
+    def __init__(self):
+        self._buffer = io.BytesIO()
+        self.closed = False
+
+    def write(self, data):
+        return self._buffer.write(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+
+def _arrow_type(column_type):
+    if isinstance(column_type, TypeDecorator):
+        return pa.string()  # CompressedText comes back as a LazyText proxy, written as str
+    if isinstance(column_type, Boolean):
+        return pa.bool_()
+    if isinstance(column_type, Integer):
+        return pa.int64()
+    if isinstance(column_type, Float):
+        return pa.float64()
+    if isinstance(column_type, DateTime):
+        return pa.timestamp('us')
+    return pa.string()
+
+
+def _as_str(value):
+    return None if value is None else str(value)
+
+
+class DataExporter:
+    """Streams whole tables out as CSV, Parquet or Arrow without loading them.
+
+    Rows come from a server-side cursor `batch_size` at a time and every
+    batch is encoded and yielded before the next one is fetched, so memory
+    stays flat however large the table is. With `anonymize` the student_id
+    column is replaced by the student's anonymous_id. Reads go wherever the
+    session routes a SELECT, i.e. a replica when one is configured; given
+    `shards`, the rows of each college shard follow one another in the same
+    file behind a leading `shard` column, since ids repeat across shards.
+    """
+
+    def __init__(self, db, Student, datasets: Dict[str, object], batch_size=1000):
+        self.db = db
+        self.Student = Student
+        self.datasets = datasets
+        self.batch_size = batch_size
+
+    def columns(self, dataset, anonymize=False):
+        table = self.datasets[dataset].__table__
+        columns = [c for c in table.columns if not (anonymize and c.name == 'student_id')]
+        if anonymize:
+            columns.insert(1, self.Student.__table__.c.anonymous_id)
+        return columns
+
+    def statement(self, dataset, anonymize=False):
+        table = self.datasets[dataset].__table__
+        stmt = select(*self.columns(dataset, anonymize)).order_by(table.c.id)
+        if anonymize:
+            student = self.Student.__table__
+            stmt = stmt.select_from(table.join(student, student.c.id == table.c.student_id))
+        return stmt
+
+    def _engines(self, stmt, shards):
+        if shards is None:
+            yield None, self.db.session.get_bind(clause=stmt)
+            return
+        for shard in shards:
+            with use_shard(self.db, shard):
+                engine = self.db.session.get_bind(clause=stmt)
+            yield shard, engine
+
+    def _batches(self, dataset, anonymize, shards=None) -> Iterator[list]:
+        stmt = self.statement(dataset, anonymize)
+        for shard, engine in self._engines(stmt, shards):
+            with engine.connect() as conn:
+                result = conn.execution_options(stream_results=True, yield_per=self.batch_size).execute(stmt)
+                for rows in result.partitions():
+                    yield rows if shards is None else [(shard, *row) for row in rows]
+
+    def stream(self, dataset, fmt='csv', anonymize=False,
+               shards: Optional[Sequence[Optional[str]]] = None) -> Iterator[bytes]:
+        if dataset not in self.datasets:
+            raise KeyError(dataset)
+        if fmt == 'csv':
+            return self._csv(dataset, anonymize, shards)
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown export format {fmt}")
+        if not PYARROW_AVAILABLE:
+            raise RuntimeError(f"{fmt} export needs the optional pyarrow package")
+        return self._arrow(dataset, anonymize, shards, parquet=fmt == 'parquet')
+
+    def count(self, dataset, anonymize=False, shards=None) -> int:
+        """Rows an export of the dataset should contain"""
+        stmt = select(func.count()).select_from(self.statement(dataset, anonymize).subquery())
+        total = 0
+        for _, engine in self._engines(stmt, shards):
+            with engine.connect() as conn:
+                total += conn.execute(stmt).scalar()
+        return total
+
+    def check(self, dataset, fmt, anonymize=False, shards=None) -> int:
+        """Export a dataset in memory and read it back; returns its rows, ValueError if any went missing"""
+        data = b''.join(self.stream(dataset, fmt, anonymize, shards))
+        if fmt == 'csv':
+            exported = sum(1 for _ in csv.reader(io.StringIO(data.decode('utf-8')))) - 1
+        elif fmt == 'parquet':
+            exported = pq.read_table(io.BytesIO(data)).num_rows
+        else:
+            exported = pa.ipc.open_stream(data).read_all().num_rows
+        expected = self.count(dataset, anonymize, shards)
+        if exported != expected:
+            raise ValueError(f"{dataset} {fmt} export has {exported} rows, expected {expected}")
+        return exported
+
+    def _header(self, dataset, anonymize, shards):
+        names = [c.name for c in self.columns(dataset, anonymize)]
+        return names if shards is None else ['shard', *names]
+
+    def _csv(self, dataset, anonymize, shards):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(self._header(dataset, anonymize, shards))
+        for rows in self._batches(dataset, anonymize, shards):
+            writer.writerows(rows)
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+
+    def _arrow(self, dataset, anonymize, shards, parquet):
+        columns = self.columns(dataset, anonymize)
+        fields = [pa.field(c.name, _arrow_type(c.type)) for c in columns]
+        # Columns whose values are proxy objects pyarrow can't convert on its own
+        as_str = {i for i, c in enumerate(columns) if isinstance(c.type, TypeDecorator)}
+        if shards is not None:
+            fields.insert(0, pa.field('shard', pa.string()))
+            as_str = {i + 1 for i in as_str}
+        schema = pa.schema(fields)
+        sink = _Chunks()
+        writer = pq.ParquetWriter(sink, schema) if parquet else pa.ipc.new_stream(sink, schema)
+        try:
+            for rows in self._batches(dataset, anonymize, shards):
+                arrays = [pa.array([_as_str(row[i]) if i in as_str else row[i] for row in rows], type=field.type)
+                          for i, field in enumerate(schema)]
+                # One row group / record batch per cursor batch
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+                yield sink.drain()
+        finally:
+            writer.close()
+        yield sink.drain()
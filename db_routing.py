@@ -0,0 +1,226 @@
+import itertools
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import has_app_context, has_request_context, session as flask_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+from storage import engine_options
+
+REPLICA_PREFIX = 'replica_'
+SHARD_PREFIX = 'shard_'
+STICKY_SESSION_KEY = '_db_primary_until'
+SHARD_SESSION_KEY = '_db_shard'
+
+
+def replica_binds(env=os.environ):
+    """SQLALCHEMY_BINDS entries for the comma separated DATABASE_REPLICA_URLS"""
+    urls = [u.strip() for u in env.get('DATABASE_REPLICA_URLS', '').split(',') if u.strip()]
+    return {f"{REPLICA_PREFIX}{i}": {'url': url, **engine_options(url, env)} for i, url in enumerate(urls)}
+
+
+def college_key(college) -> str:
+    """Shard key for a college name: 'IIT Delhi' -> 'iit_delhi'"""
+    return re.sub(r'[^a-z0-9]+', '_', (college or '').lower()).strip('_')
+
+
+def shard_map(env=os.environ):
+    """Shard key -> (college name, database URL) from COLLEGE_SHARDS.
+
+    COLLEGE_SHARDS is a comma separated list of `College Name=database-url`.
+    Colleges not listed stay in DATABASE_URL.
+    """
+    shards = {}
+    for entry in env.get('COLLEGE_SHARDS', '').split(','):
+        if '=' not in entry:
+            continue
+        college, url = (part.strip() for part in entry.split('=', 1))
+        shards[college_key(college)] = (college, url)
+    return shards
+
+
+def shard_binds(env=os.environ):
+    """SQLALCHEMY_BINDS entries for every college shard"""
+    return {f"{SHARD_PREFIX}{key}": {'url': url, **engine_options(url, env)}
+            for key, (_, url) in shard_map(env).items()}
+
+
+class RoutingSession(Session):
+    """Route each query to its college shard, or to the primary and replicas.
+
+    The shard is the one chosen with use_shard(), else the logged-in
+    student's, stored in the Flask session at login; all of a shard's
+    queries go to its own database. Everything else
+    sends read-only queries to replicas and the rest to the primary.
+
+    A session sticks to the primary once it has written anything in the
+    current transaction, and a client that just committed keeps reading from
+    the primary for DB_REPLICA_STICKY_SECONDS so it always sees its own writes.
+    """
+
+    sticky_seconds = float(os.getenv('DB_REPLICA_STICKY_SECONDS', 10))
+    _round_robin = itertools.count()
+
+    def shard(self):
+        """Shard key the session currently routes to; None for the main database"""
+        if 'shard' in self.info:
+            return self.info['shard']
+        if has_request_context():
+            return flask_session.get(SHARD_SESSION_KEY)
+        return None
+
+    def _replicas(self):
+        return [engine for key, engine in self._db.engines.items()
+                if key and key.startswith(REPLICA_PREFIX)]
+
+    def _must_use_primary(self, clause):
+        if self._flushing or self.info.get('force_primary') or self.info.get('wrote'):
+            return True
+        if clause is None or not getattr(clause, 'is_select', False):
+            return True
+        if has_request_context() and flask_session.get(STICKY_SESSION_KEY, 0) > time.time():
+            return True
+        return False
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or engine is not self._db.engines.get(None):
+            return engine  # explicit binds and other bind keys are left alone
+
+        if clause is not None and not getattr(clause, 'is_select', False):
+            self.info['wrote'] = True  # bulk UPDATE/DELETE statements
+        shard = self.shard()
+        if shard:
+            shard_engine = self._db.engines.get(SHARD_PREFIX + shard)
+            if shard_engine is not None:
+                return shard_engine  # shards have no replicas
+        replicas = self._replicas()
+        if not replicas or self._must_use_primary(clause):
+            return engine
+        return replicas[next(self._round_robin) % len(replicas)]
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_written(session, flush_context):
+    session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _stick_to_primary(session):
+    if session.info.pop('wrote', False) and has_request_context():
+        flask_session[STICKY_SESSION_KEY] = time.time() + session.sticky_seconds
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _reset_written(session):
+    session.info.pop('wrote', None)
+
+
+@contextmanager
+def use_primary(db):
+    """Force every query in the block to the primary"""
+    previous = db.session.info.get('force_primary', False)
+    db.session.info['force_primary'] = True
+    try:
+        yield
+    finally:
+        db.session.info['force_primary'] = previous
+
+
+@contextmanager
+def use_shard(db, shard):
+    """Route every query in the block to one shard (None for the main database).
+
+    Rows from two databases can share primary keys, so the session is closed
+    on the way in and out instead of mixing them in one identity map; commit
+    before switching.
+    """
+    had_shard, previous = 'shard' in db.session.info, db.session.info.get('shard')
+    db.session.close()
+    db.session.info['shard'] = shard
+    try:
+        yield
+    finally:
+        db.session.close()
+        if had_shard:
+            db.session.info['shard'] = previous
+        else:
+            db.session.info.pop('shard', None)
+
+
+def shard_keys(db):
+    """Every database holding college data: None for the main one, then each shard"""
+    return [None] + sorted(key[len(SHARD_PREFIX):] for key in db.engines if key and key.startswith(SHARD_PREFIX))
+
+
+def current_shard(db):
+    """Shard the current session routes to; None for the main database or outside an app context"""
+    return db.session().shard() if has_app_context() else None
+
+
+class ShardLocal:
+    """One instance of a stateful helper per shard, picked by the current session's shard.
+
+    Helpers that keep rows in memory (ids, heaps, caches) must not share
+    them between databases whose ids overlap. Attribute access is forwarded
+    to the instance for the shard the session routes to.
+    """
+
+    def __init__(self, db, factory):
+        self._db = db
+        self._factory = factory
+        self._instances = {}
+        self._lock = threading.Lock()
+
+    def current(self):
+        shard = current_shard(self._db)
+        instance = self._instances.get(shard)
+        if instance is None:
+            with self._lock:
+                instance = self._instances.get(shard)
+                if instance is None:
+                    instance = self._instances[shard] = self._factory()
+        return instance
+
+    def instances(self):
+        """Every instance created so far, one per shard used"""
+        return list(self._instances.values())
+
+    def __getattr__(self, name):
+        return getattr(self.current(), name)
+
+
+def tenant_key(db, student_id):
+    """Key for per-student in-process state; student ids repeat across shards"""
+    shard = current_shard(db)
+    return f"{shard}:{student_id}" if shard else student_id
+
+
+def sync_sqlite_replicas(db):
+    """Copy the primary SQLite file into every SQLite replica.
+
+    Local stand-in for real replication, used to test routing with two
+    SQLite files.
+    """
+    primary_url = db.engines[None].url
+    if primary_url.get_backend_name() != 'sqlite':
+        raise RuntimeError('Replica sync is only available for SQLite primaries')
+
+    copied = []
+    for key, engine in db.engines.items():
+        if not key or not key.startswith(REPLICA_PREFIX):
+            continue
+        url = make_url(str(engine.url))
+        if url.get_backend_name() != 'sqlite':
+            continue
+        engine.dispose()  # don't keep the old file open while it is replaced
+        with sqlite3.connect(primary_url.database) as source, sqlite3.connect(url.database) as target:
+            source.backup(target)
+        copied.append(url.database)
+    return copied
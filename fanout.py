@@ -0,0 +1,64 @@
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from db_routing import shard_keys, use_shard
+
+
+class FanOut:
+    """Runs one query function against every college shard in parallel.
+
+    Each shard gets its own worker thread, app context and database session,
+    so shards are queried side by side rather than one after another. Results come
+    back per shard; merge_sum() and merge_latest() combine the usual admin
+    aggregates. Without shards the function just runs inline.
+
+    Rows returned by the function are detached from their session, so it
+    must load everything the caller reads (use joinedload for relationships).
+    """
+
+    def __init__(self, app, db, max_workers=8, timeout=30.0):
+        self.app = app
+        self.db = db
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fanout')
+
+    def _run(self, shard, fn):
+        with self.app.app_context(), use_shard(self.db, shard):
+            try:
+                return fn()
+            finally:
+                self.db.session.remove()
+
+    def map(self, fn: Callable, shards: Optional[List[Optional[str]]] = None) -> Dict[Optional[str], object]:
+        """{shard: fn()} for every shard (None is the main database)"""
+        shards = shard_keys(self.db) if shards is None else shards
+        if shards == [None]:
+            return {None: fn()}
+        futures = {shard: self._pool.submit(self._run, shard, fn) for shard in shards}
+        return {shard: future.result(timeout=self.timeout) for shard, future in futures.items()}
+
+    def find(self, fn: Callable):
+        """(shard, result) for the first shard, in shard order, where fn() returns something"""
+        for shard, result in self.map(fn).items():
+            if result is not None:
+                return shard, result
+        return None, None
+
+
+def merge_sum(results):
+    """Add up per-shard numbers, or dicts / lists of numbers position by position"""
+    values = list(results.values() if isinstance(results, dict) else results)
+    first = values[0]
+    if isinstance(first, dict):
+        return {key: merge_sum([value[key] for value in values]) for key in first}
+    if isinstance(first, (list, tuple)):
+        return [merge_sum(column) for column in zip(*values)]
+    return sum(value or 0 for value in values)
+
+
+def merge_latest(results, key, limit):
+    """The newest `limit` rows across shards; each shard's list must be sorted newest first"""
+    values = results.values() if isinstance(results, dict) else results
+    return list(heapq.merge(*values, key=key, reverse=True))[:limit]
+
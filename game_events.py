@@ -0,0 +1,404 @@
+import glob
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from datetime import datetime, timedelta
+from itertools import takewhile
+from typing import List, Set, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from db_routing import current_shard, shard_keys, use_primary, use_shard
+
+WATERMARK_PREFIX = 'game_log.'
+
+
+class Backpressure(Exception):
+    """The ring buffer is full; the client should retry after `retry_after` seconds"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Game event buffer full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+def _parse_time(value) -> datetime:
+    return datetime.fromisoformat(value)
+
+
+def fold_event(aggregate, event):
+    """Apply one event to a GameSessionAggregate; events of a session must arrive in order"""
+    occurred = _parse_time(event['occurred_at'])
+    aggregate.events = (aggregate.events or 0) + 1
+    if aggregate.started_at is None or occurred < aggregate.started_at:
+        aggregate.started_at = occurred
+    if aggregate.last_event_at is None or occurred > aggregate.last_event_at:
+        aggregate.last_event_at = occurred
+
+    if event['event'] == 'complete':
+        aggregate.completions = (aggregate.completions or 0) + 1
+        aggregate.current_streak = (aggregate.current_streak or 0) + 1
+        aggregate.best_streak = max(aggregate.best_streak or 0, aggregate.current_streak)
+    elif event['event'] == 'miss':
+        aggregate.current_streak = 0
+    if event.get('score') is not None:
+        aggregate.best_score = event['score'] if aggregate.best_score is None else max(aggregate.best_score, event['score'])
+
+    span = (aggregate.last_event_at - aggregate.started_at).total_seconds()
+    aggregate.duration_seconds = max(aggregate.duration_seconds or 0.0, span, event.get('duration_seconds') or 0.0)
+
+
+class GameEventPipeline:
+    """Buffers game events in memory and writes compacted per-session rows.
+
+    ingest() appends each event to a local append-only log and to a bounded
+    ring buffer, and returns without touching the database. A background
+    flusher folds batches of buffered events into one GameSessionAggregate
+    row per play session and stores how far into the log it got in
+    ProcessingWatermark, in the same transaction. Events carry the student's
+    college shard and are written to, and watermarked in, that shard's
+    database. Logs left behind by a
+    worker that died are replayed from that offset, so every logged event
+    is counted exactly once. When the buffer is full, ingest() raises
+    Backpressure instead of growing without bound.
+
+    Every folded event leaves a GameEventReceipt keyed by (student_id,
+    client_id), written with the aggregates, and the fold skips events that
+    already have one, so a batch resent to another worker or after a
+    restart is not counted twice. Receipts are kept for `receipt_days`.
+    """
+
+    def __init__(self, app, db, GameSessionAggregate, GameEventReceipt, ProcessingWatermark, log_dir,
+                 capacity=10000, batch_size=1000, flush_interval=1.0,
+                 rotate_bytes=16 * 1024 * 1024, fsync=False, dedup_window=100000, receipt_days=30):
+        self.app = app
+        self.db = db
+        self.GameSessionAggregate = GameSessionAggregate
+        self.GameEventReceipt = GameEventReceipt
+        self.ProcessingWatermark = ProcessingWatermark
+        self.log_dir = log_dir
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rotate_bytes = rotate_bytes
+        self.fsync = fsync
+        self.dedup_window = dedup_window
+        self.receipt_days = receipt_days
+        self.host = hashlib.sha1(socket.gethostname().encode('utf-8')).hexdigest()[:8]
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._buffer = deque()  # (event, log name, offset after its line, enqueued at)
+        self._recent = OrderedDict()  # (student_id, client_id) buffered by this process, maybe not folded yet
+        self._log = None
+        self._log_name = None
+        self._pid = os.getpid()
+        self._wake = threading.Event()
+        self._flusher_pid = None
+        self.buffered = 0
+        self.flushed = 0
+        self.replayed = 0
+        self.rejected = 0
+
+    # --- ingestion -------------------------------------------------------
+
+    def _open_log(self):
+        os.makedirs(self.log_dir, exist_ok=True)
+        self._log_name = f"{self.host}-{os.getpid()}-{int(time.time() * 1000)}"
+        self._log = open(os.path.join(self.log_dir, f"game-events-{self._log_name}.log"), 'ab')
+
+    def _received(self, student_id, client_ids) -> Set[str]:
+        """Which of client_ids already have a receipt"""
+        Receipt = self.GameEventReceipt
+        client_ids = list(client_ids)
+        found = set()
+        with use_primary(self.db):
+            for i in range(0, len(client_ids), 500):
+                found.update(cid for (cid,) in self.db.session.query(Receipt.client_id).filter(
+                    Receipt.student_id == student_id, Receipt.client_id.in_(client_ids[i:i + 500])))
+        return found
+
+    def ingest(self, student_id, rows) -> Tuple[List[str], List[str]]:
+        """Buffer validated event rows; returns (accepted, duplicate) client ids"""
+        accepted, duplicates, events = [], [], []
+        shard = current_shard(self.db)
+        received = self._received(student_id, {row['client_id'] for row in rows})
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked: whatever was buffered belongs to the parent and its log
+                self._pid = os.getpid()
+                self._buffer.clear()
+                self._recent.clear()
+                self._log = None
+            for row in rows:
+                key = (student_id, row['client_id'])
+                if key in self._recent or row['client_id'] in received:
+                    duplicates.append(row['client_id'])
+                    continue
+                self._recent[key] = None
+                accepted.append(row['client_id'])
+                event = dict(row, student_id=student_id, occurred_at=row['occurred_at'].isoformat())
+                if shard:
+                    event['shard'] = shard
+                events.append(event)
+            if len(self._buffer) + len(events) > self.capacity:
+                for row in events:
+                    del self._recent[(student_id, row['client_id'])]
+                self.rejected += len(events)
+                raise Backpressure(retry_after=max(1, int(self.flush_interval * 2)))
+            while len(self._recent) > self.dedup_window:
+                self._recent.popitem(last=False)
+
+            if events:
+                now = time.time()
+                if self._log is None:
+                    self._open_log()
+                for event in events:
+                    self._log.write(json.dumps(event, separators=(',', ':')).encode('utf-8') + b'\n')
+                    self._buffer.append((event, self._log_name, self._log.tell(), now))
+                self._log.flush()
+                if self.fsync:
+                    os.fsync(self._log.fileno())
+                self.buffered += len(events)
+        self.ensure_flusher()
+        if len(self._buffer) >= self.batch_size:
+            self._wake.set()
+        return accepted, duplicates
+
+    def depth(self) -> int:
+        return len(self._buffer)
+
+    def lag_seconds(self) -> float:
+        """How long the oldest buffered event has been waiting for the flusher"""
+        try:
+            return time.time() - self._buffer[0][3]
+        except IndexError:
+            return 0.0
+
+    # --- flushing --------------------------------------------------------
+
+    def _watermark(self, name, create=False):
+        Watermark = self.ProcessingWatermark
+        watermark = self.db.session.get(Watermark, WATERMARK_PREFIX + name)
+        if watermark is None and create:
+            watermark = Watermark(name=WATERMARK_PREFIX + name, last_id=0)
+            self.db.session.add(watermark)
+            self.db.session.flush()
+        return watermark
+
+    def _apply(self, events, log_name, from_offset, to_offset) -> bool:
+        """Fold events into aggregates and move the log watermark, atomically"""
+        for attempt in range(2):
+            try:
+                return self._fold(events, log_name, from_offset, to_offset)
+            except IntegrityError:
+                # Another worker folded a resent copy of one of these events first
+                self.db.session.rollback()
+                if attempt:
+                    raise
+
+    def _fold(self, events, log_name, from_offset, to_offset) -> bool:
+        Aggregate, Receipt, Watermark = self.GameSessionAggregate, self.GameEventReceipt, self.ProcessingWatermark
+        session = self.db.session
+        self._watermark(log_name, create=True)
+        # Only one writer may advance a log; a replay racing us matches no row here
+        claimed = session.query(Watermark).filter_by(name=WATERMARK_PREFIX + log_name, last_id=from_offset).update(
+            {'last_id': to_offset, 'updated_at': datetime.utcnow()}, synchronize_session=False)
+        if not claimed:
+            session.rollback()
+            return False
+
+        by_student = defaultdict(set)
+        for event in events:
+            by_student[event['student_id']].add(event['client_id'])
+        seen = {(student_id, client_id) for student_id, client_ids in by_student.items()
+                for client_id in self._received(student_id, client_ids)}
+        fresh = []
+        for event in events:
+            key = (event['student_id'], event['client_id'])
+            if key not in seen:
+                seen.add(key)
+                fresh.append(event)
+        if fresh:
+            session.execute(insert(Receipt), [{'student_id': e['student_id'], 'client_id': e['client_id']}
+                                              for e in fresh])
+
+        sessions = defaultdict(list)
+        for event in fresh:
+            sessions[(event['student_id'], event['session_id'])].append(event)
+        existing = {}
+        student_ids = {student_id for student_id, _ in sessions}
+        session_ids = {session_id for _, session_id in sessions}
+        if sessions:
+            for aggregate in Aggregate.query.filter(Aggregate.student_id.in_(student_ids),
+                                                    Aggregate.session_id.in_(session_ids)):
+                existing[(aggregate.student_id, aggregate.session_id)] = aggregate
+
+        for key, session_events in sessions.items():
+            aggregate = existing.get(key)
+            if aggregate is None:
+                aggregate = Aggregate(student_id=key[0], session_id=key[1], game=session_events[0]['game'],
+                                      events=0, completions=0, current_streak=0, best_streak=0,
+                                      duration_seconds=0.0)
+                session.add(aggregate)
+            for event in sorted(session_events, key=lambda e: e['occurred_at']):
+                fold_event(aggregate, event)
+            aggregate.updated_at = datetime.utcnow()
+        session.commit()
+        return True
+
+    def flush(self) -> int:
+        """Write one batch of buffered events; returns how many were written"""
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._buffer)[:self.batch_size]
+            if not batch:
+                self._maybe_rotate()
+                return 0
+            # A batch never spans two logs (rotation only happens with an empty
+            # buffer) or two shards, whose watermarks live in different databases
+            log_name, shard = batch[0][1], batch[0][0].get('shard')
+            batch = list(takewhile(lambda item: item[1] == log_name and item[0].get('shard') == shard, batch))
+            with use_shard(self.db, shard), use_primary(self.db):
+                for attempt in range(2):
+                    # Whoever moved the watermark past an event (a replay of this
+                    # log) folded it already, so those events are only dropped
+                    watermark = self._watermark(log_name, create=True)
+                    covered = len(list(takewhile(lambda item: item[2] <= watermark.last_id, batch)))
+                    pending = batch[covered:]
+                    if not pending or self._apply([item[0] for item in pending], log_name,
+                                                  watermark.last_id, pending[-1][2]):
+                        done, written = len(batch), len(pending)
+                        break
+                    done, written = covered, 0
+                else:
+                    print(f"⚠️ Game event log {log_name} is being replayed elsewhere, retrying later")
+            with self._lock:
+                for _ in range(done):
+                    self._buffer.popleft()
+            self.flushed += written
+            return done
+
+    def _maybe_rotate(self):
+        """Start a fresh log once the current one is large and fully flushed"""
+        with self._lock:
+            if self._buffer or self._log is None or self._log.tell() < self.rotate_bytes:
+                return
+            path, name = self._log.name, self._log_name
+            self._log.close()
+            self._log = None
+        os.remove(path)
+        self._forget(name)
+
+    def _forget(self, log_name):
+        for shard in shard_keys(self.db):
+            with use_shard(self.db, shard):
+                self.ProcessingWatermark.query.filter_by(name=WATERMARK_PREFIX + log_name).delete()
+                self.db.session.commit()
+
+    # --- recovery --------------------------------------------------------
+
+    def _is_live(self, log_name) -> bool:
+        host, pid, _ = log_name.split('-')
+        if host != self.host:
+            return True  # can't tell from here; its own host replays it
+        if int(pid) == os.getpid():
+            return True
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def _replay(self, path, log_name, shard) -> Tuple[int, bool]:
+        """Apply one shard's unflushed events from a log; (events replayed, finished)"""
+        replayed = 0
+        watermark = self._watermark(log_name, create=True)
+        offset = watermark.last_id
+        self.db.session.commit()
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            while True:
+                events, end = [], offset
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break  # torn write from the crash, never acknowledged as flushed
+                    end += len(line)
+                    event = json.loads(line)
+                    if event.get('shard') == shard:
+                        events.append(event)
+                        if len(events) >= self.batch_size:
+                            break
+                if not events:
+                    return replayed, True
+                if not self._apply(events, log_name, offset, end):
+                    return replayed, False  # another worker is replaying this log
+                replayed += len(events)
+                offset = end
+
+    def recover(self) -> int:
+        """Replay the unflushed tail of logs left behind by dead workers on this host, drop old receipts"""
+        replayed = 0
+        for path in sorted(glob.glob(os.path.join(self.log_dir, 'game-events-*.log'))):
+            log_name = os.path.basename(path)[len('game-events-'):-len('.log')]
+            if log_name == self._log_name or self._is_live(log_name):
+                continue
+            finished = True
+            for shard in shard_keys(self.db):
+                with use_shard(self.db, shard), use_primary(self.db):
+                    count, done = self._replay(path, log_name, shard)
+                replayed += count
+                finished = finished and done
+            if finished:
+                os.remove(path)
+                self._forget(log_name)
+        # Receipts only need to outlive the queue of a client that went offline
+        cutoff = datetime.utcnow() - timedelta(days=self.receipt_days)
+        for shard in shard_keys(self.db):
+            with use_shard(self.db, shard), use_primary(self.db):
+                self.GameEventReceipt.query.filter(self.GameEventReceipt.received_at < cutoff).delete(
+                    synchronize_session=False)
+                self.db.session.commit()
+        self.replayed += replayed
+        if replayed:
+            print(f"♻️ Replayed {replayed} game events from orphaned logs")
+        return replayed
+
+    # --- background flusher ------------------------------------------------
+
+    def ensure_flusher(self):
+        """Start the flusher thread once per process (again after a fork)"""
+        if self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+            threading.Thread(target=self._flush_forever, name='game-event-flusher', daemon=True).start()
+
+    def _flush_forever(self):
+        with self.app.app_context():
+            try:
+                self.recover()
+            except Exception as e:
+                self.db.session.rollback()
+                print(f"⚠️ Game event replay failed: {e}")
+            finally:
+                self.db.session.remove()
+            while True:
+                self._wake.wait(self.flush_interval)
+                self._wake.clear()
+                try:
+                    while self.flush() and self.depth():
+                        pass
+                except Exception as e:
+                    self.db.session.rollback()
+                    print(f"⚠️ Game event flush failed: {e}")
+                finally:
+                    self.db.session.remove()
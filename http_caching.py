@@ -0,0 +1,126 @@
+import hashlib
+import zlib
+from functools import wraps
+from typing import Callable, Iterable, Optional, Tuple
+
+from flask import make_response, request, session
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/plain', 'text/css', 'text/javascript', 'application/javascript',
+    'application/json', 'image/svg+xml', 'text/csv',
+}
+
+
+class ResponseCompressor:
+    """gzip/brotli for dynamic responses above a size threshold.
+
+    Streamed responses are compressed chunk by chunk with a sync flush after
+    each one, so the client still receives every chunk as soon as it is
+    produced. Responses that already carry a Content-Encoding (the
+    pre-rendered game pages) are left alone.
+    """
+
+    def __init__(self, app=None, min_size=1024, gzip_level=6, brotli_quality=5):
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.after_request(self.compress)
+
+    def _choose_encoding(self) -> Optional[str]:
+        accepted = request.accept_encodings
+        if BROTLI_AVAILABLE and accepted['br']:
+            return 'br'
+        if accepted['gzip']:
+            return 'gzip'
+        return None
+
+    def _compressor(self, encoding):
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=self.brotli_quality)
+            return compressor.process, compressor.flush, compressor.finish
+        # wbits=31 writes the gzip header and trailer
+        compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)
+        return compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+    def _stream(self, chunks: Iterable[bytes], encoding):
+        process, flush, finish = self._compressor(encoding)
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                if chunk:
+                    yield process(chunk) + flush()
+            yield finish()
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+
+    def compress(self, response):
+        if (response.status_code < 200 or response.status_code in (204, 206, 304)
+                or response.direct_passthrough or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = self._choose_encoding()
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = self._stream(response.response, encoding)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+            process, _, finish = self._compressor(encoding)
+            response.set_data(process(data) + finish())
+        response.headers['Content-Encoding'] = encoding
+
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            # A strong validator belongs to one exact byte sequence
+            response.set_etag(f"{etag}-{encoding}")
+        return response
+
+
+def conditional(stamp: Callable[[], Tuple[tuple, Optional[object]]]):
+    """Answer GETs with 304 while the data behind a page is unchanged.
+
+    `stamp` returns (version parts, last_modified) from cheap aggregate
+    queries; the weak ETag also covers the URL and who is logged in, since
+    the navigation bar is rendered from the session.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET' or session.get('_flashes'):
+                return view(*args, **kwargs)
+
+            parts, last_modified = stamp()
+            identity = (session.get('student_id'), session.get('student_name'), session.get('is_admin'))
+            digest = hashlib.sha1(repr((request.full_path, identity, parts)).encode('utf-8')).hexdigest()
+
+            if request.if_none_match.contains_weak(digest):
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(digest, weak=True)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            # Browsers may keep the page but must revalidate it every time
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,248 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from flask import Response, before_render_template, g, has_request_context, request, session, template_rendered
+from sqlalchemy import event
+
+try:
+    from pyinstrument import Profiler as PyinstrumentProfiler
+    PYINSTRUMENT_AVAILABLE = True
+except ImportError:
+    PYINSTRUMENT_AVAILABLE = False
+
+PROFILE_HEADER = 'X-Zenithra-Profile'
+# Slow-request log keeps this many statements per request, slowest first
+MAX_LOGGED_QUERIES = 10
+MAX_TRACKED_QUERIES = 200
+
+
+class RequestTrace:
+    """Timings collected while serving a single request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_ms = 0.0
+        self.queries: List[tuple] = []
+        self.gemini_calls = 0
+        self.gemini_ms = 0.0
+        self.template_ms = 0.0
+        self.template_starts: List[float] = []
+        self.profiler = None
+        self.profile_mode: Optional[str] = None
+        self.profile_sampled = False
+        self.finished = False
+
+    def add_query(self, statement, ms):
+        self.sql_count += 1
+        self.sql_ms += ms
+        if len(self.queries) < MAX_TRACKED_QUERIES:
+            self.queries.append((ms, statement))
+
+    def slowest_queries(self, limit=MAX_LOGGED_QUERIES):
+        return [{'ms': round(ms, 2), 'sql': statement[:500]}
+                for ms, statement in sorted(self.queries, key=lambda q: q[0], reverse=True)[:limit]]
+
+
+class Instrumentation:
+    """Per-endpoint timing, SQL, Gemini and template instrumentation for the Flask app.
+
+    Admins can profile a single request by sending the X-Zenithra-Profile
+    header (`cprofile` or `pyinstrument`); the report replaces the response
+    body. PROFILE_SAMPLE_RATE profiles a random fraction of all requests into
+    PROFILE_DIR, and requests slower than SLOW_REQUEST_MS are appended to
+    SLOW_REQUEST_LOG together with their slowest queries.
+    """
+
+    def __init__(self, app=None, db=None, env=os.environ):
+        self.slow_request_ms = float(env.get('SLOW_REQUEST_MS', 1000))
+        self.slow_request_log = env.get('SLOW_REQUEST_LOG', 'instance/slow_requests.log')
+        self.profile_sample_rate = float(env.get('PROFILE_SAMPLE_RATE', 0))
+        self.profile_dir = env.get('PROFILE_DIR', 'instance/profiles')
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, Dict[str, float]] = {}
+        # Called as observer(endpoint, method, status_code, duration_ms, trace) after every request
+        self.observers: List[Callable] = []
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        before_render_template.connect(self._template_started, app)
+        template_rendered.connect(self._template_finished, app)
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, 'before_cursor_execute', self._query_started)
+                event.listen(engine, 'after_cursor_execute', self._query_finished)
+
+    @staticmethod
+    def current() -> Optional[RequestTrace]:
+        if not has_request_context():
+            return None
+        return g.get('_request_trace')
+
+    def _before_request(self):
+        trace = g._request_trace = RequestTrace()
+        mode = request.headers.get(PROFILE_HEADER, '').lower()
+        if mode and session.get('is_admin'):
+            trace.profile_mode = mode
+        elif self.profile_sample_rate and random.random() < self.profile_sample_rate:
+            trace.profile_mode, trace.profile_sampled = 'cprofile', True
+        if trace.profile_mode:
+            self._start_profiler(trace)
+
+    def _after_request(self, response):
+        trace = self.current()
+        if trace is None or trace.finished:
+            return response
+        report = self._stop_profiler(trace)
+        duration_ms = self._finish(trace, response.status_code)
+
+        if session.get('is_admin'):
+            response.headers['Server-Timing'] = ', '.join([
+                f"app;dur={duration_ms:.1f}",
+                f'sql;dur={trace.sql_ms:.1f};desc="{trace.sql_count} queries"',
+                f"gemini;dur={trace.gemini_ms:.1f}",
+                f"template;dur={trace.template_ms:.1f}",
+            ])
+        if report is not None:
+            if trace.profile_sampled:
+                self._save_profile(report)
+            else:
+                mimetype = 'text/html' if trace.profile_mode == 'pyinstrument' else 'text/plain'
+                return Response(report, mimetype=mimetype)
+        return response
+
+    def _teardown_request(self, exc):
+        trace = self.current()
+        if trace is not None and not trace.finished:
+            # after_request is skipped when the view raised
+            self._stop_profiler(trace)
+            self._finish(trace, 500)
+
+    def _finish(self, trace, status_code):
+        trace.finished = True
+        duration_ms = (time.perf_counter() - trace.started) * 1000
+        endpoint = request.endpoint or 'unmatched'
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, {
+                'count': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'sql_count': 0,
+                'sql_ms': 0.0, 'gemini_calls': 0, 'gemini_ms': 0.0, 'template_ms': 0.0,
+            })
+            stats['count'] += 1
+            stats['errors'] += status_code >= 500
+            stats['total_ms'] += duration_ms
+            stats['max_ms'] = max(stats['max_ms'], duration_ms)
+            stats['sql_count'] += trace.sql_count
+            stats['sql_ms'] += trace.sql_ms
+            stats['gemini_calls'] += trace.gemini_calls
+            stats['gemini_ms'] += trace.gemini_ms
+            stats['template_ms'] += trace.template_ms
+        for observer in self.observers:
+            observer(endpoint, request.method, status_code, duration_ms, trace)
+        if duration_ms >= self.slow_request_ms:
+            self._log_slow_request(trace, endpoint, status_code, duration_ms)
+        return duration_ms
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Copy of the per-endpoint totals since startup"""
+        with self._lock:
+            return {endpoint: dict(stats) for endpoint, stats in self._endpoints.items()}
+
+    def _query_started(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_query_starts', []).append(time.perf_counter())
+
+    def _query_finished(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('_query_starts')
+        if not starts:
+            return
+        ms = (time.perf_counter() - starts.pop()) * 1000
+        trace = self.current()
+        if trace is not None:
+            # Parameters are never recorded, they may hold student messages
+            trace.add_query(statement, ms)
+
+    def _template_started(self, sender, template, context, **extra):
+        trace = self.current()
+        if trace is not None:
+            trace.template_starts.append(time.perf_counter())
+
+    def _template_finished(self, sender, template, context, **extra):
+        trace = self.current()
+        if trace is not None and trace.template_starts:
+            trace.template_ms += (time.perf_counter() - trace.template_starts.pop()) * 1000
+
+    @contextmanager
+    def gemini_call(self):
+        """Time an outbound Gemini request"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            trace = self.current()
+            if trace is not None:
+                trace.gemini_calls += 1
+                trace.gemini_ms += (time.perf_counter() - started) * 1000
+
+    def _start_profiler(self, trace):
+        if trace.profile_mode == 'pyinstrument' and PYINSTRUMENT_AVAILABLE:
+            trace.profiler = PyinstrumentProfiler()
+            trace.profiler.start()
+        else:
+            trace.profile_mode = 'cprofile'
+            trace.profiler = cProfile.Profile()
+            trace.profiler.enable()
+
+    def _stop_profiler(self, trace):
+        profiler, trace.profiler = trace.profiler, None
+        if profiler is None:
+            return None
+        if trace.profile_mode == 'pyinstrument':
+            profiler.stop()
+            return profiler.output_html()
+        profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(50)
+        return out.getvalue()
+
+    def _save_profile(self, report):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        name = f"{_timestamp()}-{(request.endpoint or 'unmatched').replace('.', '_')}.txt"
+        with open(os.path.join(self.profile_dir, name), 'w', encoding='utf-8') as f:
+            f.write(f"{request.method} {request.full_path}\n\n{report}")
+
+    def _log_slow_request(self, trace, endpoint, status_code, duration_ms):
+        print(f"🐢 Slow request {request.method} {request.path}: {duration_ms:.0f}ms, "
+              f"{trace.sql_count} queries ({trace.sql_ms:.0f}ms)")
+        entry = {
+            'at': _timestamp(),
+            'method': request.method,
+            'path': request.path,
+            'endpoint': endpoint,
+            'status': status_code,
+            'duration_ms': round(duration_ms, 2),
+            'sql_count': trace.sql_count,
+            'sql_ms': round(trace.sql_ms, 2),
+            'gemini_ms': round(trace.gemini_ms, 2),
+            'template_ms': round(trace.template_ms, 2),
+            'queries': trace.slowest_queries(),
+        }
+        directory = os.path.dirname(self.slow_request_log)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.slow_request_log, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+
+
+def _timestamp():
+    return time.strftime('%Y%m%dT%H%M%S', time.gmtime()) + f"{time.time() % 1:.3f}"[1:]
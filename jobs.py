@@ -0,0 +1,335 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from collections import namedtuple
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from db_routing import shard_keys, use_primary, use_shard
+
+# interval: seconds between runs of a periodic job, None for on-demand jobs
+# per_shard: periodic runs are scheduled once per college shard
+# concurrency: how many jobs of this type may run at once across all workers
+JobType = namedtuple('JobType', ['name', 'handler', 'interval', 'per_shard', 'concurrency', 'max_attempts'])
+
+
+class JobRunner:
+    """Runs maintenance work from the `job` table outside of request handlers.
+
+    Requests (and the scheduler, for periodic job types) insert a pending
+    Job row; worker processes claim due rows with a conditional UPDATE, the
+    same lease pattern as the crisis outbox. A worker holds a lease on the
+    job it runs and extends it with a heartbeat, so a job whose worker died
+    becomes due again once the lease runs out. Each job type has a
+    concurrency limit across all workers, enforced by numbered slots that a
+    running job holds under a unique constraint, failures are retried with
+    exponential backoff, and a job runs against the college shard it was
+    enqueued for.
+    """
+
+    def __init__(self, app, db, Job, poll_interval=2.0, lease_seconds=60, base_backoff=30,
+                 schedule_interval=30.0, keep_days=7):
+        self.app = app
+        self.db = db
+        self.Job = Job
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.base_backoff = base_backoff
+        self.schedule_interval = schedule_interval
+        self.keep_days = keep_days
+        self.types: Dict[str, JobType] = {}
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.completed = 0
+        self.failed = 0
+        self._scheduled_at = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def register(self, name, handler, interval=None, per_shard=True, concurrency=1, max_attempts=3):
+        """Add a job type; handler(**payload) runs inside the job's shard"""
+        self.types[name] = JobType(name, handler, interval, per_shard, concurrency, max_attempts)
+
+    # --- producers ---------------------------------------------------------
+
+    def enqueue(self, job_type, payload=None, shard=None, run_at=None, dedup_key=None):
+        """Add a job to the caller's transaction; the caller commits.
+
+        Jobs always live in the main database, whichever shard they run against.
+        """
+        if job_type not in self.types:
+            raise LookupError(f"Unknown job type {job_type!r}")
+        job = self.Job(job_type=job_type, shard=shard, payload=json.dumps(payload or {}),
+                       run_at=run_at or datetime.utcnow(), dedup_key=dedup_key)
+        self.db.session.add(job)
+        return job
+
+    def enqueue_now(self, job_type, payload=None, shard=None, dedup_key=None):
+        """Commit a job in the main database right away, outside the caller's transaction and shard.
+
+        With a dedup_key, returns None instead when a job with that key is still queued or running.
+        """
+        if job_type not in self.types:
+            raise LookupError(f"Unknown job type {job_type!r}")
+        try:
+            with self.db.engine.begin() as conn:
+                result = conn.execute(self.Job.__table__.insert().values(
+                    job_type=job_type, shard=shard, payload=json.dumps(payload or {}), run_at=datetime.utcnow(),
+                    dedup_key=dedup_key))
+        except IntegrityError:
+            if dedup_key is None:
+                raise
+            return None
+        return result.inserted_primary_key[0]
+
+    @staticmethod
+    def _periodic_key(job_type, shard):
+        return f"periodic:{job_type}:{shard or ''}"
+
+    def schedule(self) -> int:
+        """Enqueue a run of every periodic job type that has none pending; returns jobs added"""
+        Job = self.Job
+        added = 0
+        with use_shard(self.db, None), use_primary(self.db):
+            pending = {key for (key,) in self.db.session.query(Job.dedup_key).filter(Job.dedup_key.isnot(None))}
+            for spec in self.types.values():
+                if spec.interval is None:
+                    continue
+                for shard in (shard_keys(self.db) if spec.per_shard else [None]):
+                    key = self._periodic_key(spec.name, shard)
+                    if key in pending:
+                        continue
+                    try:
+                        self.enqueue(spec.name, shard=shard, dedup_key=key)
+                        self.db.session.commit()
+                        added += 1
+                    except IntegrityError:
+                        self.db.session.rollback()  # another worker scheduled it first
+            # Finished jobs are only kept for inspection
+            cutoff = datetime.utcnow() - timedelta(days=self.keep_days)
+            Job.query.filter(Job.status.in_(('done', 'failed')), Job.finished_at < cutoff).delete(
+                synchronize_session=False)
+            self.db.session.commit()
+        return added
+
+    # --- leases ------------------------------------------------------------
+
+    def _due_filter(self, now):
+        Job = self.Job
+        pending = (Job.status == 'pending') & (Job.run_at <= now)
+        # Jobs left running by a dead worker become due again once the lease expires
+        stale = (Job.status == 'running') & (Job.locked_until < now)
+        return pending | stale
+
+    def _claim(self, job_id, job_type, now) -> bool:
+        """Take a free concurrency slot of the job's type along with the job itself.
+
+        (job_type, slot) is unique, so when two workers go for the last free
+        slot the database lets exactly one UPDATE through.
+        """
+        Job = self.Job
+        # Slots of jobs whose worker stopped renewing the lease are up for grabs
+        Job.query.filter(Job.job_type == job_type, Job.status == 'running', Job.locked_until < now,
+                         Job.slot.isnot(None)).update({'slot': None}, synchronize_session=False)
+        self.db.session.commit()
+        taken = {slot for (slot,) in self.db.session.query(Job.slot).filter(
+            Job.job_type == job_type, Job.slot.isnot(None), Job.id != job_id)}
+        for slot in range(self.types[job_type].concurrency):
+            if slot in taken:
+                continue
+            try:
+                claimed = Job.query.filter(Job.id == job_id, self._due_filter(now)).update({
+                    'status': 'running',
+                    'locked_by': self.worker_id,
+                    'locked_until': now + timedelta(seconds=self.lease_seconds),
+                    'heartbeat_at': now,
+                    'attempts': Job.attempts + 1,
+                    'slot': slot,
+                }, synchronize_session=False)
+                self.db.session.commit()
+            except IntegrityError:
+                self.db.session.rollback()  # another worker took this slot first
+                continue
+            return claimed == 1
+        return False
+
+    def _release(self, job_id, values) -> bool:
+        """Update a job we hold; False when the lease was lost to another worker"""
+        Job = self.Job
+        updated = Job.query.filter(Job.id == job_id, Job.locked_by == self.worker_id,
+                                   Job.status == 'running').update(values, synchronize_session=False)
+        self.db.session.commit()
+        return updated == 1
+
+    def _heartbeat(self, job_id, done: threading.Event):
+        with self.app.app_context():
+            try:
+                while not done.wait(self.lease_seconds / 3):
+                    now = datetime.utcnow()
+                    if not self._release(job_id, {'heartbeat_at': now,
+                                                  'locked_until': now + timedelta(seconds=self.lease_seconds)}):
+                        print(f"⚠️ Lost the lease on job #{job_id}")
+                        return
+            finally:
+                self.db.session.remove()
+
+    # --- workers -----------------------------------------------------------
+
+    def _next(self, now):
+        """Claim the oldest due job whose type has a free slot"""
+        Job = self.Job
+        with use_primary(self.db):
+            due = Job.query.with_entities(Job.id, Job.job_type).filter(
+                self._due_filter(now), Job.job_type.in_(list(self.types))
+            ).order_by(Job.run_at, Job.id).limit(50).all()
+            full = set()
+            for job_id, job_type in due:
+                if job_type in full:
+                    continue
+                if self._claim(job_id, job_type, now):
+                    return self.db.session.get(Job, job_id)
+                full.add(job_type)
+        return None
+
+    def _execute(self, job):
+        job_id, spec, shard, attempts = job.id, self.types[job.job_type], job.shard, job.attempts
+        payload = json.loads(job.payload or '{}')
+        if attempts > spec.max_attempts:
+            # Its worker kept dying before it could record a failure
+            self._finish(job_id, spec, shard, 'failed', 'Lease expired too many times')
+            return
+
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job_id, done),
+                                     name=f"job-heartbeat-{job_id}", daemon=True)
+        heartbeat.start()
+        started = time.monotonic()
+        try:
+            with use_shard(self.db, shard):
+                result = spec.handler(**payload)
+        except Exception:
+            self.db.session.rollback()
+            error = traceback.format_exc(limit=5)
+            print(f"⚠️ Job #{job_id} {spec.name} failed (attempt {attempts}): {error.strip().splitlines()[-1]}")
+            if attempts < spec.max_attempts:
+                retry_at = datetime.utcnow() + timedelta(seconds=self.base_backoff * 2 ** (attempts - 1))
+                self._release(job_id, {'status': 'pending', 'locked_by': None, 'locked_until': None, 'slot': None,
+                                       'run_at': retry_at, 'last_error': error})
+            else:
+                self._finish(job_id, spec, shard, 'failed', error)
+            return
+        finally:
+            done.set()
+            heartbeat.join()
+        label = f" [{shard}]" if shard else ''
+        print(f"✅ Job #{job_id} {spec.name}{label}: {result!r} in {time.monotonic() - started:.1f}s")
+        self._finish(job_id, spec, shard, 'done', '')
+
+    def _finish(self, job_id, spec, shard, status, error):
+        Job = self.Job
+        now = datetime.utcnow()
+        key = self.db.session.query(Job.dedup_key).filter(Job.id == job_id).scalar()
+        updated = Job.query.filter(Job.id == job_id, Job.locked_by == self.worker_id, Job.status == 'running').update(
+            {'status': status, 'finished_at': now, 'last_error': error, 'locked_until': None, 'slot': None,
+             'dedup_key': None},
+            synchronize_session=False)
+        if updated != 1:
+            self.db.session.rollback()  # lost the lease; whoever holds it now records the outcome
+            return
+        if key and spec.interval is not None:
+            # The next run of a periodic job is due one interval after this one finished,
+            # handed over in the same commit so the scheduler never sees a gap
+            self.enqueue(spec.name, shard=shard, run_at=now + timedelta(seconds=spec.interval), dedup_key=key)
+        self.db.session.commit()
+        if status == 'done':
+            self.completed += 1
+        else:
+            self.failed += 1
+
+    def run_pending(self, limit=None) -> int:
+        """Run due jobs one after another until none are left; returns jobs run"""
+        ran = 0
+        while limit is None or ran < limit:
+            job = self._next(datetime.utcnow())
+            if job is None:
+                break
+            self._execute(job)
+            ran += 1
+        return ran
+
+    def run_forever(self):
+        with self.app.app_context():
+            while not self._stop.is_set():
+                ran = 0
+                try:
+                    if time.monotonic() - self._scheduled_at >= self.schedule_interval:
+                        self._scheduled_at = time.monotonic()
+                        self.schedule()
+                    ran = self.run_pending(limit=1)
+                except Exception as e:
+                    self.db.session.rollback()
+                    print(f"⚠️ Job runner error: {e}")
+                finally:
+                    self.db.session.remove()
+                if not ran:
+                    self._stop.wait(self.poll_interval)
+
+    def start(self):
+        """Run a worker thread in this process (development server)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name='job-runner', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def status(self):
+        """(job type, shard, status, count) for every job in the table"""
+        Job = self.Job
+        with use_shard(self.db, None):
+            return self.db.session.query(Job.job_type, Job.shard, Job.status, self.db.func.count(Job.id)).group_by(
+                Job.job_type, Job.shard, Job.status).order_by(Job.job_type, Job.shard, Job.status).all()
+
+
+def run_worker_processes(count, command, restart_delay=5.0):
+    """Keep `count` worker processes running `command` until interrupted.
+
+    Separate processes instead of threads so that one CPU-heavy job (the
+    recommendation matrix products, archive compression) can't stall the
+    others behind the GIL; each child opens its own database connections.
+    """
+    children = {}
+    try:
+        while True:
+            for slot in range(count):
+                child: Optional[subprocess.Popen] = children.get(slot)
+                if child is not None and child.poll() is None:
+                    continue
+                if child is not None:
+                    print(f"⚠️ Job worker {child.pid} exited with {child.returncode}, restarting")
+                children[slot] = subprocess.Popen(command)
+                print(f"👷 Job worker {children[slot].pid} started")
+            time.sleep(restart_delay)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for child in children.values():
+            if child.poll() is None:
+                child.terminate()
+        for child in children.values():
+            child.wait()
+
+
+def worker_command(*args):
+    """`flask run-jobs` for a child process, using this interpreter"""
+    return [sys.executable, '-m', 'flask', 'run-jobs', *args]
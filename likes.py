@@ -0,0 +1,75 @@
+from typing import Iterable, Set
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from db_routing import use_primary
+
+
+class LikeCounter:
+    """Per-student likes behind the denormalized `likes` counters.
+
+    A like is a ContentLike row, unique per (student, target type, target
+    id), so liking twice changes nothing. The target's `likes` column moves
+    with one `UPDATE ... SET likes = likes + 1` in the same transaction that
+    inserts or deletes that row, never a read-modify-write in Python, so
+    concurrent likes on a popular post can't lose updates and listings keep
+    sorting on a plain indexed column instead of counting likes.
+    """
+
+    def __init__(self, db, ContentLike, targets):
+        self.db = db
+        self.ContentLike = ContentLike
+        self.targets = targets  # target type -> model with `id` and `likes`
+
+    def _model(self, target_type):
+        try:
+            return self.targets[target_type]
+        except KeyError:
+            raise LookupError(f"Unknown like target {target_type!r}") from None
+
+    def _set(self, student_id, target_type, target_id, liked) -> int:
+        Model, Like = self._model(target_type), self.ContentLike
+        session = self.db.session
+        with use_primary(self.db):
+            if session.get(Model, target_id) is None:
+                raise LookupError(f"No {target_type} {target_id}")
+            key = dict(student_id=student_id, target_type=target_type, target_id=target_id)
+            if liked:
+                try:
+                    session.add(Like(**key))
+                    session.flush()
+                    changed = True
+                except IntegrityError:
+                    session.rollback()  # already liked, maybe by a concurrent request
+                    changed = False
+            else:
+                changed = Like.query.filter_by(**key).delete(synchronize_session=False) > 0
+            if changed:
+                session.query(Model).filter(Model.id == target_id).update(
+                    {'likes': func.coalesce(Model.likes, 0) + (1 if liked else -1)}, synchronize_session=False)
+            session.commit()
+            return session.query(Model.likes).filter(Model.id == target_id).scalar() or 0
+
+    def like(self, student_id, target_type, target_id) -> int:
+        """Like a target; returns its like count"""
+        return self._set(student_id, target_type, target_id, True)
+
+    def unlike(self, student_id, target_type, target_id) -> int:
+        """Take a like back; returns the target's like count"""
+        return self._set(student_id, target_type, target_id, False)
+
+    def liked(self, student_id, target_type, target_ids: Iterable[int]) -> Set[int]:
+        """Which of target_ids the student has liked"""
+        target_ids = list(target_ids)
+        if not target_ids:
+            return set()
+        Like = self.ContentLike
+        return {target_id for (target_id,) in self.db.session.query(Like.target_id).filter(
+            Like.student_id == student_id, Like.target_type == target_type, Like.target_id.in_(target_ids))}
+
+    def stamp(self, student_id, target_type):
+        """Changes whenever the student likes or unlikes a target of this type, for conditional GETs"""
+        Like = self.ContentLike
+        return tuple(self.db.session.query(func.count(Like.id), func.max(Like.id)).filter(
+            Like.student_id == student_id, Like.target_type == target_type).one())
@@ -0,0 +1,360 @@
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Fold the shards of finished threads once this many have piled up
+MAX_SHARDS = 64
+
+
+class _Metric:
+    """A metric whose values live in one shard per thread.
+
+    Each thread only ever writes its own dict, so recording a value takes no
+    lock; collect() merges the shards when /metrics is scraped.
+    """
+    kind = ''
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[Tuple[threading.Thread, Dict]] = []
+        self._retired: Dict = {}
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> Dict:
+        shard = getattr(self._local, 'values', None)
+        if shard is None:
+            shard = self._local.values = {}
+            with self._shards_lock:
+                if len(self._shards) >= MAX_SHARDS:
+                    self._fold_finished()
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _fold_finished(self):
+        alive = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                alive.append((thread, shard))
+            else:
+                for key, value in list(shard.items()):
+                    self._merge(self._retired, key, value)
+        self._shards = alive
+
+    def _merge(self, into, key, value):
+        into[key] = into.get(key, 0.0) + value
+
+    def collect(self) -> Dict:
+        with self._shards_lock:
+            self._fold_finished()
+            totals = {key: self._copy(value) for key, value in self._retired.items()}
+            for _, shard in self._shards:
+                for key, value in list(shard.items()):
+                    self._merge(totals, key, self._copy(value))
+        return totals
+
+    @staticmethod
+    def _copy(value):
+        return value
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1.0, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0.0) + amount
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        entry = shard.get(key)
+        if entry is None:
+            # Per-bucket counts (the last one is +Inf), then sum and count
+            entry = shard[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        entry[bisect.bisect_left(self.buckets, value)] += 1
+        entry[-2] += value
+        entry[-1] += 1
+
+    def _merge(self, into, key, value):
+        current = into.get(key)
+        into[key] = value if current is None else [a + b for a, b in zip(current, value)]
+
+    @staticmethod
+    def _copy(value):
+        return list(value)
+
+
+class MetricsRegistry:
+    """Counters, histograms and scrape-time collectors rendered in Prometheus text format.
+
+    Under gunicorn every worker keeps its own values. When
+    PROMETHEUS_MULTIPROC_DIR is set each worker writes a snapshot there every
+    METRICS_FLUSH_SECONDS, and a scrape served by any worker merges them all.
+    """
+
+    def __init__(self, multiprocess_dir=None, flush_seconds=5.0):
+        self.multiprocess_dir = multiprocess_dir
+        self.flush_seconds = flush_seconds
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable]] = []
+        self._ratios: List[Tuple[str, str, str, str]] = []
+        self._flusher_pid: Optional[int] = None
+        self._flusher_lock = threading.Lock()
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterable]):
+        """Register a callable yielding (name, kind, documentation, labelnames, {label values: value})"""
+        self._collectors.append(collector)
+
+    def add_ratio(self, name, documentation, hits_name, misses_name):
+        """Expose hits / (hits + misses), computed after the workers are merged"""
+        self._ratios.append((name, documentation, hits_name, misses_name))
+
+    def collect(self) -> Dict[str, Dict]:
+        """This process's values keyed by metric name"""
+        families = {}
+        for metric in self._metrics:
+            families[metric.name] = {
+                'kind': metric.kind, 'help': metric.documentation, 'labelnames': list(metric.labelnames),
+                'buckets': list(getattr(metric, 'buckets', ())), 'samples': metric.collect(),
+            }
+        for collector in self._collectors:
+            for name, kind, documentation, labelnames, samples in collector():
+                families[name] = {'kind': kind, 'help': documentation, 'labelnames': list(labelnames),
+                                  'buckets': [], 'samples': samples}
+        return families
+
+    def _snapshot_path(self, pid):
+        return os.path.join(self.multiprocess_dir, f"metrics_{pid}.json")
+
+    def flush(self):
+        """Write this process's snapshot for the other workers to merge"""
+        if not self.multiprocess_dir:
+            return
+        os.makedirs(self.multiprocess_dir, exist_ok=True)
+        families = self.collect()
+        payload = {name: dict(family, samples=[[list(k), v] for k, v in family['samples'].items()])
+                   for name, family in families.items()}
+        path = self._snapshot_path(os.getpid())
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, path)
+
+    def ensure_flusher(self):
+        """Start the snapshot thread once per process (again after a fork)"""
+        if not self.multiprocess_dir or self._flusher_pid == os.getpid():
+            return
+        with self._flusher_lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+            threading.Thread(target=self._flush_forever, name='metrics-flusher', daemon=True).start()
+
+    def _flush_forever(self):
+        while True:
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"⚠️ Could not write metrics snapshot: {e}")
+            time.sleep(self.flush_seconds)
+
+    def _merged(self) -> Dict[str, Dict]:
+        families = self.collect()
+        if not self.multiprocess_dir:
+            return families
+        for path in glob.glob(os.path.join(self.multiprocess_dir, 'metrics_*.json')):
+            pid = int(os.path.basename(path)[len('metrics_'):-len('.json')])
+            if pid == os.getpid():
+                continue  # our live values are already included
+            try:
+                with open(path, encoding='utf-8') as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            alive = _pid_alive(pid)
+            for name, family in snapshot.items():
+                if family['kind'] == 'gauge' and not alive:
+                    continue  # counters survive a worker restart, gauges don't
+                target = families.setdefault(name, dict(family, samples={}))
+                for key, value in family['samples']:
+                    key = tuple(key)
+                    current = target['samples'].get(key)
+                    if current is None:
+                        target['samples'][key] = value
+                    elif isinstance(current, list):
+                        target['samples'][key] = [a + b for a, b in zip(current, value)]
+                    else:
+                        target['samples'][key] = current + value
+        return families
+
+    def _with_ratios(self, families):
+        for name, documentation, hits_name, misses_name in self._ratios:
+            hits = families.get(hits_name, {}).get('samples', {})
+            misses = families.get(misses_name, {}).get('samples', {})
+            samples = {}
+            for key in set(hits) | set(misses):
+                total = hits.get(key, 0) + misses.get(key, 0)
+                samples[key] = hits.get(key, 0) / total if total else 0.0
+            families[name] = {'kind': 'gauge', 'help': documentation, 'buckets': [], 'samples': samples,
+                              'labelnames': families.get(hits_name, {}).get('labelnames', [])}
+        return families
+
+    def render(self) -> str:
+        lines = []
+        for name, family in sorted(self._with_ratios(self._merged()).items()):
+            lines.append(f"# HELP {name} {family['help']}")
+            lines.append(f"# TYPE {name} {family['kind']}")
+            labelnames = family['labelnames']
+            for key, value in sorted(family['samples'].items()):
+                if family['kind'] == 'histogram':
+                    cumulative = 0
+                    bounds = [_format_value(b) for b in family['buckets']] + ['+Inf']
+                    for bound, count in zip(bounds, value):
+                        cumulative += count
+                        labels = _format_labels(labelnames + ['le'], list(key) + [bound])
+                        lines.append(f"{name}_bucket{labels} {cumulative}")
+                    labels = _format_labels(labelnames, key)
+                    lines.append(f"{name}_sum{labels} {_format_value(value[-2])}")
+                    lines.append(f"{name}_count{labels} {value[-1]}")
+                else:
+                    lines.append(f"{name}{_format_labels(labelnames, key)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    escaped = (str(v).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') for v in values)
+    return '{' + ','.join(f'{n}="{v}"' for n, v in zip(names, escaped)) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+registry = MetricsRegistry(
+    multiprocess_dir=os.getenv('PROMETHEUS_MULTIPROC_DIR'),
+    flush_seconds=float(os.getenv('METRICS_FLUSH_SECONDS', 5)),
+)
+
+HTTP_REQUESTS = registry.counter(
+    'zenithra_http_requests_total', 'HTTP requests served', ['endpoint', 'method', 'status'])
+HTTP_DURATION = registry.histogram(
+    'zenithra_http_request_duration_seconds', 'Wall time per request', ['endpoint'])
+SQL_QUERIES = registry.histogram(
+    'zenithra_sql_queries_per_request', 'SQL statements executed per request', ['endpoint'],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 250, 500))
+SQL_DURATION = registry.histogram(
+    'zenithra_sql_duration_seconds', 'Time spent in SQL per request', ['endpoint'])
+CHAT_RESPONSE = registry.histogram(
+    'zenithra_chat_response_seconds', 'Time to produce a chatbot reply', ['source'],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0))
+CHAT_MESSAGES = registry.counter(
+    'zenithra_chat_messages_total', 'Chat messages received', ['crisis'])
+CRISIS_DETECTED = registry.counter(
+    'zenithra_crisis_detected_total', 'Crisis incidents detected', ['source'])
+GEMINI_REQUESTS = registry.counter(
+    'zenithra_gemini_requests_total', 'Chat replies by outcome (ok, error, unavailable, queue_timeout)', ['outcome'])
+CHAT_RATE_LIMITED = registry.counter(
+    'zenithra_chat_rate_limited_total', 'Chat messages rejected by the per-student rate limit')
+SYNC_ITEMS = registry.counter(
+    'zenithra_sync_items_total', 'Items received by /api/sync by outcome (accepted, duplicate, rejected)',
+    ['kind', 'outcome'])
+GEMINI_STATUS_TRANSITIONS = registry.counter(
+    'zenithra_gemini_status_transitions_total', 'Changes of the Gemini status', ['from_status', 'to_status'])
+registry.add_ratio('zenithra_cache_hit_ratio', 'Cache hit ratio across workers',
+                   'zenithra_cache_hits_total', 'zenithra_cache_misses_total')
+
+
+def observe_request(endpoint, method, status_code, duration_ms, trace):
+    """Instrumentation observer feeding the HTTP and SQL metrics"""
+    HTTP_REQUESTS.inc(endpoint=endpoint, method=method, status=status_code)
+    HTTP_DURATION.observe(duration_ms / 1000, endpoint=endpoint)
+    SQL_QUERIES.observe(trace.sql_count, endpoint=endpoint)
+    SQL_DURATION.observe(trace.sql_ms / 1000, endpoint=endpoint)
+
+
+def pool_collector(app, db):
+    """Connection pool gauges for every engine, read at scrape time"""
+    def collect():
+        samples = {'size': {}, 'checked_out': {}, 'overflow': {}}
+        with app.app_context():
+            for key, engine in db.engines.items():
+                pool = engine.pool
+                bind = key or 'default'
+                for name, attribute in (('size', 'size'), ('checked_out', 'checkedout'), ('overflow', 'overflow')):
+                    if hasattr(pool, attribute):
+                        samples[name][(bind,)] = getattr(pool, attribute)()
+        for name, values in samples.items():
+            yield (f"zenithra_db_pool_{name}", 'gauge', f"Connection pool {name.replace('_', ' ')}",
+                   ['bind'], values)
+    return collect
+
+
+def cache_collector(caches: Dict[str, object]):
+    """Hit/miss counters of objects exposing `hits` and `misses`, summed over per-shard instances"""
+    def total(cache, attr):
+        instances = cache.instances() if hasattr(cache, 'instances') else [cache]
+        return sum(getattr(instance, attr) for instance in instances)
+
+    def collect():
+        hits = {(name,): total(cache, 'hits') for name, cache in caches.items()}
+        misses = {(name,): total(cache, 'misses') for name, cache in caches.items()}
+        yield 'zenithra_cache_hits_total', 'counter', 'Cache hits', ['cache'], hits
+        yield 'zenithra_cache_misses_total', 'counter', 'Cache misses', ['cache'], misses
+    return collect
+
+
+def value_collector(name, documentation, get_value, kind='gauge'):
+    """A single unlabelled value read at scrape time"""
+    def collect():
+        yield name, kind, documentation, [], {(): get_value()}
+    return collect
+
+
+def gemini_status_collector(get_status):
+    """One gauge sample per worker in its current Gemini status (active, degraded, fallback)"""
+    def collect():
+        yield 'zenithra_gemini_status', 'gauge', 'Workers per Gemini status', ['status'], {(get_status(),): 1}
+    return collect
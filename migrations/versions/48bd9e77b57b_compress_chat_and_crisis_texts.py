@@ -0,0 +1,60 @@
+"""Compress chat and crisis texts
+
+Revision ID: 48bd9e77b57b
+Revises: 3dacb718b424
+Create Date: 2026-10-18 13:22:56.118430
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from compressed_text import compress_text, decompress_text
+
+
+# revision identifiers, used by Alembic.
+revision = '48bd9e77b57b'
+down_revision = '3dacb718b424'
+branch_labels = None
+depends_on = None
+
+COLUMNS = {
+    'chat_conversation': ['user_message', 'bot_response'],
+    'crisis_incident': ['message'],
+}
+
+
+def _rewrite(table_name, columns, convert, batch_size=1000):
+    bind = op.get_bind()
+    table = sa.table(table_name, sa.column('id', sa.Integer), *[sa.column(c) for c in columns])
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(table).where(table.c.id > last_id).order_by(table.c.id).limit(batch_size)
+        ).fetchall()
+        if not rows:
+            break
+        for row in rows:
+            bind.execute(
+                table.update().where(table.c.id == row.id).values(
+                    {c: convert(getattr(row, c)) for c in columns if getattr(row, c) is not None}
+                )
+            )
+        last_id = rows[-1].id
+
+
+def upgrade():
+    for table_name, columns in COLUMNS.items():
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            for column in columns:
+                batch_op.alter_column(column, existing_type=sa.Text(), type_=sa.LargeBinary(),
+                                      existing_nullable=False)
+        _rewrite(table_name, columns, lambda value: compress_text(decompress_text(value)))
+
+
+def downgrade():
+    for table_name, columns in COLUMNS.items():
+        _rewrite(table_name, columns, decompress_text)
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            for column in columns:
+                batch_op.alter_column(column, existing_type=sa.LargeBinary(), type_=sa.Text(),
+                                      existing_nullable=False)
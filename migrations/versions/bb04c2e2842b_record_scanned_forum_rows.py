@@ -0,0 +1,35 @@
+"""Record recently scanned forum rows for the moderation rescan window
+
+Revision ID: bb04c2e2842b
+Revises: 44bcb52e0bd8
+Create Date: 2026-10-19 11:20:08.613052
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'bb04c2e2842b'
+down_revision = '44bcb52e0bd8'
+branch_labels = None
+depends_on = None
+
+# RowScanner's default rescan window
+RESCAN_IDS = 1000
+
+
+def upgrade():
+    # Rows at or below the moderation watermarks were scanned already; record the
+    # ones inside the rescan window so they don't open a second crisis incident
+    for name, table in (('moderation.forum_post', 'forum_post'),
+                        ('moderation.forum_reply', 'forum_reply')):
+        op.execute(sa.text(
+            f"INSERT INTO processed_row (name, row_id) SELECT :name, id FROM {table} "
+            "WHERE id <= (SELECT last_id FROM processing_watermark WHERE name = :name) "
+            "AND id > (SELECT last_id FROM processing_watermark WHERE name = :name) - :window"
+        ).bindparams(name=name, window=RESCAN_IDS))
+
+
+def downgrade():
+    op.execute(sa.text("DELETE FROM processed_row WHERE name LIKE 'moderation.%'"))
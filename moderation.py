@@ -0,0 +1,161 @@
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from db_routing import shard_keys, use_primary, use_shard
+from watermarks import RowScanner
+
+
+class CrisisMatcher:
+    """Finds crisis keywords in free text, built once per keyword list.
+
+    Every keyword is casefolded up front, and texts are checked with plain
+    substring scans, which CPython does faster than a regex alternation.
+    Non-Latin (e.g. Devanagari) keywords are only scanned for in texts that
+    are not pure ASCII. With `word_start`, a Latin hit is confirmed with one
+    compiled pattern that requires the keyword to start a word, so 'studied'
+    is not 'die' but 'selfharm' is no longer 'harm'; chat keeps plain
+    substring matching, which misses nothing.
+    """
+
+    def __init__(self, keywords, word_start=False):
+        keywords = sorted({k.casefold() for k in keywords}, key=len, reverse=True)
+        self._latin = tuple(k for k in keywords if k.isascii())
+        self._other = tuple(k for k in keywords if not k.isascii())
+        self._pattern = re.compile(r'\b(?:' + '|'.join(map(re.escape, self._latin)) + ')') if word_start else None
+
+    def search(self, text) -> Optional[str]:
+        """The first keyword found in text, or None"""
+        text = text.casefold()
+        if not text.isascii():
+            for needle in self._other:
+                if needle in text:
+                    return needle
+        for needle in self._latin:
+            if needle in text:
+                if self._pattern is None:
+                    return needle
+                match = self._pattern.search(text)
+                return match.group() if match else None
+        return None
+
+    def matches(self, text) -> bool:
+        return self.search(text) is not None
+
+
+class ForumModerator:
+    """Scans new forum posts and replies for crisis language in batches.
+
+    Rows are handed out once each, in id order, in batches of `batch_size`
+    by a RowScanner, which also picks up rows committed late below the
+    watermark. Matching rows are flagged needs_review and, when recent
+    enough to still matter, handed to `report_crisis(student_id, message,
+    source)` to open a CrisisIncident, all in the transaction that records
+    the batch as scanned. Writers only call
+    notify(); the scan runs on a background thread, off the request path.
+    """
+
+    def __init__(self, app, db, matcher, ForumPost, ForumReply, ProcessingWatermark, ProcessedRow, report_crisis,
+                 batch_size=1000, poll_interval=30.0, incident_max_age=timedelta(days=7)):
+        self.app = app
+        self.db = db
+        self.matcher = matcher
+        self.scanner = RowScanner(db, ProcessingWatermark, ProcessedRow)
+        self.report_crisis = report_crisis
+        # name -> (model, text columns, label used in the incident message)
+        self.sources = {
+            'forum_post': (ForumPost, ('title', 'content'), 'Forum post'),
+            'forum_reply': (ForumReply, ('content',), 'Forum reply'),
+        }
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.incident_max_age = incident_max_age
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._worker_pid = None
+        self.scanned = 0
+        self.flagged = 0
+
+    def _watermark_name(self, source):
+        return f"moderation.{source}"
+
+    def _scan_batch(self, source) -> int:
+        """Scan the next batch of one source; returns the rows scanned"""
+        Model, columns, label = self.sources[source]
+        session = self.db.session
+        stmt = select(Model.id, Model.student_id, Model.created_at, *[getattr(Model, c) for c in columns])
+
+        for attempt in range(2):
+            try:
+                rows = self.scanner.claim(self._watermark_name(source), Model, stmt, self.batch_size)
+                flagged = []
+                for row in rows:
+                    text = '\n'.join(getattr(row, c) or '' for c in columns)
+                    if self.matcher.search(text):
+                        flagged.append((row, text))
+                if flagged:
+                    session.query(Model).filter(Model.id.in_([row.id for row, _ in flagged])).update(
+                        {'needs_review': True}, synchronize_session=False)
+                    # A backlog scan flags old rows for review without paging anyone about them
+                    since = datetime.utcnow() - self.incident_max_age
+                    for row, text in flagged:
+                        if row.created_at is None or row.created_at >= since:
+                            self.report_crisis(row.student_id, f"{label} #{row.id}: {text}", source='forum')
+                session.commit()
+            except IntegrityError:
+                # A concurrent scanner claimed some of the same rows first
+                session.rollback()
+                if attempt:
+                    raise
+                continue
+            self.scanned += len(rows)
+            self.flagged += len(flagged)
+            return len(rows)
+
+    def scan(self) -> Dict[str, int]:
+        """Scan every unscanned post and reply on every shard; returns rows scanned per source"""
+        scanned = dict.fromkeys(self.sources, 0)
+        for shard in shard_keys(self.db):
+            with use_shard(self.db, shard), use_primary(self.db):
+                for source in self.sources:
+                    while True:
+                        count = self._scan_batch(source)
+                        scanned[source] += count
+                        if count < self.batch_size:
+                            break
+        return scanned
+
+    # --- background worker -------------------------------------------------
+
+    def notify(self):
+        """Called after a post or reply commits: wake the worker, starting it if needed"""
+        self.ensure_worker()
+        self._wake.set()
+
+    def ensure_worker(self):
+        """Start the worker thread once per process (again after a fork)"""
+        if self._worker_pid == os.getpid():
+            return
+        with self._lock:
+            if self._worker_pid == os.getpid():
+                return
+            self._worker_pid = os.getpid()
+            threading.Thread(target=self._scan_forever, name='forum-moderator', daemon=True).start()
+
+    def _scan_forever(self):
+        with self.app.app_context():
+            while True:
+                try:
+                    self.scan()
+                except Exception as e:
+                    self.db.session.rollback()
+                    print(f"⚠️ Forum moderation failed: {e}")
+                finally:
+                    self.db.session.remove()
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
@@ -0,0 +1,198 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Tuple
+
+
+class MemoryBucketStore:
+    """Token buckets in this process only"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    def take(self, key, rate, capacity, now) -> float:
+        """Take one token; returns 0 when allowed, else seconds until a token is available"""
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                return 0.0
+            self._buckets[key] = (tokens, now)
+            return (1 - tokens) / rate
+
+
+class SQLiteBucketStore:
+    """Token buckets in a small SQLite file shared by every worker on the host"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS token_bucket '
+                         '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, rate, capacity, now) -> float:
+        conn = self._connect()
+        # IMMEDIATE takes the write lock up front so two workers can't both spend the last token
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated FROM token_bucket WHERE key = ?', (key,)).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+            allowed = tokens >= 1
+            conn.execute('INSERT INTO token_bucket (key, tokens, updated) VALUES (?, ?, ?) '
+                         'ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated',
+                         (key, tokens - 1 if allowed else tokens, now))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return 0.0 if allowed else (1 - tokens) / rate
+
+
+class RateLimiter:
+    """Token bucket per student: `per_minute` messages on average, bursts up to `burst`"""
+
+    def __init__(self, store, per_minute=10, burst=5, key_prefix=''):
+        self.store = store
+        self.rate = per_minute / 60.0
+        self.capacity = burst
+        self.key_prefix = key_prefix
+
+    def check(self, student_id) -> float:
+        """0 when the message may be sent, otherwise the Retry-After in seconds"""
+        if self.rate <= 0:
+            return 0.0
+        return self.store.take(f"{self.key_prefix}{student_id}", self.rate, self.capacity, time.time())
+
+
+def build_rate_limiter(env=os.environ, prefix='CHAT', per_minute=10, burst=5) -> RateLimiter:
+    """CHAT_RATE_LIMIT_BACKEND=memory (default) or sqlite (shared by workers via CHAT_RATE_LIMIT_DB)
+
+    The rate and burst come from {prefix}_RATE_PER_MINUTE and {prefix}_RATE_BURST;
+    limiters with other prefixes keep their buckets apart in the same store.
+    """
+    if env.get('CHAT_RATE_LIMIT_BACKEND', 'memory') == 'sqlite':
+        store = SQLiteBucketStore(env.get('CHAT_RATE_LIMIT_DB', 'instance/rate_limits.db'))
+    else:
+        store = MemoryBucketStore()
+    return RateLimiter(store, per_minute=float(env.get(f'{prefix}_RATE_PER_MINUTE', per_minute)),
+                       burst=float(env.get(f'{prefix}_RATE_BURST', burst)),
+                       key_prefix='' if prefix == 'CHAT' else f'{prefix.lower()}:')
+
+
+class _Waiter:
+    __slots__ = ('event', 'granted')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.granted = False
+
+
+class FairScheduler:
+    """Limits concurrent LLM calls and hands free slots out round-robin by student.
+
+    A student flooding the chat only queues behind their own messages, so
+    everyone else keeps getting the next free slot. Priority (crisis)
+    requests are served before the round-robin queue.
+    """
+
+    def __init__(self, slots=4, max_waiting_per_student=2):
+        self.slots = slots
+        self.max_waiting_per_student = max_waiting_per_student
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._priority = deque()
+        self._waiting: Dict[str, deque] = {}
+        self._turns = deque()  # students with waiters, in round-robin order
+
+    def _grant_next(self):
+        """Hand a free slot to the next waiter; caller holds the lock"""
+        while self._in_use < self.slots:
+            if self._priority:
+                waiter = self._priority.popleft()
+            elif self._turns:
+                student = self._turns.popleft()
+                queue = self._waiting[student]
+                waiter = queue.popleft()
+                if queue:
+                    self._turns.append(student)
+                else:
+                    del self._waiting[student]
+            else:
+                return
+            self._in_use += 1
+            waiter.granted = True
+            waiter.event.set()
+
+    def _cancel(self, waiter, student):
+        if waiter in self._priority:
+            self._priority.remove(waiter)
+            return
+        queue = self._waiting.get(student)
+        if queue and waiter in queue:
+            queue.remove(waiter)
+            if not queue:
+                del self._waiting[student]
+                self._turns.remove(student)
+
+    def acquire(self, student_id, priority=False, timeout=10.0) -> bool:
+        student = str(student_id)
+        with self._lock:
+            if self._in_use < self.slots and not self._priority and not self._turns:
+                self._in_use += 1
+                return True
+            waiter = _Waiter()
+            if priority:
+                self._priority.append(waiter)
+            else:
+                queue = self._waiting.get(student)
+                if queue is None:
+                    queue = self._waiting[student] = deque()
+                    self._turns.append(student)
+                elif len(queue) >= self.max_waiting_per_student:
+                    return False
+                queue.append(waiter)
+
+        waiter.event.wait(timeout)
+        with self._lock:
+            if waiter.granted:
+                return True
+            self._cancel(waiter, student)
+            return False
+
+    def release(self):
+        with self._lock:
+            self._in_use -= 1
+            self._grant_next()
+
+    @contextmanager
+    def slot(self, student_id, priority=False, timeout=10.0):
+        """Yields True while holding a slot, False when none freed up in time"""
+        acquired = self.acquire(student_id, priority, timeout)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                self.release()
+
+    def queued(self) -> int:
+        with self._lock:
+            return len(self._priority) + sum(len(q) for q in self._waiting.values())
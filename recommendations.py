@@ -0,0 +1,272 @@
+import math
+import struct
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import event, func, inspect
+
+from db_routing import use_primary
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+RESOURCE_CATEGORIES = [
+    'Academic Stress', 'Anxiety', 'Depression', 'Social Anxiety',
+    'Sleep Issues', 'Family Issues', 'Career Guidance', 'Relationships',
+    'Self-Care', 'Mindfulness', 'Crisis Support'
+]
+
+BASE_AFFINITY = 0.1
+POPULARITY_WEIGHT = 0.3
+FEATURED_BONUS = 0.2
+MOOD_WINDOW_DAYS = 14
+CATALOG_KEY = 'resource_catalog'  # ProcessingWatermark row counting catalog changes
+
+
+def student_affinity(screening, mood) -> Dict[str, float]:
+    """Interest in each category from the latest screening and recent mood averages"""
+    weights = {}
+
+    def add(category, value):
+        weights[category] = weights.get(category, 0.0) + value
+
+    if screening is not None:
+        depression, anxiety = screening.phq9_score / 27, screening.gad7_score / 21
+        add('Depression', depression)
+        add('Self-Care', depression * 0.5)
+        add('Anxiety', anxiety)
+        add('Social Anxiety', anxiety * 0.5)
+        add('Mindfulness', anxiety * 0.5)
+        add('Crisis Support', {'high': 1.0, 'moderate': 0.3}.get(screening.risk_level, 0.0))
+    if mood is not None and mood.entries:
+        stress, low_mood = mood.stress / 10, (10 - mood.mood) / 10
+        add('Academic Stress', stress)
+        add('Mindfulness', stress * 0.5)
+        add('Depression', low_mood * 0.5)
+        add('Self-Care', low_mood)
+        if mood.sleep and mood.sleep < 6:
+            add('Sleep Issues', (6 - mood.sleep) / 6)
+    return weights
+
+
+def track_catalog(Resource, ProcessingWatermark):
+    """Bump the stored catalog version whenever a resource is added, removed or recategorized"""
+    table = ProcessingWatermark.__table__
+
+    def bump(connection):
+        values = {'last_id': table.c.last_id + 1, 'updated_at': datetime.utcnow()}
+        if not connection.execute(table.update().where(table.c.name == CATALOG_KEY).values(values)).rowcount:
+            connection.execute(table.insert().values(name=CATALOG_KEY, last_id=1, updated_at=datetime.utcnow()))
+
+    @event.listens_for(Resource, 'after_insert')
+    @event.listens_for(Resource, 'after_delete')
+    def _added_or_removed(mapper, connection, target):
+        bump(connection)
+
+    @event.listens_for(Resource, 'after_update')
+    def _updated(mapper, connection, target):
+        if inspect(target).attrs.category.history.has_changes():
+            bump(connection)
+
+
+def pack_ids(ids) -> bytes:
+    return struct.pack(f"<{len(ids)}I", *ids)
+
+
+def unpack_ids(data) -> List[int]:
+    return list(struct.unpack(f"<{len(data) // 4}I", data)) if data else []
+
+
+class ResourceRecommender:
+    """Ranked Resource lists per student, precomputed and cached.
+
+    Every resource gets affinity[student, its category] + popularity, scored
+    for a whole chunk of students at once as one matrix product (numpy when
+    installed, plain Python otherwise). The top `top_k` ids are stored
+    packed as little-endian uint32 in ResourceRecommendation. A list is
+    recomputed when the student submits a screening and by the batch job.
+    Reading a list never computes one: a missing list, or one computed
+    before the catalog (resource ids and categories, versioned by
+    track_catalog) last changed or before the student's latest screening,
+    is served as it is and handed to `on_stale(student_id)` to be
+    recomputed off the request path. Cached lists are checked against the
+    latest screening id too, so no worker keeps one past a new screening.
+    """
+
+    def __init__(self, db, Student, Resource, ScreeningResult, MoodTracker, ResourceRecommendation,
+                 ProcessingWatermark, on_stale, top_k=20, cache_size=5000, cache_seconds=300, stale_seconds=10):
+        self.db = db
+        self.Student = Student
+        self.Resource = Resource
+        self.ScreeningResult = ScreeningResult
+        self.MoodTracker = MoodTracker
+        self.ResourceRecommendation = ResourceRecommendation
+        self.ProcessingWatermark = ProcessingWatermark
+        self.on_stale = on_stale
+        self.top_k = top_k
+        self.cache_size = cache_size
+        self.cache_seconds = cache_seconds
+        self.stale_seconds = stale_seconds
+        self._cache = OrderedDict()  # student_id -> (ids, computed_at, screening id, expires at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # --- scoring ---------------------------------------------------------
+
+    def _version(self) -> str:
+        Watermark = self.ProcessingWatermark
+        return str(self.db.session.query(Watermark.last_id).filter(Watermark.name == CATALOG_KEY).scalar() or 0)
+
+    def _catalog(self):
+        """(ids, category index per resource, popularity per resource, catalog version)"""
+        Resource = self.Resource
+        # Read before the resources, so a change committed in between makes this version stale
+        version = self._version()
+        rows = self.db.session.query(Resource.id, Resource.category, Resource.views, Resource.likes,
+                                     Resource.is_featured).order_by(Resource.id).all()
+        categories = list(RESOURCE_CATEGORIES) + sorted({r.category for r in rows} - set(RESOURCE_CATEGORIES))
+        index = {category: i for i, category in enumerate(categories)}
+        raw = [math.log1p(r.views or 0) + 2 * math.log1p(r.likes or 0) for r in rows]
+        top = max(raw, default=0) or 1.0
+        popularity = [POPULARITY_WEIGHT * value / top + (FEATURED_BONUS if r.is_featured else 0.0)
+                      for value, r in zip(raw, rows)]
+        return [r.id for r in rows], [index[r.category] for r in rows], popularity, categories, version
+
+    def _affinities(self, student_ids, categories):
+        """Category affinity rows for student_ids, and the latest screening id each one used"""
+        Screening, Mood = self.ScreeningResult, self.MoodTracker
+        session = self.db.session
+        latest = session.query(func.max(Screening.id)).filter(
+            Screening.student_id.in_(student_ids)).group_by(Screening.student_id)
+        screenings = {s.student_id: s for s in session.query(Screening).filter(Screening.id.in_(latest))}
+        moods = {m.student_id: m for m in session.query(
+            Mood.student_id, func.count(Mood.id).label('entries'), func.avg(Mood.mood_score).label('mood'),
+            func.avg(Mood.stress_level).label('stress'), func.avg(Mood.sleep_hours).label('sleep')
+        ).filter(Mood.student_id.in_(student_ids),
+                 Mood.created_at >= datetime.utcnow() - timedelta(days=MOOD_WINDOW_DAYS)
+                 ).group_by(Mood.student_id)}
+
+        index = {category: i for i, category in enumerate(categories)}
+        matrix = []
+        for student_id in student_ids:
+            row = [BASE_AFFINITY] * len(categories)
+            for category, weight in student_affinity(screenings.get(student_id), moods.get(student_id)).items():
+                row[index[category]] += weight
+            matrix.append(row)
+        return matrix, {student_id: s.id for student_id, s in screenings.items()}
+
+    def _rank(self, affinities, resource_categories, popularity) -> List[List[int]]:
+        """Positions of the top_k resources for each student, best first"""
+        k = min(self.top_k, len(popularity))
+        if not k:
+            return [[] for _ in affinities]
+        if NUMPY_AVAILABLE:
+            one_hot = np.zeros((len(affinities[0]), len(popularity)))
+            one_hot[resource_categories, np.arange(len(popularity))] = 1.0
+            scores = np.asarray(affinities) @ one_hot + np.asarray(popularity)
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            order = np.take_along_axis(scores, top, axis=1).argsort(axis=1)[:, ::-1]
+            return np.take_along_axis(top, order, axis=1).tolist()
+        ranked = []
+        for row in affinities:
+            scores = [row[c] + p for c, p in zip(resource_categories, popularity)]
+            ranked.append(sorted(range(len(scores)), key=scores.__getitem__, reverse=True)[:k])
+        return ranked
+
+    def _store(self, student_ids, catalog):
+        resource_ids, resource_categories, popularity, categories, version = catalog
+        affinities, screening_ids = self._affinities(student_ids, categories)
+        ranked = self._rank(affinities, resource_categories, popularity)
+        Recommendation = self.ResourceRecommendation
+        existing = {r.student_id: r for r in Recommendation.query.filter(Recommendation.student_id.in_(student_ids))}
+        now = datetime.utcnow()
+        results = {}
+        for student_id, positions in zip(student_ids, ranked):
+            ids = [resource_ids[p] for p in positions]
+            row = existing.get(student_id) or Recommendation(student_id=student_id)
+            row.resource_ids = pack_ids(ids)
+            row.catalog_version = version
+            row.screening_id = screening_ids.get(student_id)
+            row.computed_at = now
+            if student_id not in existing:
+                self.db.session.add(row)
+            results[student_id] = ids
+        self.db.session.commit()
+        for student_id, ids in results.items():
+            self._remember(student_id, ids, now, screening_ids.get(student_id))
+        return results
+
+    # --- public API ------------------------------------------------------
+
+    def refresh_student(self, student_id) -> List[int]:
+        """Recompute one student's list, e.g. right after a screening"""
+        with use_primary(self.db):
+            return self._store([student_id], self._catalog())[student_id]
+
+    def refresh_all(self, chunk_size=500) -> int:
+        """Batch job: recompute every student, a chunk of students per matrix product"""
+        Student = self.Student
+        refreshed, last_id = 0, 0
+        with use_primary(self.db):
+            catalog = self._catalog()
+            while True:
+                ids = [sid for (sid,) in self.db.session.query(Student.id).filter(
+                    Student.id > last_id, Student.is_admin.is_(False)).order_by(Student.id).limit(chunk_size)]
+                if not ids:
+                    break
+                self._store(ids, catalog)
+                refreshed += len(ids)
+                last_id = ids[-1]
+        return refreshed
+
+    def _latest_screening(self, student_id) -> Optional[int]:
+        Screening = self.ScreeningResult
+        return self.db.session.query(func.max(Screening.id)).filter(Screening.student_id == student_id).scalar()
+
+    def _remember(self, student_id, ids, computed_at, screening_id, seconds=None):
+        with self._lock:
+            self._cache[student_id] = (ids, computed_at, screening_id,
+                                       time.monotonic() + (seconds or self.cache_seconds))
+            self._cache.move_to_end(student_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _cached(self, student_id, screening_id):
+        with self._lock:
+            entry = self._cache.get(student_id)
+            if entry is None or entry[2] != screening_id or time.monotonic() > entry[3]:
+                return None
+            self._cache.move_to_end(student_id)
+            return entry
+
+    def for_student(self, student_id) -> List[int]:
+        """Ranked resource ids, from the process cache or the stored list"""
+        screening_id = self._latest_screening(student_id)
+        entry = self._cached(student_id, screening_id)
+        if entry is not None:
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        row = self.db.session.get(self.ResourceRecommendation, student_id)
+        ids = unpack_ids(row.resource_ids) if row is not None else []
+        if row is not None and row.catalog_version == self._version() and row.screening_id == screening_id:
+            self._remember(student_id, ids, row.computed_at, screening_id)
+            return ids
+        # Serve what there is and look again shortly; the recomputed list replaces it
+        self.on_stale(student_id)
+        self._remember(student_id, ids, row.computed_at if row is not None else None, screening_id,
+                       self.stale_seconds)
+        return ids
+
+    def stamp(self, student_id) -> tuple:
+        """(latest screening id, when the cached list was computed), for conditional GETs"""
+        screening_id = self._latest_screening(student_id)
+        entry = self._cached(student_id, screening_id)
+        return screening_id, entry[1] if entry else None
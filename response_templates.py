@@ -0,0 +1,85 @@
+import threading
+import time
+from typing import Dict, Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from db_routing import use_primary
+
+
+class ResponseTemplateCache:
+    """In-memory view of the versioned ResponseTemplate table.
+
+    Canned replies are stored once and conversations keep only the template
+    id, so rendering a reply is a dict lookup instead of a stored copy.
+    New versions are published by sync() from a job, never from a request;
+    until the table has the text the code sends, active_id() returns None
+    and the caller stores the reply itself.
+    """
+
+    def __init__(self, db, ResponseTemplate, templates: Dict[str, str], reload_seconds=60):
+        self.db = db
+        self.ResponseTemplate = ResponseTemplate
+        self.templates = templates
+        self._lock = threading.Lock()
+        self._bodies: Dict[int, str] = {}
+        self._active: Dict[str, int] = {}
+        self.reload_seconds = reload_seconds
+        self._loaded_at = None
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self):
+        # Always the primary: a replica may not have the version sync() just published
+        with use_primary(self.db):
+            rows = self.ResponseTemplate.query.all()
+        self._bodies = {row.id: row.body for row in rows}
+        self._active = {row.key: row.id for row in rows if row.is_active}
+        self._loaded_at = time.monotonic()
+
+    def sync(self):
+        """Publish a new version for every template whose text changed in code"""
+        Template = self.ResponseTemplate
+        with self._lock, use_primary(self.db):
+            try:
+                for key, body in self.templates.items():
+                    latest = Template.query.filter_by(key=key).order_by(Template.version.desc()).first()
+                    if latest and latest.body == body:
+                        if not latest.is_active:
+                            latest.is_active = True
+                        continue
+                    if latest:
+                        Template.query.filter_by(key=key).update({'is_active': False})
+                    self.db.session.add(Template(key=key, version=(latest.version + 1) if latest else 1, body=body))
+                self.db.session.commit()
+            except IntegrityError:
+                # Another worker published the same version first; use theirs
+                self.db.session.rollback()
+            self._load()
+
+    def _current(self, key) -> Optional[int]:
+        template_id = self._active.get(key)
+        if template_id is not None and self._bodies.get(template_id) == self.templates.get(key):
+            return template_id
+        return None
+
+    def active_id(self, key) -> Optional[int]:
+        """Id of the stored version matching the code's text for key, None if not published yet"""
+        template_id = self._current(key)
+        if template_id is None:
+            with self._lock:
+                if self._loaded_at is None or time.monotonic() - self._loaded_at > self.reload_seconds:
+                    self._load()
+            template_id = self._current(key)
+        return template_id
+
+    def render(self, template_id) -> str:
+        body = self._bodies.get(template_id)
+        if body is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            row = self.db.session.get(self.ResponseTemplate, template_id)
+            body = row.body if row else ''
+            self._bodies[template_id] = body
+        return body
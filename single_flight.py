@@ -0,0 +1,65 @@
+import hashlib
+import threading
+import unicodedata
+from typing import Callable, Dict, Optional
+
+
+def normalize_prompt(text) -> str:
+    """Case, punctuation, emoji and whitespace insensitive key for a chat message"""
+    text = unicodedata.normalize('NFC', text).casefold()
+    # Drop punctuation and symbols but keep Devanagari vowel signs (category M)
+    kept = ''.join(ch if unicodedata.category(ch)[0] not in 'PS' else ' ' for ch in text)
+    return ' '.join(kept.split())
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one execution.
+
+    The first caller runs the function; everyone arriving while it is in
+    flight waits up to `timeout` seconds and receives the same result (or
+    exception). `saved` counts the calls that never had to be made.
+    """
+
+    def __init__(self, timeout=15.0):
+        self.timeout = timeout
+        self.saved = 0
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+
+    def do(self, key, fn: Callable[[], object]) -> Optional[object]:
+        """fn()'s result, shared with concurrent callers; None when waiting on another caller timed out"""
+        key = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            if not call.done.wait(self.timeout):
+                return None
+            with self._lock:
+                self.saved += 1
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
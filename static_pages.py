@@ -0,0 +1,123 @@
+import gzip
+import hashlib
+import os
+import threading
+from typing import Dict, Optional
+
+from flask import Response, render_template, request, session
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+# Preferred first when the client accepts several
+ENCODINGS = ('br', 'gzip', 'identity')
+
+
+class PageArtifact:
+    """One pre-rendered page and its precompressed variants"""
+
+    def __init__(self, body: bytes, variants: Optional[Dict[str, bytes]] = None):
+        self.variants = variants or _compress(body)
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        # Strong ETags must differ for each content coding of the same page
+        self.etags = {encoding: f'"{digest}-{encoding}"' for encoding in self.variants}
+
+
+def _compress(body):
+    variants = {'identity': body, 'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+    if BROTLI_AVAILABLE:
+        variants['br'] = brotli.compress(body, quality=11)
+    return variants
+
+
+class PrerenderedPages:
+    """Static pages rendered once instead of through Jinja on every request.
+
+    Pages only depend on the session through the navigation bar, so the
+    artifacts are rendered for anonymous visitors and logged-in users (or
+    pending flash messages) fall back to normal rendering. Artifacts are
+    built on first use, or loaded from PRERENDER_DIR when
+    `flask prerender-pages` wrote them at build time.
+    """
+
+    def __init__(self, app, pages: Dict[str, str], artifact_dir=None):
+        self.app = app
+        self.pages = pages
+        self.artifact_dir = artifact_dir
+        self._artifacts: Dict[str, PageArtifact] = {}
+        self._lock = threading.Lock()
+
+    def _render(self, key) -> bytes:
+        # A bare request context has an empty session, i.e. the anonymous navigation bar
+        with self.app.test_request_context('/'):
+            return render_template(self.pages[key]).encode('utf-8')
+
+    def _artifact_path(self, key, encoding):
+        suffix = {'identity': '', 'gzip': '.gz', 'br': '.br'}[encoding]
+        return os.path.join(self.artifact_dir, f"{key}.html{suffix}")
+
+    def _load(self, key) -> Optional[PageArtifact]:
+        if not self.artifact_dir:
+            return None
+        variants = {}
+        for encoding in ENCODINGS:
+            path = self._artifact_path(key, encoding)
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    variants[encoding] = f.read()
+        if 'identity' not in variants:
+            return None
+        return PageArtifact(variants['identity'], variants)
+
+    def artifact(self, key) -> PageArtifact:
+        artifact = self._artifacts.get(key)
+        if artifact is None:
+            with self._lock:
+                artifact = self._artifacts.get(key)
+                if artifact is None:
+                    artifact = self._load(key) or PageArtifact(self._render(key))
+                    self._artifacts[key] = artifact
+        return artifact
+
+    def build(self) -> Dict[str, int]:
+        """Render every page and write the artifacts to artifact_dir"""
+        os.makedirs(self.artifact_dir, exist_ok=True)
+        sizes = {}
+        for key in self.pages:
+            artifact = PageArtifact(self._render(key))
+            for encoding, body in artifact.variants.items():
+                path = self._artifact_path(key, encoding)
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(body)
+                os.replace(tmp_path, path)
+            self._artifacts[key] = artifact
+            sizes[key] = len(artifact.variants['identity'])
+        return sizes
+
+    def serve(self, key) -> Optional[Response]:
+        """The pre-rendered response, or None when the page must be rendered for this session"""
+        if self.app.debug or session.get('student_id') or session.get('_flashes'):
+            return None
+        artifact = self.artifact(key)
+        # The anonymous navigation bar must not outlive a login: no shared caches, and
+        # browsers revalidate every time (logged-in requests then get the Jinja page)
+        headers = {'Cache-Control': 'private, no-cache', 'Vary': 'Accept-Encoding, Cookie'}
+
+        cached = [tag for tag in artifact.etags.values() if request.if_none_match.contains(tag.strip('"'))]
+        if cached:
+            # The client already has one of the variants
+            response = Response(status=304, headers=headers)
+            response.headers['ETag'] = cached[0]
+        else:
+            accepted = request.accept_encodings
+            encoding = next(e for e in ENCODINGS
+                            if e in artifact.variants and (e == 'identity' or accepted[e]))
+            response = Response(artifact.variants[encoding], mimetype='text/html', headers=headers)
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+            response.headers['ETag'] = artifact.etags[encoding]
+        return response
@@ -0,0 +1,83 @@
+import os
+import sqlite3
+from typing import Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+
+def _env_int(env, name, default):
+    try:
+        return int(env.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def sqlite_pragmas(env=os.environ) -> Dict[str, str]:
+    """PRAGMAs applied to every new SQLite connection"""
+    return {
+        'journal_mode': env.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': env.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': str(_env_int(env, 'SQLITE_BUSY_TIMEOUT_MS', 5000)),
+        # Negative cache_size is in KiB
+        'cache_size': str(-_env_int(env, 'SQLITE_CACHE_SIZE_KB', 64 * 1024)),
+        'mmap_size': str(_env_int(env, 'SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+        'temp_store': 'MEMORY',
+    }
+
+
+def engine_options(database_url, env=os.environ) -> Dict:
+    """SQLAlchemy engine options tuned for the backend in database_url"""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+
+    if backend == 'sqlite':
+        if url.database in (None, '', ':memory:'):
+            return {}  # Flask-SQLAlchemy already uses a StaticPool for in-memory databases
+        return {
+            # SQLite allows one writer at a time, a small pool just avoids reconnecting
+            'pool_size': _env_int(env, 'DB_POOL_SIZE', 5),
+            'max_overflow': _env_int(env, 'DB_MAX_OVERFLOW', 10),
+            'connect_args': {
+                'timeout': _env_int(env, 'SQLITE_BUSY_TIMEOUT_MS', 5000) / 1000,
+                'check_same_thread': False,
+            },
+        }
+
+    if backend == 'mysql':
+        return {
+            'pool_size': _env_int(env, 'DB_POOL_SIZE', 10),
+            'max_overflow': _env_int(env, 'DB_MAX_OVERFLOW', 20),
+            'pool_timeout': _env_int(env, 'DB_POOL_TIMEOUT', 10),
+            # Recycle before MySQL's wait_timeout / proxy idle limits drop the connection
+            'pool_recycle': _env_int(env, 'DB_POOL_RECYCLE', 280),
+            'pool_pre_ping': True,
+            'connect_args': {'connect_timeout': 10, 'charset': 'utf8mb4'},
+        }
+
+    return {'pool_pre_ping': True}
+
+
+def install_sqlite_pragmas(engine, env=os.environ):
+    """Apply sqlite_pragmas() whenever the engine opens a SQLite connection"""
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = sqlite_pragmas(env)
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        if not isinstance(dbapi_connection, sqlite3.Connection):
+            return
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def init_storage(app, db):
+    """Install per-connection settings on every engine the app uses"""
+    with app.app_context():
+        for engine in db.engines.values():
+            install_sqlite_pragmas(engine)
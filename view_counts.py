@@ -0,0 +1,128 @@
+import atexit
+import os
+import threading
+import time
+from collections import Counter
+
+from db_routing import current_shard, use_primary, use_shard
+
+
+class ViewCounter:
+    """Buffers page view increments in memory and writes them in batches.
+
+    Every forum post or resource page view used to commit its own
+    `UPDATE ... SET views = views + 1`, a write (and on SQLite a database
+    lock) per page view. Views are counted per process instead and a
+    background thread adds them up every flush_seconds, one UPDATE per
+    viewed row. Losing a few seconds of view counts in a crash is fine
+    for a popularity signal; they are flushed on a clean exit.
+
+    Where processes are frozen between requests and never exit cleanly
+    (serverless), neither the thread nor the exit hook can be relied on,
+    so flush_if_due() also writes the buffer at the end of a request once
+    it holds `max_pending` views or its oldest view is flush_seconds old.
+    With flush_seconds=0 every view is written by its own request and no
+    thread is started.
+    """
+
+    def __init__(self, app, db, models, flush_seconds=5.0, max_pending=500):
+        self.app = app
+        self.db = db
+        self.models = models  # name -> model with `id` and `views`
+        self.flush_seconds = flush_seconds
+        self.max_pending = max_pending
+        self.flushed = 0
+        self._pending = Counter()  # (shard, name, id) -> views
+        self._pending_views = 0
+        self._oldest = None  # monotonic time of the oldest buffered view
+        self._lock = threading.Lock()
+        self._flusher_pid = None
+
+    def add(self, name, row_id):
+        """Count one view of a row; written by the next flush"""
+        self.ensure_flusher()
+        with self._lock:
+            if not self._pending_views:
+                self._oldest = time.monotonic()
+            self._pending[(current_shard(self.db), name, row_id)] += 1
+            self._pending_views += 1
+
+    def flush_if_due(self, exc=None):
+        """Request teardown hook: flush when the buffer is large or old enough"""
+        with self._lock:
+            due = self._pending_views and (self._pending_views >= self.max_pending
+                                           or time.monotonic() - self._oldest >= self.flush_seconds)
+        if not due:
+            return
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"⚠️ Could not flush view counts: {e}")
+
+    def flush(self) -> int:
+        """Write buffered views, one transaction per shard; returns views written"""
+        with self._lock:
+            batch, self._pending = self._pending, Counter()
+            self._pending_views, self._oldest = 0, None
+        by_shard = {}
+        for (shard, name, row_id), views in sorted(batch.items(), key=lambda item: (item[0][0] or '', item[0][1:])):
+            by_shard.setdefault(shard, []).append((name, row_id, views))
+        shards = list(by_shard.items())
+        written = 0
+        for position, (shard, rows) in enumerate(shards):
+            try:
+                with use_shard(self.db, shard), use_primary(self.db):
+                    for name, row_id, views in rows:
+                        Model = self.models[name]
+                        Model.query.filter(Model.id == row_id).update(
+                            {'views': Model.views + views}, synchronize_session=False)
+                    self.db.session.commit()
+            except Exception:
+                self.db.session.rollback()
+                with self._lock:
+                    # Keep what wasn't written for the next flush
+                    if not self._pending_views:
+                        self._oldest = time.monotonic()
+                    for unwritten_shard, unwritten in shards[position:]:
+                        for name, row_id, views in unwritten:
+                            self._pending[(unwritten_shard, name, row_id)] += views
+                            self._pending_views += views
+                raise
+            written += sum(views for _, _, views in rows)
+        self.flushed += written
+        return written
+
+    def ensure_flusher(self):
+        """Start the flush thread once per process (again after a fork)"""
+        if self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+            self._pending = Counter()  # a forked child must not write the parent's views again
+            self._pending_views, self._oldest = 0, None
+            if self.flush_seconds <= 0:
+                return  # flush_if_due writes every view
+            threading.Thread(target=self._flush_forever, name='view-counter', daemon=True).start()
+            atexit.register(self._flush_at_exit)
+
+    def _flush_forever(self):
+        with self.app.app_context():
+            while True:
+                time.sleep(self.flush_seconds)
+                try:
+                    self.flush()
+                except Exception as e:
+                    print(f"⚠️ Could not flush view counts: {e}")
+                finally:
+                    self.db.session.remove()
+
+    def _flush_at_exit(self):
+        if self._flusher_pid != os.getpid():
+            return
+        with self.app.app_context():
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ Could not flush view counts: {e}")
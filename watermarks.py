@@ -0,0 +1,59 @@
+from datetime import datetime
+
+from sqlalchemy import insert, select
+
+
+class RowScanner:
+    """Hands out the new rows of a table once each, in id order, in batches.
+
+    ProcessingWatermark keeps the highest id handed out per name. An id is
+    assigned when a row is inserted, but the row only becomes visible when
+    its transaction commits, so it can turn up below the watermark after
+    newer rows were handed out. Every batch therefore also re-reads the
+    `rescan_ids` ids below the watermark and skips those recorded in
+    ProcessedRow. A batch is recorded in the caller's transaction, so two
+    scanners claiming the same row collide on ProcessedRow's primary key
+    instead of both processing it.
+    """
+
+    def __init__(self, db, ProcessingWatermark, ProcessedRow, rescan_ids=1000):
+        self.db = db
+        self.ProcessingWatermark = ProcessingWatermark
+        self.ProcessedRow = ProcessedRow
+        self.rescan_ids = rescan_ids
+
+    def claim(self, name, Model, stmt, limit) -> list:
+        """Up to `limit` rows of stmt (a SELECT of Model.id and more) not handed out yet.
+
+        The rows are recorded as handed out in the session's transaction and
+        the caller commits; an IntegrityError on flush or commit means a
+        concurrent scanner claimed some of them first.
+        """
+        Watermark, Processed = self.ProcessingWatermark, self.ProcessedRow
+        session = self.db.session
+
+        watermark = session.get(Watermark, name)
+        if watermark is None:
+            watermark = Watermark(name=name, last_id=0)
+            session.add(watermark)
+            session.flush()
+        low = max(watermark.last_id - self.rescan_ids, 0)
+
+        seen = select(Processed.row_id).where(Processed.name == name, Processed.row_id > low)
+        rows = session.execute(
+            stmt.where(Model.id > low, Model.id.not_in(seen))
+            .order_by(Model.id)
+            .limit(limit)
+        ).all()
+        if not rows:
+            return rows
+
+        session.execute(insert(Processed), [{'name': name, 'row_id': row.id} for row in rows])
+        high = rows[-1].id
+        session.query(Watermark).filter(Watermark.name == name, Watermark.last_id < high).update(
+            {'last_id': high, 'updated_at': datetime.utcnow()}, synchronize_session=False)
+        # Ids below the window are never read again
+        session.query(Processed).filter(Processed.name == name,
+                                        Processed.row_id <= max(high, watermark.last_id) - self.rescan_ids).delete(
+            synchronize_session=False)
+        return rows